@@ -0,0 +1,182 @@
+# aggregates.py — 增量維護的統計摘要：筆數、總和、平均、類別計數、直方圖與分組平均
+#
+# 每次新增/修改/刪除只以該筆記錄的舊值與新值調整計數器 (O(1))，儀表板直接讀摘要，
+# 不必每次造訪都把全部記錄轉成 DataFrame 重新計算。摘要只存在記憶體中，程序啟動時由 store 的快照建立。
+import threading
+from datetime import datetime
+from store import DerivedIndex, get_store
+
+# 各資料集要維護的統計：
+#   numeric     數值欄位 (筆數、總和、平方和 → 平均與標準差)
+#   tallies     類別欄位計數
+#   histograms  {欄位: 組距}
+#   groups      {分組欄位: [要計算分組平均的數值欄位]}
+#   derived     {衍生欄位: 函式(記錄)}，可再用於 tallies
+SPECS = {
+    "comp_data.json": {
+        'numeric': ['salary', 'bonus', 'total'],
+        'tallies': ['department'],
+        'histograms': {'salary': 2000},
+        'groups': {'department': ['salary', 'total']},
+    },
+    "kpi_data.json": {
+        'numeric': ['score', 'goal_rate'],
+        'tallies': ['department'],
+        'histograms': {'score': 5},
+        'groups': {'department': ['score', 'goal_rate']},
+    },
+    "rs_data.json": {
+        'numeric': ['rating'],
+        'tallies': ['position', 'rating'],
+        'groups': {'position': ['rating']},
+    },
+    "er_data.json": {
+        'numeric': ['urgency'],
+        'tallies': ['category', 'urgency', 'anonymous'],
+        'groups': {'category': ['urgency']},
+        'derived': {'anonymous': lambda r: r.get('emp') == '匿名'},
+    },
+}
+
+def _number(value):
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _key(value):
+    return "" if value is None else str(value)
+
+class Aggregates(DerivedIndex):
+    def __init__(self, name, spec):
+        self.name = name
+        self.spec = spec
+        self._fields = set(spec.get('numeric', ())) | set(spec.get('tallies', ())) | set(spec.get('histograms', {}))
+        for group, fields in spec.get('groups', {}).items():
+            self._fields |= {group, *fields}
+        self._fields -= set(spec.get('derived', {}))
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._contrib = {}
+        self.count = 0
+        self.numeric = {f: [0, 0.0, 0.0] for f in self.spec.get('numeric', ())}
+        self.tallies = {f: {} for f in self.spec.get('tallies', ())}
+        self.histograms = {f: {} for f in self.spec.get('histograms', {})}
+        self.groups = {g: {} for g in self.spec.get('groups', {})}
+
+    # 只保留統計需要的欄位，修改/刪除時據此扣除舊值
+    def _extract(self, record):
+        values = {f: record.get(f) for f in self._fields}
+        for field, fn in self.spec.get('derived', {}).items():
+            values[field] = fn(record)
+        return values
+
+    def _bump(self, table, key, delta):
+        n = table.get(key, 0) + delta
+        if n:
+            table[key] = n
+        else:
+            table.pop(key, None)
+
+    def _apply_values(self, values, sign):
+        self.count += sign
+        for field, stats in self.numeric.items():
+            x = _number(values.get(field))
+            if x is not None:
+                stats[0] += sign
+                stats[1] += sign * x
+                stats[2] += sign * x * x
+        for field, table in self.tallies.items():
+            self._bump(table, _key(values.get(field)), sign)
+        for field, width in self.spec.get('histograms', {}).items():
+            x = _number(values.get(field))
+            if x is not None:
+                self._bump(self.histograms[field], str(int(x // width * width)), sign)
+        for group, fields in self.spec.get('groups', {}).items():
+            bucket = self.groups[group].setdefault(_key(values.get(group)), {'count': 0})
+            bucket['count'] += sign
+            for field in fields:
+                x = _number(values.get(field))
+                if x is not None:
+                    stats = bucket.setdefault(field, [0, 0.0])
+                    stats[0] += sign
+                    stats[1] += sign * x
+            if bucket['count'] <= 0:
+                del self.groups[group][_key(values.get(group))]
+
+    def _add(self, record):
+        rid = record.get('id')
+        if rid is None:
+            return
+        self._remove(rid)
+        values = self._extract(record)
+        self._contrib[rid] = values
+        self._apply_values(values, 1)
+
+    def _remove(self, rid):
+        values = self._contrib.pop(rid, None)
+        if values is not None:
+            self._apply_values(values, -1)
+
+    # store 的 listener：ops 為 None 時整份重建，否則只處理本次異動的記錄
+    def apply(self, records, ops):
+        with self._lock:
+            if ops is None:
+                self._reset()
+                for r in records:
+                    self._add(r)
+            else:
+                for op, payload in ops:
+                    if op == 'delete':
+                        self._remove(payload)
+                    else:
+                        self._add(payload)
+
+    def _summary(self):
+        numeric = {}
+        for field, (n, total, squares) in self.numeric.items():
+            mean = total / n if n else None
+            var = max(squares / n - mean * mean, 0.0) if n else None
+            numeric[field] = {'count': n, 'sum': total, 'mean': mean, 'std': var ** 0.5 if n else None}
+        groups = {}
+        for group, buckets in self.groups.items():
+            groups[group] = {}
+            for key, bucket in buckets.items():
+                row = {'count': bucket['count']}
+                for field in self.spec['groups'][group]:
+                    n, total = bucket.get(field, (0, 0.0))
+                    row[field] = total / n if n else None
+                groups[group][key] = row
+        return {
+            'dataset': self.name,
+            'count': self.count,
+            'numeric': numeric,
+            'tallies': {f: dict(t) for f, t in self.tallies.items()},
+            'histograms': {f: dict(sorted(h.items(), key=lambda kv: float(kv[0]))) for f, h in self.histograms.items()},
+            'groups': groups,
+            'updated_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+    def summary(self):
+        self.refresh()
+        with self._lock:
+            return self._summary()
+
+# -------------------- 全程序共用的摘要 --------------------
+_aggregates = {}
+_aggregates_lock = threading.Lock()
+
+def get_summary(name, store=None):
+    store = store or get_store()
+    with _aggregates_lock:
+        agg = _aggregates.get((store, name))
+        if agg is None:
+            agg = _aggregates[(store, name)] = Aggregates(name, SPECS[name])
+            agg.attach(store, name)
+    return agg.summary()
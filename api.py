@@ -0,0 +1,379 @@
+# api.py — 本機 HTTP API：讓薪資、門禁等內部系統直接讀寫 HR 資料，不必解析 JSON 資料檔
+# 用法：python api.py [--host 127.0.0.1] [--port 8765] [--pool 4]
+#
+# 以 asyncio 實作 HTTP/1.1 (支援 keep-alive)，只用標準函式庫。讀寫都經過 services 與共享的 store，
+# 與 Streamlit 頁面、cli.py 使用同一份快照、日誌與樂觀鎖。
+#
+#   GET    /api                              資源清單與目前版本
+#   GET    /api/<資源>?page=1&page_size=50&sort=created_at&order=desc&<欄位>=<值>
+#   GET    /api/<資源>/<id>
+#   POST   /api/<資源>                       新增 (JSON body)
+#   PATCH  /api/<資源>/<id>                  修改部分欄位；If-Match: "<_version>" 時啟用樂觀鎖
+#                                            (不提供 PUT：整筆取代需要完整記錄，目前只支援部分修改)
+#   DELETE /api/<資源>/<id>                  刪除 (依 CASCADES 連帶刪除)；同樣支援 If-Match
+#
+# 列表的 ETag 由資料集版本與查詢參數組成，單筆的 ETag 為記錄的 _version；
+# 輪詢的客戶端帶 If-None-Match，資料未變時回 304，不序列化也不傳送任何記錄。
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qsl, unquote, urlsplit
+from services import ScheduleConflict, get_service
+from storage import ConflictError, check_field
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY = 1 << 20          # 請求內容上限 1 MB
+MAX_HEADERS = 100
+MAX_PAGE_SIZE = 500
+DEFAULT_PAGE_SIZE = 50
+# 系統維護的欄位，不接受客戶端寫入
+READ_ONLY = ('id', '_version', 'created_at', 'updated_at')
+
+# 資源名稱 → (服務代號, 資料集)；資料集為 None 表示服務的主資料集
+RESOURCES = {
+    "demands": ("hrp", None),
+    "candidates": ("rs", None),
+    "interviews": ("rs", "rs_interviews.json"),
+    "trainings": ("td", None),
+    "kpis": ("kpi", None),
+    "compensation": ("comp", None),
+    "er-cases": ("er", None),
+    "employees": ("em", None),
+}
+
+class HttpError(Exception):
+    def __init__(self, status, message=None, headers=None):
+        self.status = HTTPStatus(status)
+        self.message = message or self.status.phrase
+        self.headers = headers or {}
+        super().__init__(self.message)
+
+# store 的資料集版本在程序重啟後從 0 起算，列表 ETag 另加上本程序的啟動代號，避免重啟後誤判未變
+_BOOT = uuid.uuid4().hex
+
+def _etag(*parts):
+    return '"' + hashlib.sha1("|".join(map(str, (_BOOT,) + parts)).encode()).hexdigest()[:20] + '"'
+
+# 單筆記錄的 ETag 就是 _version，客戶端可原樣放回 If-Match
+def _record_etag(record):
+    return f'"{record.get("_version")}"'
+
+def _matches(header, etag):
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [t.strip().removeprefix("W/") for t in header.split(",")]
+
+# Content-Length 必須是非負整數且不超過 MAX_BODY；不支援 chunked 傳輸
+def _content_length(headers):
+    if 'transfer-encoding' in headers:
+        raise HttpError(411, "請以 Content-Length 傳送內容")
+    value = headers.get('content-length', "0").strip()
+    if not value.isdigit():
+        raise HttpError(400, "Content-Length 應為非負整數")
+    length = int(value)
+    if length > MAX_BODY:
+        raise HttpError(413, f"內容超過上限 {MAX_BODY} bytes")
+    return length
+
+# If-Match 可為記錄的 ETag ("<_version>") 或直接寫版本號
+def _expected_version(header):
+    if not header:
+        return None
+    try:
+        return int(header.strip().removeprefix("W/").strip('"'))
+    except ValueError:
+        raise HttpError(400, "If-Match 應為記錄的版本號")
+
+# -------------------- 存取池 --------------------
+# store 與 SQLite 的操作都是阻塞 I/O，交給固定大小的執行緒池執行，事件迴圈只負責網路。
+# SqliteBackend 的連線以執行緒為單位保存，池中每個執行緒各持有一條連線並重複使用，
+# 同時開啟的連線數即為池的大小。
+class HandlePool:
+    def __init__(self, size=4):
+        self.size = size
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="hrm-api",
+                                            initializer=self._open)
+
+    @staticmethod
+    def _open():
+        backend = get_service("hrp").store.backend
+        if hasattr(backend, "connection"):
+            backend.connection()
+
+    async def run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+# -------------------- 資源操作 (在存取池中執行) --------------------
+class Resource:
+    def __init__(self, name, service_key, dataset=None):
+        self.name = name
+        self.service = get_service(service_key)
+        self.dataset = dataset or self.service.data_file
+        self.primary = self.dataset == self.service.data_file
+
+    @property
+    def store(self):
+        return self.service.store
+
+    def version(self):
+        return self.store.version(self.dataset)
+
+    @staticmethod
+    def field(name, param):
+        try:
+            return check_field(name)
+        except ValueError:
+            raise HttpError(400, f"{param} 不是有效的欄位名稱：{name}")
+
+    # 查詢參數 → where 條件；欄位型別依匯入規格轉換 (例如 year=2025 比對整數)
+    def where(self, filters):
+        schema = self.service.import_schema if self.primary else {}
+        where = []
+        for field, value in filters.items():
+            self.field(field, "篩選欄位")
+            if schema.get(field, {}).get('type') == 'int':
+                try:
+                    value = int(value)
+                except ValueError:
+                    raise HttpError(400, f"{field} 應為整數")
+            where.append((field, '=', value))
+        return where
+
+    def page(self, where, sort_by, descending, page, page_size):
+        return self.store.page(self.dataset, where, sort_by, descending, page, page_size)
+
+    def get(self, record_id):
+        record = self.store.get(self.dataset, record_id)
+        if record is None:
+            raise HttpError(404, f"找不到 {self.name}/{record_id}")
+        return record
+
+    def create(self, body):
+        if self.dataset == "rs_interviews.json":
+            return self._schedule_interview(body)
+        if not self.primary:
+            raise HttpError(405)
+        return self.service.create({k: v for k, v in body.items() if k not in READ_ONLY})
+
+    def _schedule_interview(self, body):
+        from datetime import datetime
+        candidate = self.service.get(body.get('candidate_id'))
+        if candidate is None:
+            raise HttpError(422, "candidate_id 不存在")
+        try:
+            start = datetime.fromisoformat(str(body.get('start')))
+            minutes = int(body.get('minutes', 60))
+        except ValueError:
+            raise HttpError(422, "start 應為 ISO 時間、minutes 應為整數")
+        return self.service.schedule_interview(candidate, start, minutes, str(body.get('location', '')),
+                                               force=bool(body.get('force')))
+
+    # PATCH：與現有欄位合併後走服務的驗證與衍生欄位 (例如薪酬的 total)
+    def update(self, record_id, body, expected_version):
+        if not self.primary:
+            raise HttpError(405)
+        current = self.get(record_id)
+        fields = {k: v for k, v in current.items() if k not in READ_ONLY}
+        fields.update((k, v) for k, v in body.items() if k not in READ_ONLY)
+        updated = self.service.update(record_id, fields, expected_version)
+        if updated is None:
+            raise HttpError(404, f"找不到 {self.name}/{record_id}")
+        return updated
+
+    def delete(self, record_id, expected_version):
+        record = self.get(record_id)
+        versions = {record_id: expected_version} if expected_version is not None else None
+        if self.primary:
+            return self.service.delete([record], versions)
+        return self.store.delete_many(self.dataset, {record_id}, versions)
+
+# -------------------- HTTP --------------------
+class ApiServer:
+    def __init__(self, pool_size=4):
+        self.pool = HandlePool(pool_size)
+        self.resources = {name: Resource(name, key, dataset) for name, (key, dataset) in RESOURCES.items()}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HttpError as e:
+                    await self._send(writer, e.status, {'error': e.message}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                try:
+                    status, payload, extra = await self.dispatch(method, target, headers, body)
+                except HttpError as e:
+                    status, payload, extra = e.status, {'error': e.message}, e.headers
+                except ScheduleConflict as e:
+                    status, payload, extra = HTTPStatus.CONFLICT, {'error': str(e)}, {}
+                except ConflictError as e:
+                    status, payload, extra = HTTPStatus.PRECONDITION_FAILED, {'error': str(e)}, {}
+                except ValueError as e:
+                    status, payload, extra = HTTPStatus.UNPROCESSABLE_ENTITY, {'error': str(e)}, {}
+                except Exception:
+                    # 例外內容可能含檔案路徑或資料，只寫入伺服器日誌，不回傳給客戶端
+                    logger.exception("處理 %s %s 時發生錯誤", method, target)
+                    status, payload, extra = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': "伺服器內部錯誤"}, {}
+                await self._send(writer, status, payload, extra, keep_alive, head=method == "HEAD")
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        line = await self._readline(reader)
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode('latin-1').split()
+        except ValueError:
+            raise HttpError(400, "無效的請求行")
+        headers = {}
+        while True:
+            line = await self._readline(reader)
+            if line in (b"\r\n", b"\n", b""):
+                break
+            if len(headers) >= MAX_HEADERS:
+                raise HttpError(431)
+            key, _, value = line.decode('latin-1').partition(":")
+            headers[key.strip().lower()] = value.strip()
+        length = _content_length(headers)
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target, headers, body
+
+    # 單行超過 StreamReader 的緩衝上限 (64 KB) 時回 431，而不是中斷連線
+    @staticmethod
+    async def _readline(reader):
+        try:
+            return await reader.readline()
+        except (ValueError, asyncio.LimitOverrunError):
+            raise HttpError(431)
+
+    async def _send(self, writer, status, payload, headers=None, keep_alive=True, head=False):
+        status = HTTPStatus(status)
+        data = b""
+        if payload is not None and status != HTTPStatus.NOT_MODIFIED:
+            data = json.dumps(payload, ensure_ascii=False, default=str).encode()
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}"]
+        all_headers = {'Content-Type': "application/json; charset=utf-8", 'Content-Length': str(len(data)),
+                       'Connection': "keep-alive" if keep_alive else "close", **(headers or {})}
+        lines += [f"{k}: {v}" for k, v in all_headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + (b"" if head else data))
+        await writer.drain()
+
+    async def dispatch(self, method, target, headers, body):
+        url = urlsplit(target)
+        parts = [unquote(p) for p in url.path.strip("/").split("/") if p]
+        if not parts or parts[0] != "api":
+            raise HttpError(404)
+        if len(parts) == 1:
+            if method not in ("GET", "HEAD"):
+                raise HttpError(405, headers={'Allow': "GET, HEAD"})
+            return await self.index()
+        resource = self.resources.get(parts[1])
+        if resource is None or len(parts) > 3:
+            raise HttpError(404)
+        query = dict(parse_qsl(url.query))
+        if len(parts) == 2:
+            if method in ("GET", "HEAD"):
+                return await self.list(resource, query, headers)
+            if method == "POST":
+                record = await self.pool.run(resource.create, self._json(body))
+                return HTTPStatus.CREATED, record, {'ETag': _record_etag(record),
+                                                    'Location': f"/api/{resource.name}/{record['id']}"}
+            raise HttpError(405, headers={'Allow': "GET, HEAD, POST"})
+        record_id = parts[2]
+        if method in ("GET", "HEAD"):
+            record = await self.pool.run(resource.get, record_id)
+            etag = _record_etag(record)
+            if _matches(headers.get('if-none-match'), etag):
+                return HTTPStatus.NOT_MODIFIED, None, {'ETag': etag}
+            return HTTPStatus.OK, record, {'ETag': etag}
+        expected = _expected_version(headers.get('if-match'))
+        if method == "PATCH":
+            record = await self.pool.run(resource.update, record_id, self._json(body), expected)
+            return HTTPStatus.OK, record, {'ETag': _record_etag(record)}
+        if method == "DELETE":
+            deleted = await self.pool.run(resource.delete, record_id, expected)
+            return HTTPStatus.OK, {'deleted': deleted}, {}
+        raise HttpError(405, headers={'Allow': "GET, HEAD, PATCH, DELETE"})
+
+    @staticmethod
+    def _json(body):
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            raise HttpError(400, "內容不是有效的 JSON")
+        if not isinstance(data, dict):
+            raise HttpError(400, "內容應為 JSON 物件")
+        return data
+
+    async def index(self):
+        def versions():
+            return {name: {'dataset': r.dataset, 'version': r.version()} for name, r in self.resources.items()}
+        return HTTPStatus.OK, await self.pool.run(versions), {}
+
+    # 先取版本比對 If-None-Match，資料未變時不讀取分頁
+    async def list(self, resource, query, headers):
+        try:
+            page = max(1, int(query.pop('page', 1)))
+            page_size = min(MAX_PAGE_SIZE, max(1, int(query.pop('page_size', DEFAULT_PAGE_SIZE))))
+        except ValueError:
+            raise HttpError(400, "page / page_size 應為整數")
+        sort_by = query.pop('sort', None)
+        if sort_by is not None:
+            resource.field(sort_by, "sort")
+        descending = query.pop('order', 'asc').lower() == 'desc'
+        where = resource.where(query)
+        version = await self.pool.run(resource.version)
+        etag = _etag(resource.dataset, version, page, page_size, sort_by, descending, sorted(query.items()))
+        cache = {'ETag': etag, 'Cache-Control': "no-cache"}
+        if _matches(headers.get('if-none-match'), etag):
+            return HTTPStatus.NOT_MODIFIED, None, cache
+        items, total = await self.pool.run(resource.page, where, sort_by, descending, page, page_size)
+        return HTTPStatus.OK, {
+            'items': items, 'page': page, 'page_size': page_size, 'total': total,
+            'pages': (total + page_size - 1) // page_size, 'version': version,
+        }, cache
+
+async def serve(host="127.0.0.1", port=8765, pool_size=4):
+    api = ApiServer(pool_size)
+    server = await asyncio.start_server(api.handle, host, port)
+    print(f"HRM API 已啟動：http://{host}:{port}/api (存取池 {pool_size})")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        api.pool.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="HRM 本機 HTTP API")
+    parser.add_argument("--host", default=os.environ.get("HRM_API_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("HRM_API_PORT", "8765")))
+    parser.add_argument("--pool", type=int, default=int(os.environ.get("HRM_API_POOL", "4")),
+                        help="存取池大小 (同時執行的資料庫連線數)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.pool))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# benchmarks/bench_calibration.py — 向量化績效校準 vs. 逐筆迴圈
+#
+# 用法：python benchmarks/bench_calibration.py [--records 100000] [--departments 40]
+# 逐筆版本以 dict/list 依部門、主管分組後排序，規則與 calibration.calibrate 相同；
+# 先驗證兩者的等第完全一致，再比較時間。
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+import calibration
+
+def synthetic(n, departments, seed=11):
+    rng = random.Random(seed)
+    managers = {d: [f"主管{d}-{m}" for m in range(rng.randint(3, 12))] for d in range(departments)}
+    # 每位主管有各自的給分寬嚴偏差
+    bias = {m: rng.gauss(0, 8) for ms in managers.values() for m in ms}
+    rows = []
+    for i in range(n):
+        d = rng.randrange(departments)
+        m = rng.choice(managers[d])
+        rows.append({'id': str(i), 'emp': f"員工{i}", 'department': f"部門{d}", 'manager': m,
+                     'score': int(min(100, max(0, rng.gauss(70, 10) + bias[m]))),
+                     'goal_rate': int(min(100, max(0, rng.gauss(75, 12)))),
+                     'created_at': f"2025-12-{rng.randint(1, 28):02d} 09:00:00"})
+    return rows
+
+# -------------------- 逐筆基準 --------------------
+def naive_calibrate(records, curve, weight=calibration.SCORE_WEIGHT, min_group=calibration.MIN_GROUP):
+    comp = {r['id']: r['score'] * weight + r['goal_rate'] * (1 - weight) for r in records}
+    by_manager, by_dept = defaultdict(list), defaultdict(list)
+    for r in records:
+        by_manager[r['manager'] or "部門:" + r['department']].append(comp[r['id']])
+        by_dept[r['department']].append(comp[r['id']])
+    stats = lambda xs: (statistics.fmean(xs), statistics.pstdev(xs), len(xs))
+    m_stats = {k: stats(v) for k, v in by_manager.items()}
+    d_stats = {k: stats(v) for k, v in by_dept.items()}
+    mean, std = statistics.fmean(comp.values()), statistics.pstdev(comp.values())
+    calibrated = {}
+    for r in records:
+        x = comp[r['id']]
+        mu, sd, size = m_stats[r['manager'] or "部門:" + r['department']]
+        if size < min_group or sd == 0:
+            mu, sd, _ = d_stats[r['department']]
+        z = (x - mu) / sd if sd else 0.0
+        calibrated[r['id']] = round(mean + z * std, 2)
+    grades = {}
+    groups = defaultdict(list)
+    for pos, r in enumerate(records):
+        groups[r['department']].append((-calibrated[r['id']], -round(comp[r['id']], 2), pos, r['id']))
+    for members in groups.values():
+        members.sort()
+        # 各等第累積名額 = round(累積比例 × 人數)，與 calibration.band_limits 相同的規則
+        limits, total = [], 0.0
+        for _, share in curve:
+            total += share
+            limits.append(int(round(total, 9) * len(members) + 0.5))
+        limits[-1] = len(members)
+        for rank, (*_, rid) in enumerate(members, 1):
+            band = sum(1 for limit in limits if rank > limit)
+            grades[rid] = curve[min(band, len(curve) - 1)][0]
+    return grades
+
+def main():
+    parser = argparse.ArgumentParser(description="績效校準基準測試")
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--departments", type=int, default=40)
+    args = parser.parse_args()
+
+    records = synthetic(args.records, args.departments)
+    df = pd.DataFrame(records)
+    curve = calibration.DEFAULT_CURVE
+
+    t0 = time.perf_counter()
+    result = calibration.calibrate(df, year=2025, curve=curve)
+    vectorized = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    naive = naive_calibrate(records, curve)
+    loop = time.perf_counter() - t0
+
+    mismatches = int((result['grade'] != result['id'].map(naive)).sum())
+    shares = result['grade'].value_counts(normalize=True).reindex([g for g, _ in curve], fill_value=0)
+    print(f"評估筆數             : {len(records):,}")
+    print(f"部門數               : {result['department'].nunique()}")
+    print(f"向量化校準           : {vectorized:8.3f} s")
+    print(f"逐筆迴圈             : {loop:8.3f} s")
+    print(f"加速倍數             : {loop / vectorized:8.1f}x")
+    print(f"等第不一致筆數       : {mismatches}")
+    print("等第實際比例         : " + " / ".join(f"{g} {s:.1%}" for g, s in shares.items()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# benchmarks/bench_startup.py — 比較冷啟動匯入成本：一次匯入全部模組 vs. 只匯入選到的模組
+#
+# 用法：python benchmarks/bench_startup.py [--runs 7] [--module employee_relations]
+# 每次量測都在全新的子程序中執行，避免模組已在 sys.modules 中造成失真。
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ALL_MODULES = ["hr_planning", "recruitment", "training", "performance", "compensation", "employee_relations"]
+
+# 舊版 main.py 的行為：六個模組全部匯入，且 matplotlib.pyplot 於模組層級載入
+EAGER = "import matplotlib.pyplot\n" + "".join(f"import {m}\n" for m in ALL_MODULES)
+
+def lazy_code(module):
+    return f"import importlib\nimportlib.import_module({module!r})\n"
+
+def measure(code, runs):
+    timer = (
+        "import time\n"
+        "t0 = time.perf_counter()\n"
+        f"exec(compile({code!r}, '<bench>', 'exec'))\n"
+        "print(time.perf_counter() - t0)\n"
+    )
+    env = {**os.environ, "HRM_WRITE_BEHIND": "0"}
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", timer], cwd=ROOT, env=env,
+                             capture_output=True, text=True, check=True)
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description="冷啟動匯入時間基準測試")
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--module", default="employee_relations", choices=ALL_MODULES)
+    args = parser.parse_args()
+
+    eager = measure(EAGER, args.runs)
+    lazy = measure(lazy_code(args.module), args.runs)
+    print(f"全部匯入 (舊版)      : {eager * 1000:8.1f} ms")
+    print(f"只匯入 {args.module:<14}: {lazy * 1000:8.1f} ms")
+    print(f"加速倍數            : {eager / lazy:8.2f}x")
+
+if __name__ == "__main__":
+    main()
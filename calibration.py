@@ -0,0 +1,128 @@
+# calibration.py — 年度績效校準：主管別 z 分數標準化、部門內排名與強制分配等第
+#
+# 全部以 pandas groupby/transform 與 NumPy 整欄運算完成，不逐人、逐部門迴圈；
+# 效能見 benchmarks/bench_calibration.py。
+#
+# 輸入欄位 (kpi_data)：emp (或 emp_id)、department、manager、score、goal_rate、created_at。
+# 同一員工在同一年度有多筆評估時取最新一筆。
+import numpy as np
+import pandas as pd
+
+# 強制分配曲線：由高至低的 (等第, 比例)，比例總和為 1
+DEFAULT_CURVE = [("A", 0.10), ("B", 0.20), ("C", 0.40), ("D", 0.20), ("E", 0.10)]
+# 綜合分數 = 分數 × SCORE_WEIGHT + 目標完成率 × (1 - SCORE_WEIGHT)
+SCORE_WEIGHT = 0.7
+# 主管底下人數少於此值時，z 分數改以部門為母體 (樣本太少時標準差不可靠)
+MIN_GROUP = 3
+
+# "10/20/40/20/10" → [("A", 0.1), ...]；比例會正規化為總和 1
+def parse_curve(text, labels="ABCDEFGHIJ"):
+    parts = [float(p) for p in str(text).replace(",", "/").split("/") if p.strip()]
+    if not parts or any(p < 0 for p in parts) or sum(parts) <= 0 or len(parts) > len(labels):
+        raise ValueError("分配比例格式錯誤，例如 10/20/40/20/10")
+    total = sum(parts)
+    return [(labels[i], p / total) for i, p in enumerate(parts)]
+
+# 每位員工在該年度的最新一筆評估
+def latest_reviews(df, year=None):
+    if df.empty:
+        return df
+    created = df['created_at'].astype(str) if 'created_at' in df else pd.Series("", index=df.index)
+    if year is not None:
+        df = df[created.str.startswith(str(year))]
+        created = created[df.index]
+    key = df['emp_id'].fillna(df['emp']) if 'emp_id' in df else df['emp']
+    order = created.sort_values(kind='stable').index
+    return df.loc[order][~key.loc[order].duplicated(keep='last')].sort_index()
+
+# 文字欄位補空字串；frames.build_frame 會把 department 轉成 category，須先轉回 object 才能填入新值
+def _text(df, field):
+    if field not in df:
+        return pd.Series("", index=df.index)
+    return df[field].astype(object).fillna("").astype(str)
+
+# 依群組計算 z 分數；群組太小或標準差為 0 時改用 fallback 群組，仍不足則為 0
+def group_zscore(values, groups, fallback=None, min_group=MIN_GROUP):
+    grouped = values.groupby(groups)
+    mean = grouped.transform('mean')
+    std = grouped.transform('std', ddof=0)
+    size = grouped.transform('size')
+    z = (values - mean) / std.where(std > 0)
+    if fallback is not None:
+        weak = (size < min_group) | z.isna()
+        if weak.any():
+            fb = values.groupby(fallback)
+            fb_std = fb.transform('std', ddof=0)
+            z = z.where(~weak, (values - fb.transform('mean')) / fb_std.where(fb_std > 0))
+    return z.fillna(0.0)
+
+# 每個等第在組內的累積名額：round(累積比例 × 人數)，四捨五入且最後一級必為全員。
+# 以整數名額比對名次，不用浮點百分位比對邊界，0.1 + 0.2 之類的誤差不會讓人落到相鄰等第
+def band_limits(size, curve=DEFAULT_CURVE):
+    cum = np.round(np.cumsum([share for _, share in curve]), 9)
+    limits = np.floor(np.multiply.outer(np.asarray(size, dtype=float), cum) + 0.5).astype(int)
+    limits[..., -1] = size
+    return limits
+
+# 組內名次 (1 = 最佳) 與組內人數 → 等第
+def assign_grades(rank, size, curve=DEFAULT_CURVE):
+    labels = np.array([label for label, _ in curve])
+    band = (np.asarray(rank)[:, None] > band_limits(size, curve)).sum(axis=1)
+    return labels[np.minimum(band, len(labels) - 1)]
+
+# 執行一次校準。回傳每位員工一列的 DataFrame (依部門、名次排序)
+def calibrate(df, year=None, curve=DEFAULT_CURVE, score_weight=SCORE_WEIGHT, min_group=MIN_GROUP):
+    reviews = latest_reviews(df, year)
+    if reviews.empty:
+        return pd.DataFrame(columns=['id', 'emp_id', 'emp', 'department', 'manager', 'score', 'goal_rate', 'composite',
+                                     'z', 'calibrated', 'rank', 'dept_size', 'percentile', 'grade'])
+    department = _text(reviews, 'department')
+    manager = _text(reviews, 'manager')
+    # 未填主管者以部門為單位標準化
+    manager = manager.where(manager != "", "部門:" + department)
+    score = pd.to_numeric(reviews['score'], errors='coerce').fillna(0.0)
+    goal = pd.to_numeric(reviews.get('goal_rate', score), errors='coerce').fillna(0.0)
+    composite = score * score_weight + goal * (1 - score_weight)
+
+    # 主管之間的給分寬嚴差異：以主管為母體換算 z 分數，再映回全公司的平均與標準差
+    z = group_zscore(composite, manager, fallback=department, min_group=min_group)
+    calibrated = composite.mean() + z * composite.std(ddof=0)
+
+    # 部門內排名：同分時依原始綜合分數、再依原順序決定，名次不重複
+    out = pd.DataFrame({
+        'id': reviews['id'] if 'id' in reviews else reviews.index.astype(str),
+        'emp_id': reviews['emp_id'] if 'emp_id' in reviews else None,
+        'emp': reviews['emp'].astype(str),
+        'department': department,
+        'manager': manager.where(~manager.str.startswith("部門:"), ""),
+        'score': score,
+        'goal_rate': goal,
+        'composite': composite.round(2),
+        'z': z.round(3),
+        'calibrated': calibrated.round(2),
+    })
+    out = out.sort_values(['department', 'calibrated', 'composite'], ascending=[True, False, False], kind='stable')
+    out['rank'] = out.groupby('department').cumcount() + 1
+    out['dept_size'] = out.groupby('department')['rank'].transform('size')
+    out['percentile'] = ((out['rank'] - 1) / out['dept_size']).round(4)
+    out['grade'] = assign_grades(out['rank'].to_numpy(), out['dept_size'].to_numpy(), curve)
+    return out.reset_index(drop=True)
+
+# 部門 × 等第人數表
+def distribution(result, curve=DEFAULT_CURVE):
+    labels = [label for label, _ in curve]
+    table = pd.crosstab(result['department'], result['grade']).reindex(columns=labels, fill_value=0)
+    table['合計'] = table.sum(axis=1)
+    return table
+
+# 主管別給分寬嚴：原始平均、校準後平均與人數
+def manager_summary(result):
+    named = result[result['manager'] != ""]
+    return (named.groupby(['department', 'manager'])
+            .agg(人數=('emp', 'size'), 原始平均=('composite', 'mean'), 校準後平均=('calibrated', 'mean'))
+            .round(2))
+
+def year_options(df):
+    if df.empty or 'created_at' not in df:
+        return []
+    return sorted({str(v)[:4] for v in df['created_at'].dropna() if str(v)[:4].isdigit()}, reverse=True)
@@ -0,0 +1,79 @@
+# certificates.py — 結業證書 PDF 批次產生：多程序平行繪製，逐檔寫入 zip
+#
+# 需要 reportlab (列於 requirements-extra.txt，未安裝時頁面停用批次證書)；中文使用 reportlab 內建的 CID 字型 (MSung-Light，繁體中文)，不需額外字型檔。
+# 本模組只負責繪製與打包，不匯入 store 或 streamlit，子程序載入成本低。
+import importlib.util
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+FONT = "MSung-Light"
+
+# 證書版面：每行為 (文字範本, 字級, 距頁面頂端的比例)；範本可使用 name、course、date、id
+TEMPLATE = [
+    ("結業證書", 36, 0.25),
+    ("茲證明 {name}", 22, 0.45),
+    ("已完成「{course}」課程，特發此證。", 18, 0.55),
+    ("發證日期：{date}", 12, 0.75),
+    ("證書編號：{id}", 9, 0.82),
+]
+
+# 少量證書直接在目前程序繪製，省去建立程序池的成本
+POOL_THRESHOLD = 16
+
+REPORTLAB_HINT = "產生 PDF 證書需要安裝 reportlab (pip install -r requirements-extra.txt)"
+
+def available():
+    return importlib.util.find_spec("reportlab") is not None
+
+def render_pdf(cert, template=TEMPLATE):
+    from io import BytesIO
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+    from reportlab.pdfgen import canvas
+
+    if FONT not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(UnicodeCIDFont(FONT))
+    width, height = landscape(A4)
+    buf = BytesIO()
+    c = canvas.Canvas(buf, pagesize=(width, height), pageCompression=1)
+    c.setTitle(f"Certificate {cert.get('id', '')}")
+    c.setLineWidth(3)
+    c.rect(30, 30, width - 60, height - 60)
+    for text, size, top in template:
+        c.setFont(FONT, size)
+        c.drawCentredString(width / 2, height * (1 - top), text.format(**cert))
+    c.showPage()
+    c.save()
+    return buf.getvalue()
+
+def _render_one(args):
+    cert, template = args
+    return cert_file_name(cert), render_pdf(cert, template)
+
+def cert_file_name(cert):
+    safe = "".join(ch for ch in str(cert.get('name', '')) if ch not in '\\/:*?"<>|').strip() or "certificate"
+    return f"{safe}-{str(cert.get('id', ''))[:8]}.pdf"
+
+# 依輸入順序逐一產生 (檔名, PDF bytes)；數量多時以程序池平行繪製
+def render_batch(certs, template=TEMPLATE, workers=None):
+    jobs = [(cert, template) for cert in certs]
+    if len(jobs) < POOL_THRESHOLD:
+        yield from map(_render_one, jobs)
+        return
+    workers = workers or min(len(jobs) // 4 + 1, os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(_render_one, jobs, chunksize=max(1, len(jobs) // (workers * 4)))
+
+# 邊產生邊寫入暫存 zip，不在記憶體中保留全部 PDF；回傳 zip 路徑
+def build_zip(certs, template=TEMPLATE, workers=None):
+    if not available():
+        raise ValueError(REPORTLAB_HINT)
+    fd, path = tempfile.mkstemp(prefix="hrm-certs-", suffix=".zip")
+    os.close(fd)
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED) as zf:
+        for file_name, data in render_batch(certs, template, workers):
+            zf.writestr(file_name, data)
+    return path
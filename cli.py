@@ -0,0 +1,177 @@
+# cli.py — 批次作業命令列：不啟動 Streamlit，直接使用 services 的同一組業務邏輯
+# 用法：
+#   python cli.py import comp salaries.csv [--dry-run]
+#   python cli.py export kpi --format csv --gzip -o out/
+#   python cli.py analytics comp [--json]
+#   python cli.py payroll --month 2025-06
+#   python cli.py calibrate --year 2025 [--curve 10/20/40/20/10] [--weight 0.7] [--apply] [-o result.csv]
+#   python cli.py backfill-employees
+#   python cli.py logs hrp [--limit 20]
+#   python cli.py reminders [--days 30] [--ics reminders.ics]
+# 與頁面共用 store、寫入日誌與持久化設定 (HRM_STORAGE 等環境變數)，結束時由 persistence 寫回磁碟。
+import argparse
+import json
+import sys
+from services import SERVICES, get_service
+
+def _print_json(data):
+    print(json.dumps(data, ensure_ascii=False, indent=2, default=str))
+
+def cmd_import(args):
+    service = get_service(args.module)
+    records, errors = service.import_path(args.file, dry_run=args.dry_run)
+    verb = "可匯入" if args.dry_run else "已匯入"
+    print(f"{service.title}：{verb} {len(records)} 筆，錯誤 {len(errors)} 筆")
+    for err in errors[:args.show_errors]:
+        print(f"  {err}")
+    if len(errors) > args.show_errors:
+        print(f"  … 其餘 {len(errors) - args.show_errors} 筆錯誤未顯示")
+    return 1 if errors and not records else 0
+
+def cmd_export(args):
+    service = get_service(args.module)
+    dataset = args.dataset or service.data_file
+    if dataset not in service.datasets():
+        print(f"{service.title}沒有資料集 {dataset}；可用：{', '.join(service.datasets())}", file=sys.stderr)
+        return 2
+    path, _, _ = service.export(args.format, args.gzip, dataset, args.output)
+    print(path)
+    return 0
+
+def cmd_analytics(args):
+    summary = get_service(args.module).analytics()
+    if args.json:
+        _print_json(summary)
+        return 0
+    for key, value in summary.items():
+        if isinstance(value, dict):
+            print(f"{key}:")
+            for k, v in value.items():
+                print(f"  {k}: {v}")
+        else:
+            print(f"{key}: {value}")
+    return 0
+
+def cmd_payroll(args):
+    try:
+        year, month = (int(p) for p in args.month.split("-"))
+    except ValueError:
+        print("月份格式應為 YYYY-MM", file=sys.stderr)
+        return 2
+    _, summary = get_service("comp").run_payroll(year, month)
+    _print_json(summary)
+    return 0
+
+def cmd_calibrate(args):
+    import calibration
+    service = get_service("kpi")
+    try:
+        curve = calibration.parse_curve(args.curve)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    result = service.calibrate(args.year, curve, args.weight)
+    if result.empty:
+        print(f"{args.year} 年沒有績效評估記錄。")
+        return 1
+    print(calibration.distribution(result, curve).to_string())
+    if args.output:
+        result.to_csv(args.output, index=False, encoding="utf-8-sig")
+        print(f"校準結果已寫入 {args.output}")
+    if args.apply:
+        updated = service.apply_calibration(result, args.year, args.curve)
+        print(f"已寫回 {len(updated)} 筆績效記錄。")
+    return 0
+
+def cmd_backfill(args):
+    service = get_service("em")
+    before = len(service.registry)
+    result = service.backfill()
+    for name, count in result.items():
+        print(f"{name}: {count}")
+    print(f"新建員工 {len(service.registry) - before} 位。")
+    return 0
+
+def cmd_logs(args):
+    entries, _ = get_service(args.module).log_page(page_size=args.limit)
+    for entry in entries:
+        print(f"{entry.get('timestamp', '')}  {entry.get('action', '')}  {entry.get('details', '')}")
+    return 0
+
+def cmd_reminders(args):
+    service = get_service("hrp")
+    reminders = service.reminders(days=args.days)
+    entries = {e['id']: e for e in service.records()}
+    for r in reminders:
+        print(f"{r['date']}  {service.reminder_title(r, entries)}")
+    if args.ics:
+        with open(args.ics, "wb") as f:
+            f.write(service.ics(reminders))
+        print(f"已寫入 {args.ics}")
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="HRM 批次作業",
+        epilog="選用套件 (requirements-extra.txt)：pyarrow 提供 Parquet 匯出，openpyxl 提供 .xlsx 匯入，"
+               "reportlab 提供頁面上的 PDF 證書；未安裝時這些功能停用，其餘照常運作。")
+    sub = parser.add_subparsers(dest="command", required=True)
+    modules = sorted(SERVICES)
+
+    p = sub.add_parser("import", help="由 CSV/Excel 批次匯入")
+    p.add_argument("module", choices=modules)
+    p.add_argument("file", help="CSV 或 .xlsx (xlsx 需要安裝 openpyxl，見 requirements-extra.txt)")
+    p.add_argument("--dry-run", action="store_true", help="只驗證不寫入")
+    p.add_argument("--show-errors", type=int, default=20)
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("export", help="匯出資料集")
+    p.add_argument("module", choices=modules)
+    p.add_argument("--dataset", help="預設為模組的主資料集")
+    p.add_argument("--format", choices=["json", "csv", "parquet"], default="json",
+                   help="parquet 需要安裝 pyarrow (requirements-extra.txt)")
+    p.add_argument("--gzip", action="store_true")
+    p.add_argument("-o", "--output", help="輸出檔案或目錄")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("analytics", help="顯示模組摘要統計")
+    p.add_argument("module", choices=modules)
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(func=cmd_analytics)
+
+    p = sub.add_parser("payroll", help="計算並保存一個月份的薪資")
+    p.add_argument("--month", required=True, help="YYYY-MM")
+    p.set_defaults(func=cmd_payroll)
+
+    p = sub.add_parser("calibrate", help="年度績效校準")
+    p.add_argument("--year", required=True)
+    p.add_argument("--curve", default="10/20/40/20/10")
+    p.add_argument("--weight", type=float, default=None, help="分數權重 (其餘為目標完成率)")
+    p.add_argument("--apply", action="store_true", help="將等第寫回績效記錄")
+    p.add_argument("-o", "--output", help="校準結果 CSV")
+    p.set_defaults(func=cmd_calibrate)
+
+    p = sub.add_parser("backfill-employees", help="既有記錄依姓名連結員工主檔")
+    p.set_defaults(func=cmd_backfill)
+
+    p = sub.add_parser("logs", help="顯示操作日誌")
+    p.add_argument("module", choices=modules)
+    p.add_argument("--limit", type=int, default=50, help="顯示最近幾筆 (由新到舊)")
+    p.set_defaults(func=cmd_logs)
+
+    p = sub.add_parser("reminders", help="人力規劃期限提醒")
+    p.add_argument("--days", type=int, default=30)
+    p.add_argument("--ics", help="另存為 iCal 檔")
+    p.set_defaults(func=cmd_reminders)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except (ValueError, OSError) as e:
+        print(f"錯誤：{e}", file=sys.stderr)
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
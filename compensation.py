@@ -1,205 +1,185 @@
-
 # compensation.py — 完整增強版 C&B 模組，包含持久化、日誌、美化及創意功能
+# 業務邏輯見 services.CompensationService，本檔只負責介面
+import os
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-from datetime import datetime
-import json
-import os
-import uuid
-
-DATA_FILE = "comp_data.json"
-LOG_FILE = "comp_logs.json"
-
-# -------------------- 檔案 I/O --------------------
-def load_json(filename):
-    if os.path.exists(filename):
-        with open(filename, "r", encoding="utf-8") as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return []
-    return []
-
-def save_json(filename, data):
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+from store import ConflictError
+from components import seen_version, forget_version, log_viewer, paginated_table, export_button, import_panel, quantile_panel
+import payroll
+from services import get_service
 
-# -------------------- Session 初始化 --------------------
-def initialize_session_state():
-    st.session_state.setdefault('comp', load_json(DATA_FILE))
-    st.session_state.setdefault('comp_logs', load_json(LOG_FILE))
-    st.session_state.setdefault('last_updated', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-
-# -------------------- 日誌記錄 --------------------
-def log_action(action, details):
-    entry = {
-        'id': str(uuid.uuid4()),
-        'action': action,
-        'details': details,
-        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }
-    st.session_state.comp_logs.append(entry)
-    save_json(LOG_FILE, st.session_state.comp_logs)
+# -------------------- 共享儲存 --------------------
+service = get_service("comp")
+store = service.store
+DATA_FILE = service.data_file
+LOG_FILE = service.log_file
 
 # -------------------- 基本 CRUD 功能 --------------------
 def view_compensation():
     st.header("📋 薪酬福利記錄")
-    st.write(f"最後更新：{st.session_state.last_updated}")
-    df = pd.DataFrame(st.session_state.comp)
-    if df.empty:
+    st.write(f"最後更新：{store.updated_at(DATA_FILE)}")
+    records = store.records(DATA_FILE)
+    if not records:
         st.info("目前沒有薪酬記錄。")
         return
     # 搜尋與篩選
     kw = st.text_input("🔍 搜尋員工 (姓名)")
+    where = []
     if kw:
-        df = df[df['emp'].str.contains(kw, case=False)]
-    year_options = ['全部'] + sorted(df['created_at'].str[:4].unique().tolist())
+        where.append(('emp', 'contains', kw))
+    year_options = ['全部'] + sorted({str(r.get('created_at', ''))[:4] for r in records})
     y = st.selectbox("按年度篩選", year_options)
     if y != '全部':
-        df = df[df['created_at'].str.startswith(y)]
-    st.dataframe(df)
+        where.append(('created_at', 'prefix', y))
+    paginated_table(DATA_FILE, "comp_view", where, ['emp', 'salary', 'bonus', 'total', 'created_at'])
     # 下載按鈕
-    json_str = json.dumps(st.session_state.comp, ensure_ascii=False, indent=2)
-    st.download_button(
-        label="Download Compensation Data (JSON)",
-        data=json_str,
-        file_name="comp_data.json",
-        mime="application/json"
-    )
+    export_button(DATA_FILE, "comp_data", "Download Compensation Data")
 def add_compensation():
     st.header("🆕 新增薪酬福利記錄")
     with st.form("form_add"):
         emp = st.text_input("員工姓名")
+        department = st.text_input("部門")
         salary = st.number_input("月薪", min_value=0, step=1000)
         bonus = st.number_input("獎金", min_value=0, step=500)
         benefits = st.text_area("福利明細")
         submit = st.form_submit_button("提交")
     if submit:
-        if not emp.strip():
-            st.error("員工姓名不可為空。")
-        else:
-            entry = {
-                'id': str(uuid.uuid4()),
-                'emp': emp,
-                'salary': salary,
-                'bonus': bonus,
-                'total': salary + bonus,
-                'benefits': benefits,
-                'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
-            st.session_state.comp.append(entry)
-            save_json(DATA_FILE, st.session_state.comp)
-            log_action("新增薪酬", f"{emp} - {entry['total']}")
-            st.success("薪酬記錄新增成功！")
+        try:
+            service.create({'emp': emp, 'department': department, 'salary': salary,
+                            'bonus': bonus, 'benefits': benefits})
+        except ValueError as e:
+            st.error(str(e))
+            return
+        st.success("薪酬記錄新增成功！")
 
 def edit_compensation():
     st.header("✏️ 修改薪酬福利記錄")
-    if not st.session_state.comp:
+    records = store.records(DATA_FILE)
+    if not records:
         st.info("無可修改記錄。")
         return
-    opts = {f"{c['emp']} - {c['total']}": c for c in st.session_state.comp}
+    opts = {f"{c['emp']} - {c['total']}": c for c in records}
     key = st.selectbox("選擇記錄", list(opts.keys()))
     c = opts[key]
+    version = seen_version(c)
     with st.form("form_edit"):
         emp = st.text_input("員工姓名", c['emp'])
+        department = st.text_input("部門", c.get('department', ''))
         salary = st.number_input("月薪", min_value=0, value=c['salary'], step=1000)
         bonus = st.number_input("獎金", min_value=0, value=c['bonus'], step=500)
         benefits = st.text_area("福利明細", c['benefits'])
         submit = st.form_submit_button("更新")
     if submit:
-        c.update({
-            'emp': emp,
-            'salary': salary,
-            'bonus': bonus,
-            'total': salary + bonus,
-            'benefits': benefits,
-            'updated_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        })
-        save_json(DATA_FILE, st.session_state.comp)
-        log_action("修改薪酬", f"{emp} - {c['total']}")
+        try:
+            service.update(c['id'], {'emp': emp, 'department': department, 'salary': salary,
+                                     'bonus': bonus, 'benefits': benefits}, expected_version=version)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        except ConflictError as e:
+            forget_version(c)
+            st.error(f"{e}，請重新確認後再送出。")
+            return
+        forget_version(c)
         st.success("薪酬記錄已更新！")
 
 def delete_compensation():
     st.header("🗑️ 刪除薪酬福利記錄")
-    if not st.session_state.comp:
+    records = store.records(DATA_FILE)
+    if not records:
         st.info("無可刪除記錄。")
         return
-    opts = {f"{c['emp']} - {c['total']}": c for c in st.session_state.comp}
+    opts = {f"{c['emp']} - {c['total']}": c for c in records}
     key = st.selectbox("選擇記錄", list(opts.keys()))
+    version = seen_version(opts[key])
     if st.button("確認刪除"):
-        st.session_state.comp = [c for c in st.session_state.comp if c['id'] != opts[key]['id']]
-        save_json(DATA_FILE, st.session_state.comp)
-        log_action("刪除薪酬", key)
+        try:
+            service.delete([opts[key]], expected_versions={opts[key]['id']: version})
+        except ConflictError as e:
+            forget_version(opts[key])
+            st.error(f"{e}，請重新確認後再送出。")
+            return
+        forget_version(opts[key])
         st.success("薪酬記錄已刪除！")
 
 # -------------------- 創意功能 --------------------
 def batch_delete():
     st.subheader("🔁 批量刪除記錄")
-    df = pd.DataFrame(st.session_state.comp)
-    if df.empty:
+    records = store.records(DATA_FILE)
+    if not records:
         st.info("無資料可批次刪除。")
         return
-    sels = st.multiselect("選擇要刪除的記錄", df['emp'] + ' - ' + df['total'].astype(str))
-    if st.button("執行批次刪除"):
-        for key in sels:
-            emp = key.split(' - ')[0]
-            st.session_state.comp = [c for c in st.session_state.comp if c['emp'] != emp]
-            log_action("批量刪除薪酬", emp)
-        save_json(DATA_FILE, st.session_state.comp)
-        st.success("批次刪除完成！")
+    sels = st.multiselect("選擇要刪除的記錄", records, format_func=lambda c: f"{c['emp']} - {c['total']}")
+    if st.button("執行批次刪除") and sels:
+        deleted = service.delete(sels)
+        st.success(f"批次刪除完成，共刪除 {deleted[DATA_FILE]} 筆！")
 
+def import_compensation():
+    st.subheader("📥 批次匯入薪酬記錄")
+    import_panel(service, "comp_import")
 
 def analytics():
     st.subheader("📊 薪酬福利分析")
-    df = pd.DataFrame(st.session_state.comp)
-    if df.empty:
+    summary = service.analytics()
+    if not summary['count']:
         st.info("無資料分析。")
         return
-    avg_salary = df['salary'].mean()
-    avg_bonus = df['bonus'].mean()
-    avg_total = df['total'].mean()
-    st.metric("平均月薪", f"{avg_salary:.0f}")
-    st.metric("平均獎金", f"{avg_bonus:.0f}")
-    st.metric("平均總薪", f"{avg_total:.0f}")
-    st.subheader("薪資分佈")
-    fig, ax = plt.subplots()
-    df['salary'].plot(kind='hist', bins=10, ax=ax)
-    ax.set_xlabel("月薪")
-    st.pyplot(fig)
+    numeric = summary['numeric']
+    c1, c2, c3 = st.columns(3)
+    c1.metric("平均月薪", f"{numeric['salary']['mean']:.0f}")
+    c2.metric("平均獎金", f"{numeric['bonus']['mean']:.0f}")
+    c3.metric("平均總薪", f"{numeric['total']['mean']:.0f}")
+    st.subheader("薪資分位數")
+    quantile_panel(DATA_FILE, {'salary': "月薪", 'bonus': "獎金", 'total': "總薪"}, "comp_quantiles")
+    st.subheader("各部門平均")
+    st.dataframe(pd.DataFrame.from_dict(summary['groups']['department'], orient='index'))
     # 下載按鈕
-    json_str = df.to_json(orient="records", force_ascii=False, indent=2)
-    st.download_button(
-        label="Download Analysis Data (JSON)",
-        data=json_str,
-        file_name="comp_analysis.json",
-        mime="application/json"
-    )
+    export_button(DATA_FILE, "comp_analysis", "Download Analysis Data")
+
+def payroll_run():
+    st.subheader("🧮 薪資計算")
+    if not store.records(DATA_FILE):
+        st.info("無薪酬資料可計算。")
+        return
+    st.caption("福利明細中的「項目: 金額」(以分號或換行分隔) 視為每月津貼；"
+               "選填欄位 age、start_date、end_date 用於 CPF 費率與按日比例；"
+               "獎金只在 bonus_month (未填時為記錄建立的月份) 發放。每位員工以最新一筆薪酬記錄計算。")
+    year, month = st.selectbox("計薪月份", payroll.month_options(), format_func=lambda ym: f"{ym[0]}-{ym[1]:02d}")
+    if st.button("執行薪資計算"):
+        with st.spinner("計算中…"):
+            run, summary = service.run_payroll(year, month)
+        st.success(f"{summary['month']} 薪資計算完成，共 {summary['headcount']} 人。")
+        st.dataframe(run.head(100))
+
+    runs = service.payroll_runs()
+    if runs:
+        st.subheader("歷次計算")
+        st.dataframe(pd.DataFrame(runs)[['month', 'headcount', 'gross', 'cpf_employee', 'cpf_employer',
+                                         'tax', 'net', 'employer_cost', 'created_at']])
+        sel = st.selectbox("下載計算明細", runs, format_func=lambda r: f"{r['month']} ({r['created_at']})")
+        if os.path.exists(sel['path']):
+            with open(sel['path'], "rb") as f:
+                st.download_button("Download Payroll Run (.csv.gz)", f, file_name=os.path.basename(sel['path']),
+                                   mime="application/gzip")
+        else:
+            st.warning("此次計算的明細檔已不存在。")
+
+    st.subheader("近 12 個月月度彙總")
+    if st.button("計算月度彙總"):
+        months = list(reversed(payroll.month_options(12)))
+        st.dataframe(service.monthly_totals(months).set_index('month'))
 
 def view_logs():
     st.subheader("📜 操作日誌")
-    df = pd.DataFrame(st.session_state.comp_logs)
-    if df.empty:
-        st.info("目前無日誌記錄。")
-    else:
-        st.dataframe(df)
-        # 下載按鈕
-        json_str = json.dumps(st.session_state.comp_logs, ensure_ascii=False, indent=2)
-        st.download_button(
-            label="Download Logs (JSON)",
-            data=json_str,
-            file_name="comp_logs.json",
-            mime="application/json"
-        )
+    log_viewer(LOG_FILE, "comp_logs", "目前無日誌記錄。")
 
 # -------------------- 主入口 --------------------
 def cb_module():
-    initialize_session_state()
     st.title("📌 薪酬與福利 (C&B) - ST Engineering")
     st.sidebar.title("功能選單")
     choice = st.sidebar.radio("請選擇操作", [
         "查看薪酬記錄", "新增薪酬記錄", "修改薪酬記錄", "刪除薪酬記錄",
-        "批量刪除", "薪酬分析", "查看日誌"
+        "批量刪除", "批次匯入", "薪資計算", "薪酬分析", "查看日誌"
     ])
 
     if choice == "查看薪酬記錄": view_compensation()
@@ -207,6 +187,8 @@ def cb_module():
     elif choice == "修改薪酬記錄": edit_compensation()
     elif choice == "刪除薪酬記錄": delete_compensation()
     elif choice == "批量刪除": batch_delete()
+    elif choice == "批次匯入": import_compensation()
+    elif choice == "薪資計算": payroll_run()
 
     elif choice == "薪酬分析": analytics()
     elif choice == "查看日誌": view_logs()
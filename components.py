@@ -0,0 +1,155 @@
+# components.py — 各模組共用的 Streamlit 介面元件
+import json
+import math
+import streamlit as st
+import pandas as pd
+import journal
+import export
+import importer
+from store import get_store
+from sketches import BANDS, get_quantiles
+
+# -------------------- 樂觀鎖 --------------------
+# 記住使用者第一次看到某筆記錄時的 _version；表單提交 (下一次重跑) 時交給 store 比對，
+# 期間若有其他使用者修改過，store 會拋出 ConflictError。
+def seen_version(record):
+    key = f"_seen_version:{record['id']}"
+    if key not in st.session_state:
+        st.session_state[key] = record.get('_version', 0)
+    return st.session_state[key]
+
+def forget_version(record):
+    st.session_state.pop(f"_seen_version:{record['id']}", None)
+
+# -------------------- 分頁記錄列表 --------------------
+# 篩選、排序與分頁都在儲存層完成，只把目前這一頁送到瀏覽器。
+# where 為 (欄位, 運算子, 值) 清單 (見 storage.match_where)；回傳符合條件的總筆數。
+# ranking 為全文搜尋得到、依相關度排序的 id 清單：只顯示這些記錄，未選排序欄位時依相關度排列。
+def paginated_table(name, key, where=(), sort_columns=(), page_sizes=(20, 50, 100), ranking=None):
+    c1, c2, c3 = st.columns(3)
+    sort_by = c1.selectbox("排序欄位", ["(預設)"] + list(sort_columns), key=f"{key}_sort")
+    descending = c2.checkbox("遞減排序", key=f"{key}_desc")
+    page_size = c3.selectbox("每頁筆數", list(page_sizes), key=f"{key}_size")
+    sort_by = None if sort_by == "(預設)" else sort_by
+
+    page_key = f"{key}_page"
+    page = st.session_state.get(page_key, 1)
+    store = get_store()
+    def fetch(page):
+        return store.page(name, where, sort_by, descending, page, page_size, ids=ranking)
+    rows, total = fetch(page)
+    if total == 0:
+        st.info("沒有符合條件的記錄。")
+        return 0
+    pages = math.ceil(total / page_size)
+    if page > pages:
+        page = st.session_state[page_key] = pages
+        rows, total = fetch(page)
+    st.dataframe(pd.DataFrame(rows))
+    st.number_input(f"頁數 (共 {pages} 頁，{total} 筆)", min_value=1, max_value=pages, step=1, key=page_key)
+    return total
+
+# -------------------- 匯出下載 --------------------
+# 使用者按下「準備下載」才產生檔案；同一資料版本的匯出檔會被快取並跨 session 重用
+FORMAT_LABELS = {'json': "JSON", 'csv': "CSV", 'parquet': "Parquet"}
+
+def export_button(name, file_stem, label="Download"):
+    c1, c2, c3 = st.columns(3)
+    formats = export.available_formats()
+    fmt = c1.selectbox("匯出格式", formats, format_func=FORMAT_LABELS.get, key=f"{file_stem}_fmt",
+                       help=None if 'parquet' in formats else export.PARQUET_HINT)
+    compress = c2.checkbox("gzip 壓縮", key=f"{file_stem}_gz", disabled=fmt == 'parquet')
+    requested = f"{file_stem}_export"
+    if c3.button("準備下載", key=f"{file_stem}_prepare"):
+        st.session_state[requested] = True
+    if st.session_state.get(requested):
+        path, file_name, mime = export.export_file(name, fmt, compress, file_stem)
+        with open(path, "rb") as f:
+            st.download_button(label=label, data=f, file_name=file_name, mime=mime,
+                               key=f"{file_stem}_download")
+
+# -------------------- 批次匯入 --------------------
+# 上傳後先驗證並列出錯誤列；使用者確認後，通過驗證的記錄以一次交易寫入並只記一筆日誌。
+# 回傳本次寫入的記錄 (未寫入時為 None)，呼叫端可據此建立從屬資料。
+# 驗證與寫入交給模組的服務 (services.Service.prepare_import / commit_import)
+def import_panel(service, key):
+    schema = service.import_schema
+    required = [f for f, spec in schema.items() if spec.get('required')]
+    st.caption(f"欄位：{', '.join(schema)}（必填：{', '.join(required) or '無'}）")
+    types = importer.available_types()
+    if 'xlsx' in types:
+        upload = st.file_uploader("上傳 CSV / Excel 檔", type=types, key=f"{key}_upload")
+    else:
+        upload = st.file_uploader("上傳 CSV 檔", type=types, key=f"{key}_upload", help=importer.XLSX_HINT)
+    if upload is None:
+        return None
+    records, errors = service.prepare_import(upload, upload.name)
+    c1, c2 = st.columns(2)
+    c1.metric("可匯入筆數", len(records))
+    c2.metric("錯誤筆數", len({row for row, _, _ in errors}))
+    if errors:
+        st.dataframe(pd.DataFrame(sorted(errors), columns=["列號", "欄位", "錯誤"]))
+    if records and st.button(f"確認匯入 {len(records)} 筆", key=f"{key}_commit"):
+        inserted = service.commit_import(records, upload.name)
+        st.success(f"已匯入 {len(inserted)} 筆記錄。")
+        return inserted
+    return None
+
+# -------------------- 分位數分佈 --------------------
+# 以 sketches.py 的分區草圖繪製：可依年度/部門篩選，顯示各部門分位帶與直方圖，不需讀取原始記錄
+def quantile_panel(name, fields, key, bins=10):
+    index = get_quantiles(name)
+    parts = index.partitions()
+    if not parts:
+        return
+    c1, c2, c3 = st.columns(3)
+    field = c1.selectbox("欄位", list(fields), format_func=fields.get, key=f"{key}_field")
+    years = sorted({y for _, y in parts if y}, reverse=True)
+    year = c2.selectbox("年度", [None] + years, format_func=lambda y: y or "全部", key=f"{key}_year")
+    departments = sorted({d for d, _ in parts})
+    department = c3.selectbox("部門", [None] + departments, format_func=lambda d: "全部" if d is None else (d or "(未填)"),
+                              key=f"{key}_department")
+    sketch = index.sketch(field, department=department, year=year)
+    if not sketch.n:
+        st.info("所選範圍無資料。")
+        return
+    cols = st.columns(len(BANDS))
+    for col, (q, value) in zip(cols, sketch.quantiles().items()):
+        col.metric(f"P{int(q * 100)}", f"{value:,.0f}" if value >= 100 else f"{value:,.1f}")
+    hist = sketch.histogram(bins)
+    st.bar_chart(pd.Series([c for *_, c in hist], index=[f"{lo:,.0f}–{hi:,.0f}" for lo, hi, _ in hist], name="人數"))
+    bands = index.bands(field, by='department', year=year)
+    table = pd.DataFrame.from_dict(bands, orient='index')
+    table.columns = ['筆數'] + [f"P{int(q * 100)}" for q in BANDS]
+    table.index = [d or "(未填)" for d in table.index]
+    st.dataframe(table)
+
+# -------------------- 分頁日誌檢視 --------------------
+# 依時間範圍與頁碼只讀取需要的日誌分段；下載按鈕只包含目前這一頁
+def log_viewer(log_path, file_name, empty_text="無日誌記錄。", page_size=50):
+    c1, c2 = st.columns(2)
+    start_date = c1.date_input("起始日期", value=None, key=f"{file_name}_start")
+    end_date = c2.date_input("結束日期", value=None, key=f"{file_name}_end")
+    start = f"{start_date} 00:00:00" if start_date else None
+    end = f"{end_date} 23:59:59" if end_date else None
+
+    page_key = f"{file_name}_page"
+    page = st.session_state.get(page_key, 1)
+    rows, total = journal.read_page(log_path, page, page_size, start, end)
+    if total == 0:
+        st.info(empty_text)
+        return
+    pages = math.ceil(total / page_size)
+    if page > pages:
+        page = st.session_state[page_key] = pages
+        rows, total = journal.read_page(log_path, page, page_size, start, end)
+    st.dataframe(pd.DataFrame(rows))
+    st.number_input(f"頁數 (共 {pages} 頁，{total} 筆)", min_value=1, max_value=pages, step=1, key=page_key)
+    # 下載按鈕
+    json_str = json.dumps(rows, ensure_ascii=False, indent=2)
+    st.download_button(
+        label="Download Logs (JSON)",
+        data=json_str,
+        file_name=f"{file_name}_page{page}.json",
+        mime="application/json"
+    )
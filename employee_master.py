@@ -0,0 +1,185 @@
+# employee_master.py — 員工主檔模組：員工名冊、新增/修改員工、360° 員工檔案與既有記錄同步
+# 業務邏輯見 services.EmployeeService，本檔只負責介面
+import streamlit as st
+import pandas as pd
+from store import ConflictError
+from components import seen_version, forget_version, log_viewer, paginated_table, export_button
+from employees import EMPLOYEE_FILE, LINKED, STATUSES, normalize_name
+from relations import get_group_index
+from services import get_service
+
+# -------------------- 共享儲存 --------------------
+service = get_service("em")
+store = service.store
+LOG_FILE = service.log_file
+registry = service.registry
+sessions = get_group_index("td_attendance.json", 'id')
+courses = get_group_index("td_data.json", 'id')
+employee_label = service.describe
+
+# -------------------- 員工名冊 --------------------
+def view_employees():
+    st.header("📋 員工名冊")
+    st.write(f"最後更新：{store.updated_at(EMPLOYEE_FILE)}")
+    if not len(registry):
+        st.info("目前沒有員工資料，可先新增員工或由「同步既有記錄」建立。")
+        return
+    kw = st.text_input("🔍 搜尋 (姓名 / 員工編號 / 部門)")
+    ranking = service.search(kw) if kw.strip() else None
+    where = []
+    status = st.selectbox("狀態", ["全部"] + STATUSES)
+    if status != "全部":
+        where.append(('status', '=', status))
+    paginated_table(EMPLOYEE_FILE, "em_view", where, ['emp_no', 'name', 'department', 'status', 'created_at'], ranking=ranking)
+    export_button(EMPLOYEE_FILE, "employees", "Download Employees")
+
+def add_employee():
+    st.header("🆕 新增員工")
+    with st.form("form_add"):
+        name = st.text_input("姓名")
+        department = st.text_input("部門")
+        status = st.selectbox("狀態", STATUSES)
+        submit = st.form_submit_button("提交")
+    if submit:
+        same = registry.find(name)
+        try:
+            entry = service.create({'name': name, 'department': department, 'status': status})
+        except ValueError as e:
+            st.error(str(e))
+            return
+        if same:
+            st.warning(f"已有同名員工：{', '.join(employee_label(e) for e in same)}，仍另建一筆。")
+        st.success(f"已新增員工 {entry['emp_no']}！")
+
+# 更名時一併更新各模組記錄中的姓名欄位 (以 emp_id 找出記錄，每個資料集寫入一次)
+def edit_employee():
+    st.header("✏️ 修改員工")
+    employees = registry.all()
+    if not employees:
+        st.info("無可修改的員工。")
+        return
+    e = st.selectbox("選擇員工", employees, format_func=employee_label)
+    version = seen_version(e)
+    with st.form("form_edit"):
+        name = st.text_input("姓名", e['name'])
+        department = st.text_input("部門", e.get('department', ''))
+        status = st.selectbox("狀態", STATUSES, index=STATUSES.index(e['status']) if e.get('status') in STATUSES else 0)
+        submit = st.form_submit_button("更新")
+    if submit:
+        try:
+            service.update(e['id'], {'name': name, 'department': department, 'status': status}, expected_version=version)
+        except ValueError as err:
+            st.error(str(err))
+            return
+        except ConflictError as err:
+            forget_version(e)
+            st.error(f"{err}，請重新確認後再送出。")
+            return
+        forget_version(e)
+        st.success("員工資料已更新！")
+
+# -------------------- 360° 員工檔案 --------------------
+def _table(records, columns):
+    df = pd.DataFrame(records)
+    return df[[c for c in columns if c in df.columns]]
+
+def employee_profile():
+    st.header("🧑‍💼 360° 員工檔案")
+    if not len(registry):
+        st.info("目前沒有員工資料。")
+        return
+    kw = st.text_input("🔍 搜尋員工 (姓名 / 員工編號)")
+    if kw.strip():
+        ids = service.search(kw, limit=50)
+        candidates = [registry.get(rid) for rid in ids if registry.get(rid)]
+    else:
+        candidates = registry.all()
+    if not candidates:
+        st.info("找不到符合的員工。")
+        return
+    e = st.selectbox("選擇員工", candidates, format_func=employee_label)
+    profile = service.profile(e['id'])
+    comp = sorted(profile["comp_data.json"], key=lambda r: r.get('created_at', ''))
+    kpi = sorted(profile["kpi_data.json"], key=lambda r: r.get('created_at', ''))
+    er = profile["er_data.json"]
+    attendance = profile["td_attendees.json"]
+    certs = profile["td_certificates.json"]
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("員工編號", e.get('emp_no', ''))
+    c2.metric("部門", e.get('department') or "—")
+    c3.metric("狀態", e.get('status', ''))
+    c4.metric("建檔日期", str(e.get('created_at', ''))[:10])
+
+    tabs = st.tabs([f"薪酬 ({len(comp)})", f"績效 ({len(kpi)})", f"訓練 ({len(attendance)})",
+                    f"證書 ({len(certs)})", f"員工關係 ({len(er)})"])
+    with tabs[0]:
+        if comp:
+            st.metric("最近月薪 / 總薪", f"{comp[-1].get('salary', 0):,} / {comp[-1].get('total', 0):,}")
+            st.dataframe(_table(comp, ['salary', 'bonus', 'total', 'benefits', 'created_at']))
+        else:
+            st.info("無薪酬記錄。")
+    with tabs[1]:
+        if kpi:
+            st.metric("最近績效分數", kpi[-1].get('score'))
+            st.line_chart(pd.DataFrame(kpi).set_index('created_at')[['score', 'goal_rate']])
+            st.dataframe(_table(kpi, ['score', 'goal_rate', 'comments', 'created_at']))
+        else:
+            st.info("無績效記錄。")
+    with tabs[2]:
+        if attendance:
+            rows = []
+            for a in attendance:
+                session = sessions.record(a.get('session_id')) or {}
+                course = courses.record(a.get('course_id')) or {}
+                rows.append({'課程': course.get('course', '(已刪除課程)'), '日期': session.get('date', ''),
+                             '狀態': a.get('status'), '標記時間': a.get('marked_at')})
+            st.dataframe(pd.DataFrame(rows).sort_values('日期'))
+        else:
+            st.info("無出席記錄。")
+    with tabs[3]:
+        if certs:
+            st.dataframe(pd.DataFrame([{'課程': (courses.record(c.get('course_id')) or {}).get('course', '(已刪除課程)'),
+                                        '證書編號': c['id'], '發證日期': c.get('date')} for c in certs]))
+        else:
+            st.info("無證書。")
+    with tabs[4]:
+        if er:
+            st.dataframe(_table(er, ['category', 'urgency', 'issue', 'created_at']))
+        else:
+            st.info("無具名的申訴/意見。")
+
+# -------------------- 既有記錄同步 --------------------
+def sync_records():
+    st.header("🔗 同步既有記錄")
+    st.caption("為尚未連結員工主檔的薪酬、績效、員工關係、出席與證書記錄，依姓名補上員工編號；"
+               "主檔中沒有的姓名會自動建立員工。匿名記錄不連結。")
+    pending = {name: sum(1 for r in store.records(name) if not r.get('emp_id') and normalize_name(r.get(field)) not in ("", "匿名"))
+               for name, field in LINKED.items()}
+    st.dataframe(pd.Series(pending, name="待連結筆數"))
+    if st.button("開始同步") and any(pending.values()):
+        before = len(registry)
+        result = service.backfill()
+        st.success(f"已連結 {sum(result.values())} 筆記錄，新建員工 {len(registry) - before} 位。")
+
+def view_logs():
+    st.subheader("📜 操作日誌")
+    log_viewer(LOG_FILE, "em_logs", "無日誌記錄。")
+
+# -------------------- 主入口 --------------------
+def em_module():
+    st.title("🧑‍💼 員工主檔 - ST Engineering")
+    st.sidebar.title("功能選單")
+    choice = st.sidebar.radio("請選擇操作", [
+        "員工名冊", "新增員工", "修改員工", "360° 員工檔案", "同步既有記錄", "查看日誌"
+    ])
+
+    if choice == "員工名冊": view_employees()
+    elif choice == "新增員工": add_employee()
+    elif choice == "修改員工": edit_employee()
+    elif choice == "360° 員工檔案": employee_profile()
+    elif choice == "同步既有記錄": sync_records()
+    elif choice == "查看日誌": view_logs()
+
+# 供 main.py 匯入
+__all__ = ["em_module"]
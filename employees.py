@@ -0,0 +1,200 @@
+# employees.py — 員工主檔：穩定的員工 id、以 id 與正規化姓名建立的雜湊索引
+#
+# 各模組原本只以自由輸入的姓名 (emp / name) 識別員工，跨模組查詢需掃描並比對每份清單。
+# 現在薪酬、績效、員工關係、出席與證書記錄都另存 emp_id 指向本主檔：
+# 以 id 查員工、以姓名查 id 都是 O(1)，各模組再以 relations.GroupIndex(emp_id) 取回該員工的記錄。
+# 本模組不匯入 streamlit；介面見 employee_master.py。
+import threading
+import unicodedata
+import uuid
+from datetime import datetime
+from store import DerivedIndex, get_store
+
+EMPLOYEE_FILE = "employees.json"
+ANONYMOUS = '匿名'
+STATUSES = ["在職", "留職停薪", "離職"]
+
+# 參照員工主檔的資料集 → 記錄中的姓名欄位
+LINKED = {
+    "comp_data.json": 'emp',
+    "kpi_data.json": 'emp',
+    "er_data.json": 'emp',
+    "td_attendees.json": 'emp',
+    "td_certificates.json": 'name',
+}
+
+# 全形/半形、大小寫與多餘空白不影響比對
+def normalize_name(name):
+    text = unicodedata.normalize('NFKC', str(name or ""))
+    return " ".join(text.split()).casefold()
+
+class EmployeeRegistry(DerivedIndex):
+    def __init__(self):
+        self._records = {}
+        self._by_name = {}
+        self._by_no = {}
+        self._lock = threading.Lock()
+
+    def _add(self, record):
+        rid = record.get('id')
+        if rid is None:
+            return
+        self._remove(rid)
+        self._records[rid] = record
+        self._by_name.setdefault(normalize_name(record.get('name')), set()).add(rid)
+        no = record.get('emp_no')
+        if no:
+            self._by_no[no] = rid
+
+    def _remove(self, rid):
+        record = self._records.pop(rid, None)
+        if record is None:
+            return
+        key = normalize_name(record.get('name'))
+        ids = self._by_name.get(key)
+        if ids is not None:
+            ids.discard(rid)
+            if not ids:
+                del self._by_name[key]
+        self._by_no.pop(record.get('emp_no'), None)
+
+    # store 的 listener：ops 為 None 時整份重建，否則只處理本次異動的記錄
+    def apply(self, records, ops):
+        with self._lock:
+            if ops is None:
+                self._records, self._by_name, self._by_no = {}, {}, {}
+                for r in records:
+                    self._add(r)
+                return
+            for op, payload in ops:
+                if op == 'delete':
+                    self._remove(payload)
+                else:
+                    self._add(payload)
+
+    def get(self, emp_id):
+        self.refresh()
+        return self._records.get(emp_id)
+
+    def by_no(self, emp_no):
+        self.refresh()
+        return self._records.get(self._by_no.get(emp_no))
+
+    # 同名員工依員工編號排序
+    def find(self, name):
+        self.refresh()
+        with self._lock:
+            ids = self._by_name.get(normalize_name(name), ())
+            return sorted((self._records[rid] for rid in ids), key=lambda r: r.get('emp_no', ''))
+
+    # 姓名 → emp_id；同名時取員工編號最小者，找不到回傳 None
+    def resolve(self, name):
+        matches = self.find(name)
+        return matches[0]['id'] if matches else None
+
+    def all(self):
+        self.refresh()
+        with self._lock:
+            return sorted(self._records.values(), key=lambda r: r.get('emp_no', ''))
+
+    def __len__(self):
+        self.refresh()
+        return len(self._records)
+
+# -------------------- 全程序共用的員工主檔 --------------------
+_registries = {}
+_registry_lock = threading.Lock()
+
+def get_registry(store=None):
+    store = store or get_store()
+    with _registry_lock:
+        registry = _registries.get(store)
+        if registry is None:
+            registry = _registries[store] = EmployeeRegistry()
+            registry.attach(store, EMPLOYEE_FILE)
+        return registry
+
+def new_employee(name, no, department="", status=STATUSES[0]):
+    return {
+        'id': str(uuid.uuid4()),
+        'emp_no': no,
+        'name': " ".join(unicodedata.normalize('NFKC', str(name)).split()),
+        'name_key': normalize_name(name),
+        'department': department,
+        'status': status,
+        'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+def _number(no):
+    digits = "".join(ch for ch in str(no or "") if ch.isdigit())
+    return int(digits) if digits else 0
+
+# 新增員工：entries 為 [(姓名, 部門)]。員工編號與同名檢查都在後端的檔案鎖 / 寫入交易內
+# 依磁碟上的最新主檔決定，多個程序同時新增也不會重複編號或重複建立同名員工。
+# reuse=True 時主檔已有的姓名沿用 (同名取員工編號最小者)，否則一律新建。
+# 回傳 ({正規化姓名: emp_id}, 新增的記錄)；空白姓名略過
+def create_employees(entries, reuse=True, status=STATUSES[0], store=None):
+    ids = {}
+
+    def build(current):
+        ids.clear()
+        existing = {}
+        for r in sorted(current, key=lambda r: r.get('emp_no', '')):
+            existing.setdefault(r.get('name_key') or normalize_name(r.get('name')), r.get('id'))
+        base = max((_number(r.get('emp_no')) for r in current), default=0)
+        new = []
+        for name, department in entries:
+            key = normalize_name(name)
+            if not key:
+                continue
+            if reuse and key in existing:
+                ids[key] = existing[key]
+                continue
+            record = new_employee(name, f"E{base + len(new) + 1:05d}", department, status)
+            new.append(record)
+            existing.setdefault(key, record['id'])
+            ids[key] = record['id']
+        return new
+
+    new = (store or get_store()).insert_locked(EMPLOYEE_FILE, build)
+    return ids, new
+
+# 姓名清單 → {正規化姓名: emp_id}；主檔中沒有的姓名以一次寫入新增。匿名與空白略過
+def ensure_employees(names, department="", store=None):
+    registry = get_registry(store)
+    registry.refresh(force=True)
+    ids, missing = {}, {}
+    for name in names:
+        key = normalize_name(name)
+        if not key or key == ANONYMOUS or key in ids or key in missing:
+            continue
+        rid = registry.resolve(key)
+        if rid:
+            ids[key] = rid
+        else:
+            missing[key] = name
+    if missing:
+        ids.update(create_employees([(name, department) for name in missing.values()], store=store)[0])
+    return ids
+
+def link_employee(name, department="", store=None):
+    return ensure_employees([name], department, store).get(normalize_name(name))
+
+# 為記錄補上 emp_id (就地修改並回傳)；field 為記錄中的姓名欄位
+def link_records(records, field='emp', store=None):
+    ids = ensure_employees({r.get(field) for r in records}, store=store)
+    for r in records:
+        r['emp_id'] = ids.get(normalize_name(r.get(field)))
+    return records
+
+# 既有記錄 (主檔建立前) 依姓名補上 emp_id；每個資料集只寫入一次。回傳 {資料集: 補上筆數}
+def backfill(datasets=None, store=None):
+    store = store or get_store()
+    result = {}
+    for name, field in (datasets or LINKED).items():
+        pending = [r for r in store.records(name) if not r.get('emp_id')]
+        ids = ensure_employees({r.get(field) for r in pending}, store=store)
+        changes = {r['id']: {'emp_id': ids[normalize_name(r.get(field))]}
+                   for r in pending if normalize_name(r.get(field)) in ids}
+        result[name] = len(store.update_each(name, changes))
+    return result
@@ -0,0 +1,129 @@
+# export.py — 下載用的匯出管線：按需產生、依資料版本快取、分塊串流寫出
+import csv
+import importlib.util
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import zlib
+from store import get_store
+
+CHUNK_SIZE = 5000
+
+MIME_TYPES = {
+    'json': "application/json",
+    'csv': "text/csv",
+    'parquet': "application/vnd.apache.parquet",
+}
+
+_cache = {}
+_lock = threading.Lock()
+_cache_dir = None
+
+# Parquet 需要 pyarrow 或 fastparquet (列於 requirements-extra.txt)，未安裝時不提供此格式
+PARQUET_HINT = "Parquet 匯出需要安裝 pyarrow (pip install -r requirements-extra.txt)"
+
+def available_formats():
+    formats = ['json', 'csv']
+    if importlib.util.find_spec("pyarrow") or importlib.util.find_spec("fastparquet"):
+        formats.append('parquet')
+    return formats
+
+# -------------------- 分塊產生器 --------------------
+def _chunks(records, size=CHUNK_SIZE):
+    for i in range(0, len(records), size):
+        yield records[i:i + size]
+
+# 精簡 JSON (無縮排)，每次只序列化一個區塊
+def iter_json(records):
+    yield b"["
+    first = True
+    for chunk in _chunks(records):
+        body = ",".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) for r in chunk)
+        if not first:
+            body = "," + body
+        first = False
+        yield body.encode("utf-8")
+    yield b"]"
+
+# CSV 欄位為所有記錄欄位的聯集 (依首次出現順序)；開頭加 BOM 讓 Excel 正確辨識中文
+def iter_csv(records):
+    columns = {}
+    for r in records:
+        for k in r:
+            columns.setdefault(k, None)
+    yield "\ufeff".encode("utf-8")
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=list(columns), extrasaction='ignore')
+    writer.writeheader()
+    for chunk in _chunks(records):
+        writer.writerows(chunk)
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def _write_parquet(records, path):
+    import pandas as pd
+    pd.DataFrame(list(records)).to_parquet(path, index=False)
+
+# -------------------- 快取 --------------------
+def _dir():
+    global _cache_dir
+    if _cache_dir is None:
+        _cache_dir = tempfile.mkdtemp(prefix="hrm-export-")
+    return _cache_dir
+
+# 依 (資料集, 版本, 格式, 是否壓縮) 快取匯出檔；資料變動後舊版本的檔案會被刪除。
+# 回傳 (檔案路徑, 下載檔名, MIME 類型)
+def export_file(name, fmt='json', compress=False, file_stem=None, store=None):
+    if fmt not in available_formats():
+        raise ValueError(PARQUET_HINT if fmt == 'parquet' else f"不支援的匯出格式：{fmt}")
+    file_stem = file_stem or os.path.splitext(os.path.basename(name))[0]
+    compress = compress and fmt != 'parquet'
+    store = store or get_store()
+    version, records = store.snapshot(name)
+    file_name = f"{file_stem}.{fmt}" + (".gz" if compress else "")
+    mime = "application/gzip" if compress else MIME_TYPES[fmt]
+    key = (store, name, fmt, compress)
+    with _lock:
+        cached = _cache.get(key)
+        if cached and cached[0] == version and os.path.exists(cached[1]):
+            return cached[1], file_name, mime
+        # 不同 store 的版本號各自遞增，檔名加上 store 識別避免互相覆蓋
+        base = f"{os.path.splitext(os.path.basename(name))[0]}-{id(store):x}"
+        path = os.path.join(_dir(), f"{base}-v{version}.{fmt}" + (".gz" if compress else ""))
+        tmp = path + ".tmp"
+        if fmt == 'parquet':
+            _write_parquet(records, tmp)
+        else:
+            chunks = iter_json(records) if fmt == 'json' else iter_csv(records)
+            if compress:
+                chunks = gzip_stream(chunks)
+            with open(tmp, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        os.replace(tmp, path)
+        if cached and cached[1] != path and os.path.exists(cached[1]):
+            os.remove(cached[1])
+        _cache[key] = (version, path)
+        return path, file_name, mime
+
+def clear_cache():
+    global _cache_dir
+    with _lock:
+        _cache.clear()
+        if _cache_dir:
+            shutil.rmtree(_cache_dir, ignore_errors=True)
+            _cache_dir = None
@@ -0,0 +1,34 @@
+# frames.py — 依資料版本快取的 pandas DataFrame，跨重跑與跨 session 共用
+import threading
+import pandas as pd
+from store import get_store
+
+# 轉換為專用型別的欄位：時間戳記轉 datetime、重複度高的文字欄轉 category
+DATETIME_COLUMNS = ('created_at', 'updated_at')
+CATEGORY_COLUMNS = ('department', 'category', 'position')
+
+_frames = {}
+_lock = threading.Lock()
+
+def build_frame(records):
+    df = pd.DataFrame(list(records))
+    for col in DATETIME_COLUMNS:
+        if col in df:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    for col in CATEGORY_COLUMNS:
+        if col in df:
+            df[col] = df[col].astype('category')
+    return df
+
+# 以 (資料集, 寫入版本) 為鍵，每次資料變動只建一次 DataFrame；每個資料集只保留最新版本。
+# 回傳的 DataFrame 由所有 session 共用，呼叫端只能讀取，需要修改時請先 .copy()。
+def get_frame(name, store=None):
+    store = store or get_store()
+    version, records = store.snapshot(name)
+    with _lock:
+        cached = _frames.get((store, name))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        df = build_frame(records)
+        _frames[(store, name)] = (version, df)
+        return df
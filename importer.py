@@ -0,0 +1,118 @@
+# importer.py — CSV/Excel 批次匯入：分塊讀取、向量化驗證、一次寫入
+#
+# schema 為 {欄位: 規格}，規格鍵值：
+#   type      'text' | 'int' | 'float' | 'date'   (預設 'text')
+#   required  是否必填                              (預設 False)
+#   min / max 數值範圍 (含端點)
+#   choices   允許的值
+#   default   缺值時的預設值
+# 驗證以整欄的 pandas 運算完成，不逐列迴圈；每個錯誤回報 (列號, 欄位, 訊息)，列號與試算表一致。
+import importlib.util
+import os
+import uuid
+from datetime import datetime
+import pandas as pd
+from store import get_store
+
+CHUNK_ROWS = 10000
+
+# Excel 需要 openpyxl (列於 requirements-extra.txt)，未安裝時只接受 CSV
+XLSX_HINT = "Excel 匯入需要安裝 openpyxl (pip install -r requirements-extra.txt)"
+
+def available_types():
+    types = ['csv']
+    if importlib.util.find_spec("openpyxl"):
+        types.append('xlsx')
+    return types
+
+# CSV 以 chunksize 串流讀取；xlsx 無法串流，整份讀入後再切塊。所有欄位先以文字讀入，型別轉換交給驗證。
+def read_chunks(file, file_name, chunk_rows=CHUNK_ROWS):
+    if os.path.splitext(file_name)[1].lower() == '.xlsx':
+        if 'xlsx' not in available_types():
+            raise ValueError(XLSX_HINT)
+        df = pd.read_excel(file, dtype=str)
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+        return
+    yield from pd.read_csv(file, dtype=str, chunksize=chunk_rows, encoding="utf-8-sig", skipinitialspace=True)
+
+def _convert(series, kind):
+    if kind in ('int', 'float'):
+        return pd.to_numeric(series, errors='coerce')
+    if kind == 'date':
+        return pd.to_datetime(series, errors='coerce')
+    return series
+
+# 回傳 (通過驗證的 DataFrame, 錯誤清單)
+def validate(df, schema):
+    df = df.rename(columns=lambda c: str(c).strip())
+    errors = []
+    bad = pd.Series(False, index=df.index)
+    # 試算表列號：標題佔第 1 列
+    row_numbers = df.index.to_series() + 2
+    out = pd.DataFrame(index=df.index)
+
+    def report(mask, field, message):
+        nonlocal bad
+        if mask.any():
+            errors.extend((int(n), field, message) for n in row_numbers[mask])
+            bad |= mask
+
+    for field, spec in schema.items():
+        kind = spec.get('type', 'text')
+        raw = df[field] if field in df else pd.Series(pd.NA, index=df.index)
+        raw = raw.astype("string").str.strip()
+        raw = raw.mask(raw == "")
+        if 'default' in spec:
+            raw = raw.fillna(str(spec['default']))
+        missing = raw.isna()
+        if spec.get('required'):
+            report(missing, field, "必填欄位為空")
+        values = _convert(raw, kind)
+        report(values.isna() & ~missing, field, f"無法轉換為 {kind}")
+        if kind == 'int':
+            report(values.notna() & (values % 1 != 0), field, "必須為整數")
+        if 'min' in spec:
+            report(values < spec['min'], field, f"不可小於 {spec['min']}")
+        if 'max' in spec:
+            report(values > spec['max'], field, f"不可大於 {spec['max']}")
+        if 'choices' in spec:
+            report(values.notna() & ~values.isin(spec['choices']), field, f"必須為 {'、'.join(map(str, spec['choices']))} 之一")
+        out[field] = values
+    accepted = out[~bad].copy()
+    for field, spec in schema.items():
+        if spec.get('type') == 'int':
+            accepted[field] = accepted[field].astype('Int64')
+    return accepted, errors
+
+# DataFrame 轉為 JSON 可序列化的記錄 (原生 int/float/str，缺值為 None)
+def to_records(df, schema):
+    df = df.copy()
+    for field, spec in schema.items():
+        if spec.get('type') == 'date':
+            df[field] = df[field].dt.strftime("%Y-%m-%d")
+    df = df.astype(object).where(df.notna(), None)
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    records = df.to_dict('records')
+    for r in records:
+        r['id'] = str(uuid.uuid4())
+        r['created_at'] = now
+    return records
+
+# 讀取並驗證整個檔案 (不寫入)。derive 可補上衍生欄位 (例如 total = salary + bonus)，
+# 以向量化方式作用於每個通過驗證的區塊。回傳 (待匯入記錄, 錯誤清單)
+def prepare_import(file, file_name, schema, derive=None, chunk_rows=CHUNK_ROWS):
+    records, errors = [], []
+    for chunk in read_chunks(file, file_name, chunk_rows):
+        accepted, chunk_errors = validate(chunk, schema)
+        errors.extend(chunk_errors)
+        if accepted.empty:
+            continue
+        if derive is not None:
+            accepted = derive(accepted)
+        records.extend(to_records(accepted, schema))
+    return records, errors
+
+# 通過驗證的記錄以一次交易寫入
+def commit_import(name, records, store=None):
+    return (store or get_store()).insert_many(name, records)
@@ -0,0 +1,235 @@
+# journal.py — 操作日誌的 append-only JSON Lines 寫入與分段串流讀取
+#
+# 每個日誌 (例如 hrp_logs.jsonl) 依月份切成分段：logs/hrp_logs/2025-06.jsonl，
+# 單一分段超過 HRM_LOG_SEGMENT_BYTES 時再切出 2025-06.1.jsonl、2025-06.2.jsonl…；
+# 過去月份的分段以 gzip 壓縮 (.jsonl.gz) 後不再變動。
+import gzip
+import json
+import logging
+import os
+import re
+import threading
+from datetime import datetime
+from persistence import append_lines, file_lock, get_writer
+
+logger = logging.getLogger(__name__)
+
+LOG_ROOT = os.environ.get("HRM_LOG_DIR", "logs")
+SEGMENT_BYTES = int(os.environ.get("HRM_LOG_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+
+_SEGMENT_RE = re.compile(r"^(\d{4}-\d{2})(?:\.(\d+))?\.jsonl(\.gz)?$")
+
+_state = {}
+_state_lock = threading.Lock()
+_counts = {}
+
+def log_dir(path):
+    base = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(LOG_ROOT, base)
+
+# 舊版日誌：整包 JSON 陣列 (xxx_logs.json) 與未分段的 xxx_logs.jsonl
+def legacy_paths(path):
+    paths = [path]
+    if path.endswith(".jsonl"):
+        paths.insert(0, path[:-1])
+    return paths
+
+# -------------------- 分段 --------------------
+def list_segments(path):
+    directory = log_dir(path)
+    if not os.path.isdir(directory):
+        return []
+    segments = []
+    for fname in os.listdir(directory):
+        m = _SEGMENT_RE.match(fname)
+        if m:
+            segments.append((m.group(1), int(m.group(2) or 0), os.path.join(directory, fname)))
+    segments.sort()
+    return segments
+
+def _segment_path(path, month, part):
+    suffix = f".{part}" if part else ""
+    return os.path.join(log_dir(path), f"{month}{suffix}.jsonl")
+
+def _open_segment(seg_path):
+    if seg_path.endswith(".gz"):
+        return gzip.open(seg_path, "rt", encoding="utf-8")
+    return open(seg_path, "r", encoding="utf-8")
+
+def _read_segment(seg_path):
+    entries = []
+    with _open_segment(seg_path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                # 程序中斷時可能留下半行，略過即可
+                continue
+    return entries
+
+# 舊檔中無法解析的行 (例如程序中斷留下的半行) 略過並記錄警告；原檔改名為 .migrated 保留
+def _read_legacy_lines(old, f):
+    entries = []
+    for n, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            logger.warning("%s 第 %d 行無法解析，已略過", old, n)
+            continue
+        if isinstance(entry, dict):
+            entries.append(entry)
+        else:
+            logger.warning("%s 第 %d 行不是日誌物件，已略過", old, n)
+    return entries
+
+def _migrate_legacy(path):
+    for old in legacy_paths(path):
+        if not os.path.exists(old):
+            continue
+        with file_lock(old):
+            if not os.path.exists(old):
+                continue
+            with open(old, "r", encoding="utf-8") as f:
+                if old.endswith(".jsonl"):
+                    entries = _read_legacy_lines(old, f)
+                else:
+                    try:
+                        entries = [e for e in json.load(f) if isinstance(e, dict)]
+                    except (json.JSONDecodeError, TypeError):
+                        logger.warning("%s 無法解析，未遷移任何日誌", old)
+                        entries = []
+            by_month = {}
+            for entry in entries:
+                month = str(entry.get('timestamp', ''))[:7] or datetime.now().strftime("%Y-%m")
+                by_month.setdefault(month, []).append(json.dumps(entry, ensure_ascii=False) + "\n")
+            os.makedirs(log_dir(path), exist_ok=True)
+            for month, lines in sorted(by_month.items()):
+                append_lines(_segment_path(path, month, 0), lines)
+            os.replace(old, old + ".migrated")
+
+def compress_old_segments(path, current_month=None):
+    current_month = current_month or datetime.now().strftime("%Y-%m")
+    # 先讓佇列中的日誌落盤，避免壓縮途中還有舊月份的追加
+    get_writer().flush()
+    for month, _, seg_path in list_segments(path):
+        if month >= current_month or seg_path.endswith(".gz"):
+            continue
+        with file_lock(seg_path):
+            if not os.path.exists(seg_path):
+                continue
+            with open(seg_path, "rb") as src, gzip.open(seg_path + ".gz.tmp", "wb") as dst:
+                for chunk in iter(lambda: src.read(1024 * 1024), b""):
+                    dst.write(chunk)
+            os.replace(seg_path + ".gz.tmp", seg_path + ".gz")
+            os.remove(seg_path)
+
+def _rotate_async(path, month):
+    threading.Thread(target=compress_old_segments, args=(path, month),
+                     name="hrm-log-rotate", daemon=True).start()
+
+# 目前寫入的分段 (月份, 序號, 約略大小)；每個程序第一次寫入時由目錄內容初始化
+def _current_segment(path, month, size):
+    with _state_lock:
+        state = _state.get(path)
+        if state is None:
+            _migrate_legacy(path)
+            os.makedirs(log_dir(path), exist_ok=True)
+            parts = [(p, sp) for m, p, sp in list_segments(path) if m == month and not sp.endswith(".gz")]
+            part, seg_path = max(parts) if parts else (0, None)
+            written = os.path.getsize(seg_path) if seg_path else 0
+            state = _state[path] = [month, part, written]
+            _rotate_async(path, month)
+        elif state[0] != month:
+            state[:] = [month, 0, 0]
+            _rotate_async(path, month)
+        elif state[2] + size > SEGMENT_BYTES:
+            state[1] += 1
+            state[2] = 0
+        state[2] += size
+        return _segment_path(path, state[0], state[1])
+
+# -------------------- 寫入 --------------------
+# 每次記錄只在目前分段的檔尾追加一行，成本與既有日誌大小無關；實際寫入由背景佇列批次完成
+def append_entry(path, entry):
+    line = json.dumps(entry, ensure_ascii=False) + "\n"
+    month = str(entry.get('timestamp', ''))[:7] or datetime.now().strftime("%Y-%m")
+    get_writer().put_lines(_current_segment(path, month, len(line.encode("utf-8"))), [line])
+
+# -------------------- 讀取 --------------------
+def _month_bounds(month):
+    return f"{month}-01 00:00:00", f"{month}-31 23:59:59"
+
+def _overlaps(month, start, end):
+    lo, hi = _month_bounds(month)
+    return (start is None or hi >= start) and (end is None or lo <= end)
+
+def _inside(month, start, end):
+    lo, hi = _month_bounds(month)
+    return (start is None or lo >= start) and (end is None or hi <= end)
+
+def _in_range(entry, start, end):
+    ts = str(entry.get('timestamp', ''))
+    return (start is None or ts >= start) and (end is None or ts <= end)
+
+# 只挑出與時間範圍重疊的分段；start/end 為 "YYYY-MM-DD HH:MM:SS" 字串
+def _segments_for(path, start, end):
+    get_writer().flush()
+    with _state_lock:
+        if path not in _state:
+            _migrate_legacy(path)
+    return [s for s in list_segments(path) if _overlaps(s[0], start, end)]
+
+def iter_entries(path, start=None, end=None):
+    for month, _, seg_path in _segments_for(path, start, end):
+        for entry in _read_segment(seg_path):
+            if _in_range(entry, start, end):
+                yield entry
+
+def read_entries(path, limit=None, start=None, end=None):
+    entries = []
+    for entry in iter_entries(path, start, end):
+        entries.append(entry)
+        if limit is not None and len(entries) >= limit:
+            break
+    return entries
+
+# 分段筆數快取：壓縮後的分段不再變動，只需計算一次
+def _segment_count(seg_path):
+    st = os.stat(seg_path)
+    sig = (st.st_mtime_ns, st.st_size)
+    cached = _counts.get(seg_path)
+    if cached and cached[0] == sig:
+        return cached[1]
+    count = len(_read_segment(seg_path))
+    _counts[seg_path] = (sig, count)
+    return count
+
+# 由新到舊分頁；完整落在時間範圍內的分段只取快取筆數，不讀內容。
+# 回傳 (本頁日誌, 範圍內總筆數)
+def read_page(path, page=1, page_size=50, start=None, end=None):
+    skip = (page - 1) * page_size
+    rows, total = [], 0
+    for month, _, seg_path in reversed(_segments_for(path, start, end)):
+        entries = None
+        if _inside(month, start, end):
+            n = _segment_count(seg_path)
+        else:
+            entries = [e for e in _read_segment(seg_path) if _in_range(e, start, end)]
+            n = len(entries)
+        total += n
+        if len(rows) >= page_size:
+            continue
+        if skip >= n:
+            skip -= n
+            continue
+        if entries is None:
+            entries = _read_segment(seg_path)
+        entries.reverse()
+        rows.extend(entries[skip:skip + page_size - len(rows)])
+        skip = 0
+    return rows, total
@@ -0,0 +1,152 @@
+# keywords.py — HRP 需求描述的關鍵詞統計，依年度與部門增量維護詞頻
+#
+# 中文斷詞優先使用 jieba (requirements.txt 已列入)；未安裝時以內建的人資詞典做正向最大匹配，
+# 詞典外的片段才退回 CJK 雙字 (bigram) 切分。英數字以整個單字計。
+# 統計隨 store 的寫入增量更新：新增/修改/刪除只調整該筆記錄的詞頻，
+# 查詢 top-k 時只讀計數器，不需重新讀取或切分原始文字。
+import importlib.util
+import threading
+from collections import Counter
+from search import bigrams, split_runs
+from store import DerivedIndex, get_store
+
+# 常見的功能詞，不列入排行
+STOPWORDS = {
+    "我們", "需要", "以及", "進行", "相關", "一名", "一位", "具備", "負責", "能力", "工作",
+    "the", "and", "for", "with", "of", "to", "in", "a", "an",
+}
+
+# 沒有 jieba 時的斷詞詞典：常見職稱、技能與需求用語，確保「工程師」等詞不被切成「工程/程師」。
+# 功能詞也放進詞典，讓它們整詞被比對後再由 STOPWORDS 濾除
+HR_TERMS = {
+    "工程師", "軟體工程師", "硬體工程師", "前端工程師", "後端工程師", "韌體工程師", "測試工程師",
+    "資料工程師", "資料科學家", "設計師", "分析師", "研究員", "技術員", "作業員", "專員", "助理",
+    "經理", "副理", "主管", "主任", "組長", "總監", "專案經理", "產品經理", "實習生", "工讀生",
+    "業務", "行銷", "人資", "招募", "會計", "財務", "出納", "稅務", "法務", "採購", "客服", "品管",
+    "品保", "研發", "生產", "製造", "倉儲", "物流", "行政", "秘書", "總務",
+    "前端", "後端", "全端", "韌體", "資料庫", "雲端", "網路", "資安", "系統", "維運", "測試", "自動化",
+    "機器學習", "人工智慧", "資料分析", "數據分析", "程式", "開發", "架構", "設計", "規劃", "管理",
+    "專案", "產品", "客戶", "溝通", "協調", "團隊", "英文", "日文", "證照", "經驗", "年資", "學歷",
+    "碩士", "學士", "博士", "資深", "新進", "全職", "兼職", "約聘", "派遣", "遠端", "輪班", "加班",
+    "擴編", "遞補", "離職", "新設", "新專案", "人力", "人員", "職缺", "預算",
+} | {w for w in STOPWORDS if not w.isascii()}
+_MAX_TERM = max(len(w) for w in HR_TERMS)
+
+_jieba = None
+
+def _segmenter():
+    global _jieba
+    if _jieba is None:
+        if importlib.util.find_spec("jieba"):
+            import jieba
+            jieba.setLogLevel(60)
+            for word in HR_TERMS:
+                jieba.add_word(word)
+            _jieba = jieba
+        else:
+            _jieba = False
+    return _jieba
+
+# 正向最大匹配：每個位置取詞典中最長的詞；比對不到的連續字元收成一段，以 bigram 切分
+def max_match(run, terms=HR_TERMS):
+    words, rest, i = [], "", 0
+    while i < len(run):
+        for n in range(min(_MAX_TERM, len(run) - i), 1, -1):
+            if run[i:i + n] in terms:
+                words.extend(bigrams(rest))
+                words.append(run[i:i + n])
+                rest, i = "", i + n
+                break
+        else:
+            rest += run[i]
+            i += 1
+    words.extend(bigrams(rest))
+    return words
+
+# 中文片段以 jieba 斷詞 (只保留兩字以上的詞)，沒有 jieba 時以詞典最大匹配
+def segment(text):
+    jieba = _segmenter()
+    terms = []
+    for run, cjk in split_runs(text):
+        if not cjk:
+            terms.append(run)
+        elif jieba:
+            terms.extend(w for w in jieba.lcut(run) if len(w) > 1)
+        else:
+            terms.extend(max_match(run))
+    return [t for t in terms if t not in STOPWORDS and not t.isdigit()]
+
+class KeywordStats(DerivedIndex):
+    def __init__(self, field='demand', group_fields=('year', 'department')):
+        self.field = field
+        self.group_fields = tuple(group_fields)
+        self._docs = {}
+        self._groups = {}
+        self._lock = threading.Lock()
+
+    def _group(self, record):
+        return tuple(record.get(f) for f in self.group_fields)
+
+    def _add(self, record):
+        doc_id = record.get('id')
+        if doc_id is None:
+            return
+        self._remove(doc_id)
+        group, counts = self._group(record), Counter(segment(record.get(self.field)))
+        self._docs[doc_id] = (group, counts)
+        self._groups.setdefault(group, Counter()).update(counts)
+
+    def _remove(self, doc_id):
+        entry = self._docs.pop(doc_id, None)
+        if entry is None:
+            return
+        group, counts = entry
+        total = self._groups[group]
+        total.subtract(counts)
+        for term in counts:
+            if total[term] <= 0:
+                del total[term]
+        if not total:
+            del self._groups[group]
+
+    # store 的 listener：ops 為 None 時整份重建，否則只處理本次異動的記錄
+    def apply(self, records, ops):
+        with self._lock:
+            if ops is None:
+                self._docs, self._groups = {}, {}
+                for r in records:
+                    self._add(r)
+                return
+            for op, payload in ops:
+                if op == 'delete':
+                    self._remove(payload)
+                else:
+                    self._add(payload)
+
+    # 依條件 (例如 year=2025, department="研發部") 合併各分組的計數器，回傳 [(詞, 次數)]
+    def top(self, k=10, **filters):
+        self.refresh()
+        unknown = set(filters) - set(self.group_fields)
+        if unknown:
+            raise ValueError(f"不支援的篩選欄位：{', '.join(sorted(unknown))}")
+        with self._lock:
+            merged = Counter()
+            for group, counts in self._groups.items():
+                values = dict(zip(self.group_fields, group))
+                if all(values[f] == v for f, v in filters.items() if v is not None):
+                    merged.update(counts)
+        return merged.most_common(k)
+
+# -------------------- 全程序共用的統計 --------------------
+_stats = {}
+_stats_lock = threading.Lock()
+
+def get_stats(name, field='demand', group_fields=('year', 'department'), store=None):
+    store = store or get_store()
+    key = (store, name, field, tuple(group_fields))
+    with _stats_lock:
+        stats = _stats.get(key)
+        if stats is None:
+            stats = _stats[key] = KeywordStats(field, group_fields)
+            stats.attach(store, name)
+        return stats
@@ -1,11 +1,22 @@
 # main.py
+import importlib
 import streamlit as st
-from hr_planning import hrp_module
-from recruitment import rs_module
-from training import td_module
-from performance import kpi_module
-from compensation import cb_module
-from employee_relations import er_module
+
+# 模組註冊表：選單項目 → (模組名稱, 進入點)。
+# 只有使用者選到的模組才會被匯入，冷啟動不必載入全部模組及其相依套件。
+MODULES = {
+    "人力資源規劃": ("hr_planning", "hrp_module"),
+    "招募與遴選": ("recruitment", "rs_module"),
+    "訓練與發展": ("training", "td_module"),
+    "績效管理": ("performance", "kpi_module"),
+    "薪酬與福利": ("compensation", "cb_module"),
+    "員工關係": ("employee_relations", "er_module"),
+    "員工主檔": ("employee_master", "em_module"),
+}
+
+def load_entry(choice):
+    module_name, entry = MODULES[choice]
+    return getattr(importlib.import_module(module_name), entry)
 
 # 設定頁面屬性
 st.set_page_config(page_title="HR Management System", layout="wide")
@@ -100,19 +111,8 @@ st.markdown(custom_css, unsafe_allow_html=True)
 st.title("新加坡科技工程有限公司 人力資源管理系統")
 
 # 側邊欄下拉選單（模組選擇）
-menu = ["人力資源規劃", "招募與遴選", "訓練與發展", "績效管理", "薪酬與福利", "員工關係"]
+menu = list(MODULES)
 choice = st.sidebar.selectbox("選擇模組", menu)
 
 # 根據選擇載入對應模組
-if choice == "人力資源規劃":
-    hrp_module()
-elif choice == "招募與遴選":
-    rs_module()
-elif choice == "訓練與發展":
-    td_module()
-elif choice == "績效管理":
-    kpi_module()
-elif choice == "薪酬與福利":
-    cb_module()
-elif choice == "員工關係":
-    er_module()
\ No newline at end of file
+load_entry(choice)()
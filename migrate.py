@@ -0,0 +1,42 @@
+# migrate.py — 將既有 JSON 資料檔匯入 SQLite 後端
+# 用法：python migrate.py [--db hrm.db] [--data-dir .] [--replace]
+import argparse
+import os
+import uuid
+from storage import TABLES, SqliteBackend, load_json
+
+def migrate(db_path="hrm.db", data_dir=".", replace=False):
+    backend = SqliteBackend(db_path)
+    summary = {}
+    for name in TABLES:
+        path = os.path.join(data_dir, name)
+        if not os.path.exists(path):
+            continue
+        records = load_json(path)
+        # 舊資料 (例如早期的日曆提醒) 可能沒有 id，補上後才能做單筆更新/刪除
+        for r in records:
+            r.setdefault('id', str(uuid.uuid4()))
+        table, _ = backend.ensure_table(name)
+        existing = backend.count(name)
+        if existing and not replace:
+            summary[name] = f"略過 (資料表 {table} 已有 {existing} 筆，使用 --replace 覆蓋)"
+            continue
+        backend.replace_all(name, records)
+        summary[name] = f"匯入 {len(records)} 筆 → {table}"
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="匯入 JSON 資料檔至 SQLite")
+    parser.add_argument("--db", default=os.environ.get("HRM_DB_PATH", "hrm.db"))
+    parser.add_argument("--data-dir", default=".")
+    parser.add_argument("--replace", action="store_true", help="覆蓋資料表中既有的資料")
+    args = parser.parse_args()
+    summary = migrate(args.db, args.data_dir, args.replace)
+    if not summary:
+        print("找不到任何可匯入的 JSON 資料檔。")
+    for name, result in summary.items():
+        print(f"{name}: {result}")
+    print("完成後以 HRM_STORAGE=sqlite 啟動即可改用 SQLite 後端。")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+# payroll.py — 向量化薪資計算引擎：津貼解析、按日比例、CPF 與所得稅級距、月度彙總
+#
+# 金額計算都以整欄的 NumPy 運算完成，不逐筆迴圈；福利明細的文字解析先以 factorize 去重，
+# 相同明細只解析一次。效能見 benchmarks/bench_payroll.py。
+# 費率與級距為可調整的設定值，正式發薪前請與最新法規核對。
+#
+# 輸入欄位 (comp_data)：salary 月薪、bonus 一次性獎金、benefits 福利明細，
+# 以及選填的 age (年齡，決定 CPF 費率)、start_date / end_date (到職/離職日，用於按日比例)、
+# bonus_month (獎金發放月份 YYYY-MM，未填時為記錄建立的月份)。
+# 同一員工可有多筆薪酬記錄 (例如調薪)，計薪時只取最新一筆。
+import calendar
+import os
+import re
+import uuid
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+
+# CPF 費率 (依年齡上限由小到大)：(年齡上限, 員工提撥率, 雇主提撥率)
+CPF_RATES = [
+    (55, 0.20, 0.17),
+    (60, 0.17, 0.155),
+    (65, 0.115, 0.12),
+    (70, 0.075, 0.09),
+    (200, 0.05, 0.075),
+]
+CPF_OW_CEILING = 7400      # 經常性薪資 (月薪 + 津貼) 每月計提上限
+DEFAULT_AGE = 35
+
+# 居民個人所得稅累進級距：(年所得下限, 稅率)
+TAX_BRACKETS = [
+    (0, 0.0), (20000, 0.02), (30000, 0.035), (40000, 0.07), (80000, 0.115),
+    (120000, 0.15), (160000, 0.18), (200000, 0.19), (240000, 0.195), (280000, 0.20),
+    (320000, 0.22), (500000, 0.23), (1000000, 0.24),
+]
+
+# 結構化福利明細：「交通津貼: 2000; 餐費津貼=1500」，每項為 名稱 + 冒號/等號 + 金額；非金額項目略過
+_ALLOWANCE_RE = re.compile(r"(?P<item>[^:：=;；,，\n]+?)\s*[:：=]\s*(?P<amount>\d[\d,]*(?:\.\d+)?)")
+
+RUN_DIR = os.environ.get("HRM_PAYROLL_DIR", "payroll_runs")
+
+def allowance_items(text):
+    return [(m.group('item').strip(), float(m.group('amount').replace(",", ""))) for m in _ALLOWANCE_RE.finditer(text)]
+
+# 每位員工的津貼合計；相同的福利明細只解析一次，再以代碼陣列展開
+def parse_allowances(benefits):
+    codes, uniques = pd.factorize(benefits.fillna("").astype(str))
+    totals = np.fromiter((sum(a for _, a in allowance_items(t)) for t in uniques), float, len(uniques))
+    return pd.Series(totals[codes] if len(uniques) else 0.0, index=benefits.index)
+
+# 每位員工 (emp_id，舊記錄以姓名) 只保留 created_at 最新的一筆
+def latest_records(df):
+    if df.empty or 'emp' not in df:
+        return df
+    key = df['emp_id'].fillna(df['emp']) if 'emp_id' in df else df['emp']
+    if 'created_at' in df:
+        created = pd.to_datetime(df['created_at'], errors='coerce')
+        order = created.sort_values(kind='stable', na_position='first').index
+    else:
+        order = df.index
+    return df.loc[order][~key.loc[order].duplicated(keep='last')].sort_index()
+
+# 獎金只在發放月份計入：bonus_month 未填時取記錄建立的月份，兩者皆無則不發
+def bonus_due(df, year, month):
+    target = f"{year:04d}-{month:02d}"
+    due = pd.Series(None, index=df.index, dtype=object)
+    if 'bonus_month' in df:
+        due = df['bonus_month'].astype(object).where(df['bonus_month'].notna() & (df['bonus_month'] != ""))
+    if 'created_at' in df:
+        due = due.fillna(pd.to_datetime(df['created_at'], errors='coerce').dt.strftime("%Y-%m"))
+    return (due == target).to_numpy()
+
+# 當月在職天數比例：到職/離職日落在該月時按日計算，不在職為 0
+def prorate_factor(df, year, month):
+    days = calendar.monthrange(year, month)[1]
+    first = pd.Timestamp(year, month, 1)
+    last = pd.Timestamp(year, month, days)
+    start = pd.to_datetime(df['start_date'], errors='coerce') if 'start_date' in df else pd.Series(pd.NaT, index=df.index)
+    end = pd.to_datetime(df['end_date'], errors='coerce') if 'end_date' in df else pd.Series(pd.NaT, index=df.index)
+    start = start.fillna(first).clip(lower=first)
+    end = end.fillna(last).clip(upper=last)
+    worked = (end - start).dt.days + 1
+    return (worked.clip(lower=0) / days).to_numpy(dtype=float)
+
+def cpf_rates(age):
+    limits = np.array([r[0] for r in CPF_RATES])
+    band = np.searchsorted(limits, age, side='left')
+    band = np.minimum(band, len(CPF_RATES) - 1)
+    employee = np.array([r[1] for r in CPF_RATES])[band]
+    employer = np.array([r[2] for r in CPF_RATES])[band]
+    return employee, employer
+
+# 累進稅額：所得對每個級距的部分以矩陣一次計算 (n × 級距數)
+def annual_tax(income):
+    lowers = np.array([b[0] for b in TAX_BRACKETS], dtype=float)
+    uppers = np.append(lowers[1:], np.inf)
+    rates = np.array([b[1] for b in TAX_BRACKETS])
+    taxable = np.clip(income[:, None] - lowers[None, :], 0, uppers - lowers)
+    return taxable @ rates
+
+# 計算一個月份的薪資。回傳每位員工一列的 DataFrame
+def run_payroll(df, year, month):
+    df = latest_records(df)
+    n = len(df)
+    salary = pd.to_numeric(df.get('salary', pd.Series(0, index=df.index)), errors='coerce').fillna(0).to_numpy(float)
+    bonus = pd.to_numeric(df.get('bonus', pd.Series(0, index=df.index)), errors='coerce').fillna(0).to_numpy(float)
+    age = pd.to_numeric(df.get('age', pd.Series(DEFAULT_AGE, index=df.index)), errors='coerce').fillna(DEFAULT_AGE).to_numpy(float)
+    allowances = parse_allowances(df['benefits']).to_numpy(float) if 'benefits' in df else np.zeros(n)
+
+    factor = prorate_factor(df, year, month)
+    base = np.round(salary * factor, 2)
+    allowance = np.round(allowances * factor, 2)
+    bonus = np.where((factor > 0) & bonus_due(df, year, month), bonus, 0.0)
+    gross = base + allowance + bonus
+
+    # CPF：經常性薪資受上限限制，獎金 (非經常性) 全額計提
+    ordinary = np.minimum(base + allowance, CPF_OW_CEILING)
+    ee_rate, er_rate = cpf_rates(age)
+    cpf_employee = np.floor((ordinary + bonus) * ee_rate)
+    cpf_employer = np.round((ordinary + bonus) * (ee_rate + er_rate)) - cpf_employee
+
+    # 所得稅預扣：以本月經常性收入年化加上本月獎金估算全年應稅所得，再攤回每月
+    annual_income = (base + allowance - cpf_employee) * 12 + bonus
+    tax = np.round(annual_tax(annual_income) / 12, 2)
+
+    net = gross - cpf_employee - tax
+    return pd.DataFrame({
+        'id': df['id'].to_numpy() if 'id' in df else np.arange(n).astype(str),
+        'emp': df['emp'].astype(str).to_numpy() if 'emp' in df else np.full(n, ""),
+        'month': f"{year:04d}-{month:02d}",
+        'prorate': np.round(factor, 4),
+        'base': base,
+        'allowance': allowance,
+        'bonus': bonus,
+        'gross': gross,
+        'cpf_employee': cpf_employee,
+        'cpf_employer': cpf_employer,
+        'tax': tax,
+        'net': np.round(net, 2),
+        'employer_cost': gross + cpf_employer,
+    })
+
+AMOUNT_COLUMNS = ['base', 'allowance', 'bonus', 'gross', 'cpf_employee', 'cpf_employer', 'tax', 'net', 'employer_cost']
+
+def summarize(run):
+    totals = {col: round(float(run[col].sum()), 2) for col in AMOUNT_COLUMNS}
+    return {'headcount': int((run['prorate'] > 0).sum()), **totals}
+
+# 多個月份的彙總 (例如整年度)，每月一列
+def monthly_totals(df, months):
+    rows = []
+    for year, month in months:
+        rows.append({'month': f"{year:04d}-{month:02d}", **summarize(run_payroll(df, year, month))})
+    return pd.DataFrame(rows)
+
+# 將一次薪資計算寫成 gzip CSV 檔 (暫存檔 + os.replace)，回傳 (路徑, 摘要記錄)
+def save_run(run, year, month):
+    os.makedirs(RUN_DIR, exist_ok=True)
+    run_id = str(uuid.uuid4())
+    path = os.path.join(RUN_DIR, f"{year:04d}-{month:02d}-{run_id[:8]}.csv.gz")
+    run.to_csv(path + ".tmp", index=False, compression='gzip', encoding="utf-8")
+    os.replace(path + ".tmp", path)
+    summary = {
+        'id': run_id,
+        'month': f"{year:04d}-{month:02d}",
+        'path': path,
+        **summarize(run),
+        'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    return path, summary
+
+def month_options(count=12, today=None):
+    today = today or date.today()
+    options = []
+    y, m = today.year, today.month
+    for _ in range(count):
+        options.append((y, m))
+        y, m = (y, m - 1) if m > 1 else (y - 1, 12)
+    return options
@@ -1,197 +1,190 @@
 # performance.py — 完整增強版 KPI 模組，包含持久化、日誌與美化，並新增創意功能
+# 業務邏輯見 services.PerformanceService，本檔只負責介面
 import streamlit as st
+from store import ConflictError
 import pandas as pd
-import matplotlib.pyplot as plt
-from datetime import datetime
-import json
-import os
-import uuid
+from components import seen_version, forget_version, log_viewer, paginated_table, export_button, import_panel, quantile_panel
+import calibration
+from services import get_service
 
-DATA_FILE = "kpi_data.json"
-LOG_FILE = "kpi_logs.json"
-
-# -------------------- 檔案 I/O --------------------
-def load_json(filename):
-    if os.path.exists(filename):
-        with open(filename, "r", encoding="utf-8") as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return []
-    return []
-
-def save_json(filename, data):
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
-# -------------------- Session 初始化 --------------------
-def initialize_session_state():
-    if 'performance' not in st.session_state:
-        st.session_state.performance = load_json(DATA_FILE)
-    if 'kpi_logs' not in st.session_state:
-        st.session_state.kpi_logs = load_json(LOG_FILE)
-    if 'last_updated' not in st.session_state:
-        st.session_state.last_updated = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-# -------------------- 日誌記錄 --------------------
-def log_action(action, details):
-    entry = {
-        'id': str(uuid.uuid4()),
-        'action': action,
-        'details': details,
-        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }
-    st.session_state.kpi_logs.append(entry)
-    save_json(LOG_FILE, st.session_state.kpi_logs)
+# -------------------- 共享儲存 --------------------
+service = get_service("kpi")
+store = service.store
+DATA_FILE = service.data_file
+LOG_FILE = service.log_file
 
 # -------------------- 核心 CRUD --------------------
 def view_performance():
     st.header("📋 績效評估列表")
-    st.write(f"最後更新：{st.session_state.last_updated}")
-    df = pd.DataFrame(st.session_state.performance)
-    if df.empty:
+    st.write(f"最後更新：{store.updated_at(DATA_FILE)}")
+    records = store.records(DATA_FILE)
+    if not records:
         st.info("目前沒有績效評估。")
         return
     # 搜尋員工
     kw = st.text_input("🔍 搜尋員工 (姓名)")
-    if kw:
-        df = df[df['emp'].str.contains(kw, case=False)]
-    st.dataframe(df)
+    where = [('emp', 'contains', kw)] if kw else []
+    paginated_table(DATA_FILE, "kpi_view", where, ['emp', 'score', 'goal_rate', 'created_at'])
     # 下載按鈕
-    json_str = json.dumps(st.session_state.performance, ensure_ascii=False, indent=2)
-    st.download_button(
-        label="Download Performance Data (JSON)",
-        data=json_str,
-        file_name="performance.json",
-        mime="application/json"
-    )
+    export_button(DATA_FILE, "performance", "Download Performance Data")
 
 def add_performance():
     st.header("🆕 新增績效評估")
     with st.form("form_add"):
         emp = st.text_input("員工姓名")
+        department = st.text_input("部門")
+        manager = st.text_input("直屬主管")
         score = st.slider("績效分數", 0, 100, 50)
         goal_rate = st.slider("目標完成率 (%)", 0, 100, 75)
         comments = st.text_area("主管評語")
         submit = st.form_submit_button("提交")
     if submit:
-        if not emp.strip():
-            st.error("員工姓名不可為空。")
-        else:
-            entry = {
-                'id': str(uuid.uuid4()),
-                'emp': emp,
-                'score': score,
-                'goal_rate': goal_rate,
-                'comments': comments,
-                'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
-            st.session_state.performance.append(entry)
-            save_json(DATA_FILE, st.session_state.performance)
-            log_action("新增績效", f"{emp} - {score}")
-            st.success("績效評估新增成功！")
+        try:
+            service.create({'emp': emp, 'department': department, 'manager': manager,
+                            'score': score, 'goal_rate': goal_rate, 'comments': comments})
+        except ValueError as e:
+            st.error(str(e))
+            return
+        st.success("績效評估新增成功！")
 
 def edit_performance():
     st.header("✏️ 修改績效評估")
-    if not st.session_state.performance:
+    records = store.records(DATA_FILE)
+    if not records:
         st.info("無可修改的績效評估。")
         return
-    opts = {f"{p['emp']} - {p['score']}": p for p in st.session_state.performance}
+    opts = {f"{p['emp']} - {p['score']}": p for p in records}
     sel = st.selectbox("選擇評估項目", list(opts.keys()))
     p = opts[sel]
+    version = seen_version(p)
     with st.form("form_edit"):
         emp = st.text_input("員工姓名", p['emp'])
+        department = st.text_input("部門", p.get('department', ''))
+        manager = st.text_input("直屬主管", p.get('manager', ''))
         score = st.slider("績效分數", 0, 100, p['score'])
         goal_rate = st.slider("目標完成率 (%)", 0, 100, p.get('goal_rate',75))
         comments = st.text_area("主管評語", p['comments'])
         submit = st.form_submit_button("更新")
     if submit:
-        p.update({
-            'emp': emp,
-            'score': score,
-            'goal_rate': goal_rate,
-            'comments': comments,
-            'updated_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        })
-        save_json(DATA_FILE, st.session_state.performance)
-        log_action("修改績效", f"{emp} - {score}")
+        try:
+            service.update(p['id'], {'emp': emp, 'department': department, 'manager': manager,
+                                     'score': score, 'goal_rate': goal_rate, 'comments': comments},
+                           expected_version=version)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        except ConflictError as e:
+            forget_version(p)
+            st.error(f"{e}，請重新確認後再送出。")
+            return
+        forget_version(p)
         st.success("績效評估已更新！")
 
 def delete_performance():
     st.header("🗑️ 刪除績效評估")
-    if not st.session_state.performance:
+    records = store.records(DATA_FILE)
+    if not records:
         st.info("無可刪除的績效評估。")
         return
-    opts = {f"{p['emp']} - {p['score']}": p for p in st.session_state.performance}
+    opts = {f"{p['emp']} - {p['score']}": p for p in records}
     sel = st.selectbox("選擇評估項目", list(opts.keys()))
+    version = seen_version(opts[sel])
     if st.button("確認刪除"):
-        st.session_state.performance = [p for p in st.session_state.performance if p['id'] != opts[sel]['id']]
-        save_json(DATA_FILE, st.session_state.performance)
-        log_action("刪除績效", sel)
+        try:
+            service.delete([opts[sel]], expected_versions={opts[sel]['id']: version})
+        except ConflictError as e:
+            forget_version(opts[sel])
+            st.error(f"{e}，請重新確認後再送出。")
+            return
+        forget_version(opts[sel])
         st.success("績效評估已刪除！")
 
 # -------------------- 創意功能 --------------------
 def batch_delete():
     st.subheader("🔁 批量刪除績效評估")
-    df = pd.DataFrame(st.session_state.performance)
-    if df.empty:
+    records = store.records(DATA_FILE)
+    if not records:
         st.info("無項目可批刪。")
         return
-    sels = st.multiselect("選擇要刪除的項目", list(df['emp'] + ' - ' + df['score'].astype(str)))
-    if st.button("執行批量刪除"):
-        for key in sels:
-            emp = key.split(' - ')[0]
-            st.session_state.performance = [p for p in st.session_state.performance if p['emp'] != emp]
-            log_action("批量刪除績效", emp)
-        save_json(DATA_FILE, st.session_state.performance)
-        st.success("批量刪除完成！")
+    sels = st.multiselect("選擇要刪除的項目", records, format_func=lambda p: f"{p['emp']} - {p['score']}")
+    if st.button("執行批量刪除") and sels:
+        deleted = service.delete(sels)
+        st.success(f"批量刪除完成，共刪除 {deleted[DATA_FILE]} 筆！")
 
+def import_performance():
+    st.subheader("📥 批次匯入績效評估")
+    import_panel(service, "kpi_import")
 
 def analytics():
     st.subheader("📊 績效分析儀表板")
-    df = pd.DataFrame(st.session_state.performance)
-    if df.empty:
+    summary = service.analytics()
+    if not summary['count']:
         st.info("無資料分析。")
         return
-    avg_score = df['score'].mean()
-    avg_goal = df['goal_rate'].mean()
-    st.metric("平均分數", f"{avg_score:.1f}")
-    st.metric("平均完成率", f"{avg_goal:.1f}%")
-    st.subheader("分數分佈")
-    st.bar_chart(df['score'].value_counts().sort_index())
+    numeric = summary['numeric']
+    c1, c2 = st.columns(2)
+    c1.metric("平均分數", f"{numeric['score']['mean']:.1f}")
+    c2.metric("平均完成率", f"{numeric['goal_rate']['mean']:.1f}%")
+    st.subheader("分數分位數")
+    quantile_panel(DATA_FILE, {'score': "分數"}, "kpi_quantiles")
+    st.subheader("各部門平均")
+    st.dataframe(pd.DataFrame.from_dict(summary['groups']['department'], orient='index'))
     # 下載按鈕
-    json_str = df.to_json(orient="records", force_ascii=False, indent=2)
-    st.download_button(
-        label="Download Analysis Data (JSON)",
-        data=json_str,
-        file_name="performance_analysis.json",
-        mime="application/json"
-    )
+    export_button(DATA_FILE, "performance_analysis", "Download Analysis Data")
+
+# 年度校準：主管別 z 分數標準化後於部門內排名，依強制分配曲線給等第；可寫回績效記錄
+def calibration_run():
+    st.subheader("⚖️ 年度績效校準")
+    years = service.calibration_years()
+    if not years:
+        st.info("無績效資料可校準。")
+        return
+    st.caption("綜合分數 = 分數 × 權重 + 目標完成率 × (1 - 權重)；同一員工同年度多筆評估取最新一筆。"
+               f"主管底下少於 {calibration.MIN_GROUP} 人或未填主管時，改以部門為單位標準化。")
+    c1, c2, c3 = st.columns(3)
+    year = c1.selectbox("年度", years)
+    curve_text = c2.text_input("強制分配比例 (高 → 低，%)", "10/20/40/20/10")
+    weight = c3.slider("分數權重", 0.0, 1.0, calibration.SCORE_WEIGHT, 0.05)
+    try:
+        curve = calibration.parse_curve(curve_text)
+    except ValueError as e:
+        st.error(str(e))
+        return
+    st.write(" / ".join(f"{label} {share:.0%}" for label, share in curve))
+    if st.button("執行校準"):
+        with st.spinner("校準中…"):
+            st.session_state['kpi_calibration'] = (year, curve_text, curve, service.calibrate(year, curve, weight))
+    if 'kpi_calibration' not in st.session_state:
+        return
+    year, curve_text, curve, result = st.session_state['kpi_calibration']
+    st.metric(f"{year} 年度校準人數", len(result))
+    st.subheader("各部門等第分佈")
+    table = calibration.distribution(result, curve)
+    st.dataframe(table)
+    st.bar_chart(table.drop(columns='合計').sum())
+    st.subheader("主管給分寬嚴")
+    st.dataframe(calibration.manager_summary(result))
+    st.subheader("校準結果")
+    dept = st.selectbox("部門", ["全部"] + sorted(result['department'].unique()))
+    shown = result if dept == "全部" else result[result['department'] == dept]
+    st.dataframe(shown.drop(columns=['id', 'emp_id']).head(1000))
+    st.download_button("Download Calibration (.csv)", result.to_csv(index=False).encode("utf-8-sig"),
+                       file_name=f"calibration-{year}.csv", mime="text/csv")
+    if st.button("寫回績效記錄 (calibrated / grade)"):
+        updated = service.apply_calibration(result, year, curve_text)
+        st.success(f"已寫回 {len(updated)} 筆績效記錄。")
 
 def view_logs():
     st.subheader("📜 操作日誌")
-    df = pd.DataFrame(st.session_state.kpi_logs)
-    if df.empty:
-        st.info("無日誌記錄。")
-    else:
-        st.dataframe(df)
-        # 下載按鈕
-        json_str = json.dumps(st.session_state.kpi_logs, ensure_ascii=False, indent=2)
-        st.download_button(
-            label="Download Logs (JSON)",
-            data=json_str,
-            file_name="kpi_logs.json",
-            mime="application/json"
-        )
+    log_viewer(LOG_FILE, "kpi_logs", "無日誌記錄。")
 
 # -------------------- 主入口 --------------------
 def kpi_module():
-    initialize_session_state()
     st.title("📌 績效管理 (KPI) - ST Engineering")
     st.sidebar.title("功能選單")
     choice = st.sidebar.radio("請選擇操作", [
         "查看績效評估", "新增績效評估", "修改績效評估", "刪除績效評估",
-        "批量刪除", "績效分析", "查看日誌"
+        "批量刪除", "批次匯入", "績效分析", "績效校準", "查看日誌"
     ])
 
     if choice == "查看績效評估": view_performance()
@@ -199,8 +192,10 @@ def kpi_module():
     elif choice == "修改績效評估": edit_performance()
     elif choice == "刪除績效評估": delete_performance()
     elif choice == "批量刪除": batch_delete()
+    elif choice == "批次匯入": import_performance()
 
     elif choice == "績效分析": analytics()
+    elif choice == "績效校準": calibration_run()
     elif choice == "查看日誌": view_logs()
 
 # 供 main.py 匯入
@@ -0,0 +1,230 @@
+# persistence.py — 背景寫入佇列 (write-behind)：合併同檔案的寫入、原子化落盤，並提供 flush 屏障
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+# -------------------- 跨程序檔案鎖 --------------------
+# 多個 Streamlit 程序共用同一個工作目錄時，以 <檔名>.lock 上的 advisory lock 串行化寫入
+@contextmanager
+def file_lock(path):
+    with open(path + ".lock", "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+# -------------------- 原子化寫檔 --------------------
+# 先寫入同目錄的暫存檔並 fsync，再以 os.replace 取代原檔；讀者只會看到完整的舊檔或新檔。
+# mkstemp 建立的暫存檔權限為 0600，取代前改為原檔的權限 (新檔則依 umask，與 open() 相同)，
+# 共用部署中其他服務帳號才能繼續讀取資料檔。
+# umask 只能以「設定再還原」的方式讀取，在匯入時 (尚未啟動背景執行緒) 讀一次
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def _file_mode(path):
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+def write_json_atomic(path, data):
+    directory = os.path.dirname(os.path.abspath(path))
+    mode = _file_mode(path)
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        os.chmod(tmp, mode)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data if isinstance(data, dict) else list(data), f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def append_lines(path, lines):
+    data = "".join(lines)
+    with file_lock(path), open(path, "a+b") as f:
+        # 若上次寫入中斷留下半行，先補換行，避免與本批黏在一起
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                data = "\n" + data
+        f.write(data.encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+
+# -------------------- 背景寫入佇列 --------------------
+# 寫入意圖以檔案路徑為鍵：
+#   ('snapshot', records) — 整份覆寫，同一時間窗內只保留最後一份
+#   ('append', [lines])   — 追加行，依序合併成一次寫入
+#   ('ops', (ops, apply)) — 記錄異動，依序合併後交給 apply(path, ops) 與磁碟上的資料合併
+# 需要在回覆使用者前確認成功的異動 (例如帶版本的更新) 改用 write_ops_now，在呼叫端同步寫入。
+class WriteBehindQueue:
+    def __init__(self, delay=0.2, enabled=True):
+        self.delay = delay
+        self.enabled = enabled
+        self._cond = threading.Condition()
+        self._pending = {}
+        self._busy = False
+        self._writing = set()
+        self._flushing = 0
+        self._errors = []
+        self._thread = None
+
+    def _start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="hrm-write-behind", daemon=True)
+            self._thread.start()
+
+    def _write(self, path, kind, payload):
+        if kind == "snapshot":
+            write_json_atomic(path, payload)
+        elif kind == "ops":
+            ops, apply = payload
+            apply(path, ops)
+        else:
+            append_lines(path, payload)
+
+    def put_snapshot(self, path, records):
+        if not self.enabled:
+            self._write(path, "snapshot", records)
+            return
+        with self._cond:
+            self._pending[path] = ("snapshot", records)
+            self._start()
+            self._cond.notify_all()
+
+    def put_lines(self, path, lines):
+        if not self.enabled:
+            self._write(path, "append", list(lines))
+            return
+        with self._cond:
+            _, queued = self._pending.get(path, ("append", []))
+            self._pending[path] = ("append", queued + list(lines))
+            self._start()
+            self._cond.notify_all()
+
+    def put_ops(self, path, ops, apply):
+        if not self.enabled:
+            self._write(path, "ops", (list(ops), apply))
+            return
+        with self._cond:
+            _, (queued, _) = self._pending.get(path, ("ops", ([], apply)))
+            self._pending[path] = ("ops", (queued + list(ops), apply))
+            self._start()
+            self._cond.notify_all()
+
+    # 同步寫入一批異動：先取出佇列中同一檔案尚未落盤的 ops (較早的異動)，
+    # 在呼叫端執行緒呼叫 apply(path, queued, checked=ops)；apply 拋出的例外 (例如 ConflictError)
+    # 直接傳回呼叫端。背景執行緒正在寫入同一檔案時先等待，確保異動依序落盤。
+    def write_ops_now(self, path, ops, apply):
+        if not self.enabled:
+            return apply(path, [], checked=list(ops))
+        with self._cond:
+            while path in self._writing:
+                self._cond.wait()
+            _, (queued, _) = self._pending.pop(path, ("ops", ([], apply)))
+            self._writing.add(path)
+        try:
+            return apply(path, queued, checked=list(ops))
+        finally:
+            with self._cond:
+                self._writing.discard(path)
+                self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                # 收集同一時間窗內的寫入；有人呼叫 flush() 時立即落盤
+                deadline = time.monotonic() + self.delay
+                while not self._flushing:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                # 同步寫入進行中的檔案留待下一輪，避免兩邊同時寫入同一檔案
+                batch = {p: v for p, v in self._pending.items() if p not in self._writing}
+                if not batch:
+                    self._cond.wait()
+                    continue
+                for p in batch:
+                    del self._pending[p]
+                self._writing.update(batch)
+                self._busy = True
+            for path, (kind, payload) in batch.items():
+                try:
+                    self._write(path, kind, payload)
+                except Exception as e:
+                    logger.error("背景寫入 %s 失敗：%s", path, e)
+                    with self._cond:
+                        self._errors.append((path, e))
+            with self._cond:
+                self._writing.difference_update(batch)
+                self._busy = False
+                self._cond.notify_all()
+
+    def pending(self):
+        with self._cond:
+            return sorted(self._pending)
+
+    # 屏障：等待目前所有寫入意圖落盤 (每次寫入皆已 fsync)；供關機與測試使用
+    def flush(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._flushing += 1
+            self._cond.notify_all()
+            try:
+                while self._pending or self._busy:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("背景寫入未在時限內完成")
+                    self._cond.wait(remaining)
+            finally:
+                self._flushing -= 1
+            errors, self._errors = self._errors, []
+        if errors:
+            path, error = errors[0]
+            raise IOError(f"{len(errors)} 筆背景寫入失敗，首筆：{path} ({error})")
+
+# HRM_WRITE_BEHIND=0 時改為同步寫入；HRM_WRITE_DELAY 調整合併時間窗 (秒)
+_writer = WriteBehindQueue(
+    delay=float(os.environ.get("HRM_WRITE_DELAY", "0.2")),
+    enabled=os.environ.get("HRM_WRITE_BEHIND", "1") != "0",
+)
+
+def _flush_at_exit():
+    try:
+        _writer.flush(timeout=30)
+    except Exception as e:
+        logger.error("結束前寫入失敗：%s", e)
+
+atexit.register(_flush_at_exit)
+
+def get_writer():
+    return _writer
@@ -1,74 +1,35 @@
-
 # recruitment.py — 完整增強版 R&S 模組，包含持久化、日誌與美化，並加入創意功能
+# 業務邏輯見 services.RecruitmentService，本檔只負責介面
 import streamlit as st
-import pandas as pd
 from datetime import datetime, date
-import json
-import os
-import uuid
-
-DATA_FILE = "rs_data.json"
-LOG_FILE = "rs_logs.json"
-INTERVIEW_FILE = "rs_interviews.json"
-
-# -------------------- 檔案 I/O --------------------
-def load_json(filename):
-    if os.path.exists(filename):
-        with open(filename, "r", encoding="utf-8") as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return []
-    return []
-
-def save_json(filename, data):
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
-# -------------------- Session 初始化 --------------------
-def initialize_session_state():
-    if 'candidates' not in st.session_state:
-        st.session_state.candidates = load_json(DATA_FILE)
-    if 'rs_logs' not in st.session_state:
-        st.session_state.rs_logs = load_json(LOG_FILE)
-    if 'interviews' not in st.session_state:
-        st.session_state.interviews = load_json(INTERVIEW_FILE)
-    if 'last_updated' not in st.session_state:
-        st.session_state.last_updated = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+from store import ConflictError
+import pandas as pd
+from components import seen_version, forget_version, log_viewer, paginated_table, export_button, import_panel
+from scheduling import parse_time
+from services import ScheduleConflict, get_service
 
-# -------------------- 日誌記錄 --------------------
-def log_action(action, details):
-    entry = {
-        'id': str(uuid.uuid4()),
-        'action': action,
-        'details': details,
-        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }
-    st.session_state.rs_logs.append(entry)
-    save_json(LOG_FILE, st.session_state.rs_logs)
+# -------------------- 共享儲存 --------------------
+service = get_service("rs")
+store = service.store
+DATA_FILE = service.data_file
+LOG_FILE = service.log_file
+INTERVIEW_FILE = service.interview_file
 
 # -------------------- 功能模組 --------------------
 def view_candidates():
     st.header("📋 候選人名單")
-    st.write(f"最後更新：{st.session_state.last_updated}")
-    df = pd.DataFrame(st.session_state.candidates)
-    if df.empty:
+    st.write(f"最後更新：{store.updated_at(DATA_FILE)}")
+    candidates = store.records(DATA_FILE)
+    if not candidates:
         st.info("目前沒有候選人。")
         return
     # 搜尋功能
-    keyword = st.text_input("🔍 搜尋候選人 (姓名或職位)")
-    if keyword:
-        df = df[df['name'].str.contains(keyword, case=False) |
-               df['position'].str.contains(keyword, case=False)]
-    st.dataframe(df)
+    keyword = st.text_input("🔍 搜尋候選人 (姓名、職位或簡歷)")
+    ranking = service.search(keyword) if keyword.strip() else None
+    paginated_table(DATA_FILE, "rs_view", sort_columns=['name', 'position', 'rating', 'created_at'],
+                    ranking=ranking)
     # 下載按鈕
-    json_str = json.dumps(st.session_state.candidates, ensure_ascii=False, indent=2)
-    st.download_button(
-        label="Download Candidates (JSON)",
-        data=json_str,
-        file_name="candidates.json",
-        mime="application/json"
-    )
+    export_button(DATA_FILE, "candidates", "Download Candidates")
 
 def add_candidate():
     st.header("🆕 新增候選人")
@@ -79,30 +40,23 @@ def add_candidate():
         rating = st.slider("初步評分 (1-5)", 1, 5, 3)
         submit = st.form_submit_button("提交")
     if submit:
-        if not name.strip() or not position.strip():
-            st.error("姓名和職位不可為空。")
-        else:
-            entry = {
-                'id': str(uuid.uuid4()),
-                'name': name,
-                'position': position,
-                'resume': resume,
-                'rating': rating,
-                'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
-            st.session_state.candidates.append(entry)
-            save_json(DATA_FILE, st.session_state.candidates)
-            log_action("新增候選人", f"{name} - {position}")
-            st.success("已成功新增候選人！")
+        try:
+            service.create({'name': name, 'position': position, 'resume': resume, 'rating': rating})
+        except ValueError as e:
+            st.error(str(e))
+            return
+        st.success("已成功新增候選人！")
 
 def edit_candidate():
     st.header("✏️ 修改候選人")
-    if not st.session_state.candidates:
+    candidates = store.records(DATA_FILE)
+    if not candidates:
         st.info("無可修改的候選人。")
         return
-    options = {f"{c['name']} - {c['position']}": c for c in st.session_state.candidates}
+    options = {f"{c['name']} - {c['position']}": c for c in candidates}
     key = st.selectbox("選擇候選人", list(options.keys()))
     candidate = options[key]
+    version = seen_version(candidate)
     with st.form("form_edit"):
         name = st.text_input("姓名", candidate['name'])
         position = st.text_input("應徵職位", candidate['position'])
@@ -110,117 +64,119 @@ def edit_candidate():
         rating = st.slider("評分 (1-5)", 1, 5, candidate.get('rating', 3))
         submit = st.form_submit_button("更新")
     if submit:
-        candidate.update({
-            'name': name,
-            'position': position,
-            'resume': resume,
-            'rating': rating,
-            'updated_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        })
-        save_json(DATA_FILE, st.session_state.candidates)
-        log_action("修改候選人", f"{name} - {position}")
+        try:
+            service.update(candidate['id'], {'name': name, 'position': position, 'resume': resume, 'rating': rating},
+                           expected_version=version)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        except ConflictError as e:
+            forget_version(candidate)
+            st.error(f"{e}，請重新確認後再送出。")
+            return
+        forget_version(candidate)
         st.success("已成功更新候選人！")
 
 def delete_candidate():
     st.header("🗑️ 刪除候選人")
-    if not st.session_state.candidates:
+    candidates = store.records(DATA_FILE)
+    if not candidates:
         st.info("無可刪除的候選人。")
         return
-    options = {f"{c['name']} - {c['position']}": c for c in st.session_state.candidates}
+    options = {f"{c['name']} - {c['position']}": c for c in candidates}
     key = st.selectbox("選擇候選人", list(options.keys()))
     candidate = options[key]
+    version = seen_version(candidate)
     if st.button("確認刪除"):
-        st.session_state.candidates = [c for c in st.session_state.candidates if c['id'] != candidate['id']]
-        save_json(DATA_FILE, st.session_state.candidates)
-        log_action("刪除候選人", f"{candidate['name']} - {candidate['position']}")
+        try:
+            service.delete([candidate], expected_versions={candidate['id']: version})
+        except ConflictError as e:
+            forget_version(candidate)
+            st.error(f"{e}，請重新確認後再送出。")
+            return
+        forget_version(candidate)
         st.success("已成功刪除候選人！")
 
+def import_candidates():
+    st.header("📥 批次匯入候選人")
+    import_panel(service, "rs_import")
+
 def schedule_interview():
     st.header("📆 安排面試")
-    if not st.session_state.candidates:
+    candidates = store.records(DATA_FILE)
+    if not candidates:
         st.info("請先新增候選人。")
         return
-    options = {f"{c['name']} - {c['position']}": c['id'] for c in st.session_state.candidates}
+    options = {f"{c['name']} - {c['position']}": c for c in candidates}
     sel = st.selectbox("選擇候選人", list(options.keys()))
-    cand_id = options[sel]
-    with st.form("form_interview"):
-        date_input = st.date_input("面試日期", date.today())
-        time = st.text_input("面試時間", "09:00")
-        location = st.text_input("地點", "總部會議室")
-        submit = st.form_submit_button("安排")
-    if submit:
-        iv = {
-            'id': str(uuid.uuid4()),
-            'candidate_id': cand_id,
-            'datetime': f"{date_input} {time}",
-            'location': location
-        }
-        st.session_state.interviews.append(iv)
-        save_json(INTERVIEW_FILE, st.session_state.interviews)
-        log_action("安排面試", f"{sel} on {iv['datetime']}")
-        st.success("面試已安排！")
+    candidate = options[sel]
+    c1, c2 = st.columns(2)
+    date_input = c1.date_input("面試日期", date.today())
+    location = c2.text_input("地點", "總部會議室")
+    c1, c2 = st.columns(2)
+    time = c1.text_input("面試時間", "09:00")
+    minutes = c2.selectbox("面試長度 (分鐘)", [30, 45, 60, 90, 120], index=2)
+
+    # 當日該地點的空檔
+    slots = service.free_slots(location, date_input, minutes)
+    if slots:
+        st.caption("可用時段：" + "、".join(f"{s:%H:%M}–{e:%H:%M}" for s, e in slots))
+    else:
+        st.caption("當日此地點已無可用時段。")
+
+    force = st.checkbox("時段衝突時仍要安排 (標記為衝突)")
+    if st.button("安排"):
+        try:
+            hour, minute = parse_time(time)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        start = datetime.combine(date_input, datetime.min.time()).replace(hour=hour, minute=minute)
+        try:
+            iv = service.schedule_interview(candidate, start, minutes, location, force=force)
+        except ScheduleConflict as e:
+            st.error(str(e))
+            return
+        st.success("面試已安排！" + (" (已標記為時段衝突)" if iv['conflict'] else ""))
 
 def view_interviews():
     st.header("📅 面試日程")
-    df = pd.DataFrame(st.session_state.interviews)
-    if df.empty:
+    if not store.records(INTERVIEW_FILE):
         st.info("目前無面試安排。")
-    else:
-        st.dataframe(df)
-        # 下載按鈕
-        json_str = json.dumps(st.session_state.interviews, ensure_ascii=False, indent=2)
-        st.download_button(
-            label="Download Interviews (JSON)",
-            data=json_str,
-            file_name="interviews.json",
-            mime="application/json"
-        )
+        return
+    day = st.date_input("日期 (留空顯示全部)", value=None, key="iv_day")
+    where = [('datetime', 'prefix', str(day))] if day else []
+    if st.checkbox("僅顯示衝突", key="iv_conflict"):
+        where.append(('conflict', '=', True))
+    paginated_table(INTERVIEW_FILE, "rs_iv", where, ['datetime', 'location', 'candidate_id'])
+    # 下載按鈕
+    export_button(INTERVIEW_FILE, "interviews", "Download Interviews")
 
 def view_logs():
     st.header("📜 操作日誌")
-    df = pd.DataFrame(st.session_state.rs_logs)
-    if df.empty:
-        st.info("無日誌記錄。")
-    else:
-        st.dataframe(df)
-        # 下載按鈕
-        json_str = json.dumps(st.session_state.rs_logs, ensure_ascii=False, indent=2)
-        st.download_button(
-            label="Download Logs (JSON)",
-            data=json_str,
-            file_name="rs_logs.json",
-            mime="application/json"
-        )
+    log_viewer(LOG_FILE, "rs_logs", "無日誌記錄。")
 
 # 創意功能：統計資訊
 def analytics():
     st.header("📊 候選人分析")
-    df = pd.DataFrame(st.session_state.candidates)
-    if df.empty:
+    summary = service.analytics()
+    if not summary['count']:
         st.info("無資料分析。")
         return
     # 平均評分
-    avg_rating = df['rating'].mean()
-    st.metric("平均評分", f"{avg_rating:.1f}")
+    st.metric("平均評分", f"{summary['numeric']['rating']['mean']:.1f}")
     # 職位分佈
     st.subheader("職位需求分佈")
-    st.bar_chart(df['position'].value_counts())
+    st.bar_chart(pd.Series(summary['tallies']['position'], name="人數").sort_values(ascending=False))
     # 下載按鈕
-    json_str = df.to_json(orient="records", force_ascii=False, indent=2)
-    st.download_button(
-        label="Download Analysis Data (JSON)",
-        data=json_str,
-        file_name="candidates_analysis.json",
-        mime="application/json"
-    )
+    export_button(DATA_FILE, "candidates_analysis", "Download Analysis Data")
 
 # -------------------- 主入口 --------------------
 def rs_module():
-    initialize_session_state()
     st.title("📌 招募與遴選 (R&S) - ST Engineering")
     st.sidebar.title("功能選單")
     choice = st.sidebar.radio("請選擇操作", [
-        "查看候選人", "新增候選人", "修改候選人", "刪除候選人",
+        "查看候選人", "新增候選人", "修改候選人", "刪除候選人", "批次匯入",
         "安排面試", "查看面試", "候選人分析", "查看日誌"
     ])
 
@@ -228,6 +184,7 @@ def rs_module():
     elif choice == "新增候選人": add_candidate()
     elif choice == "修改候選人": edit_candidate()
     elif choice == "刪除候選人": delete_candidate()
+    elif choice == "批次匯入": import_candidates()
     elif choice == "安排面試": schedule_interview()
     elif choice == "查看面試": view_interviews()
     elif choice == "候選人分析": analytics()
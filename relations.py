@@ -0,0 +1,82 @@
+# relations.py — 依外鍵分組的關聯索引 (例如 課程 → 場次、場次 → 出席者)，隨寫入增量維護
+#
+# 取代每次重跑時以 pandas merge 或重建 {名稱: id} 字典的做法：
+# group(鍵) 直接回傳該鍵下的記錄，record(id) 以 id 查記錄，兩者都是 O(1) 查表。
+# 建立索引時一併向 store 註冊外鍵查詢，連帶刪除不再掃描整份資料。
+import threading
+from store import DerivedIndex, get_store
+
+class GroupIndex(DerivedIndex):
+    def __init__(self, field):
+        self.field = field
+        self._records = {}
+        self._groups = {}
+        self._lock = threading.Lock()
+
+    def _add(self, record):
+        rid = record.get('id')
+        if rid is None:
+            return
+        self._remove(rid)
+        self._records[rid] = record
+        self._groups.setdefault(record.get(self.field), {})[rid] = record
+
+    def _remove(self, rid):
+        record = self._records.pop(rid, None)
+        if record is None:
+            return
+        key = record.get(self.field)
+        group = self._groups.get(key)
+        if group is not None:
+            group.pop(rid, None)
+            if not group:
+                del self._groups[key]
+
+    # store 的 listener：ops 為 None 時整份重建，否則只處理本次異動的記錄
+    def apply(self, records, ops):
+        with self._lock:
+            if ops is None:
+                self._records, self._groups = {}, {}
+                for r in records:
+                    self._add(r)
+                return
+            for op, payload in ops:
+                if op == 'delete':
+                    self._remove(payload)
+                else:
+                    self._add(payload)
+
+    def record(self, rid):
+        self.refresh()
+        return self._records.get(rid)
+
+    def group(self, key):
+        self.refresh()
+        with self._lock:
+            return list(self._groups.get(key, {}).values())
+
+    def count(self, key):
+        self.refresh()
+        return len(self._groups.get(key, ()))
+
+    def ids_for(self, keys):
+        self.refresh()
+        with self._lock:
+            return {rid for k in keys for rid in self._groups.get(k, ())}
+
+    def __len__(self):
+        self.refresh()
+        return len(self._records)
+
+# -------------------- 全程序共用的關聯索引 --------------------
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_group_index(name, field, store=None):
+    store = store or get_store()
+    with _indexes_lock:
+        index = _indexes.get((store, name, field))
+        if index is None:
+            index = _indexes[(store, name, field)] = GroupIndex(field)
+            index.attach(store, name, lookup_field=field)
+        return index
@@ -0,0 +1,142 @@
+# reminders.py — 依日期排序的提醒索引：區間查詢、依 entry_id 查找與 iCal 匯出
+#
+# 提醒以 (日期, id) 排序保存，「未來 N 天」與任意日期區間都以二分搜尋定位，不需掃描或重新排序；
+# 另以 entry_id 建立反向索引，刪除 HRP 需求時由 store 直接取得要連帶刪除的提醒。
+# 日期欄位為 "YYYY-MM-DD" 字串，字典序即時間順序。索引隨 store 的寫入增量更新。
+import threading
+import uuid
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, datetime, timedelta, timezone
+from store import DerivedIndex, get_store
+
+class ReminderIndex(DerivedIndex):
+    def __init__(self, date_field='date', key_field='entry_id'):
+        self.date_field = date_field
+        self.key_field = key_field
+        self._order = []
+        self._records = {}
+        self._by_key = {}
+        self._lock = threading.Lock()
+
+    def _add(self, record):
+        rid = record.get('id')
+        if rid is None:
+            return
+        self._remove(rid)
+        day = str(record.get(self.date_field) or "")
+        self._records[rid] = record
+        insort(self._order, (day, rid))
+        self._by_key.setdefault(record.get(self.key_field), set()).add(rid)
+
+    def _remove(self, rid):
+        record = self._records.pop(rid, None)
+        if record is None:
+            return
+        item = (str(record.get(self.date_field) or ""), rid)
+        i = bisect_left(self._order, item)
+        if i < len(self._order) and self._order[i] == item:
+            del self._order[i]
+        key = record.get(self.key_field)
+        ids = self._by_key.get(key)
+        if ids is not None:
+            ids.discard(rid)
+            if not ids:
+                del self._by_key[key]
+
+    # store 的 listener：ops 為 None 時整份重建，否則只處理本次異動的記錄
+    def apply(self, records, ops):
+        with self._lock:
+            if ops is None:
+                self._order, self._records, self._by_key = [], {}, {}
+                for r in records:
+                    self._add(r)
+                return
+            for op, payload in ops:
+                if op == 'delete':
+                    self._remove(payload)
+                else:
+                    self._add(payload)
+
+    # start/end 為 "YYYY-MM-DD" (含端點)，None 表示不設限；依日期排序回傳
+    def between(self, start=None, end=None, limit=None):
+        self.refresh()
+        with self._lock:
+            lo = bisect_left(self._order, (start,)) if start else 0
+            hi = bisect_right(self._order, (end, "\uffff")) if end else len(self._order)
+            if limit is not None:
+                hi = min(hi, lo + limit)
+            return [self._records[rid] for _, rid in self._order[lo:hi]]
+
+    def upcoming(self, days=7, today=None):
+        today = today or date.today()
+        return self.between(str(today), str(today + timedelta(days=days)))
+
+    def ids_for(self, keys):
+        self.refresh()
+        with self._lock:
+            return set().union(*(self._by_key.get(k, ()) for k in keys))
+
+    def __len__(self):
+        self.refresh()
+        return len(self._records)
+
+# -------------------- iCal 匯出 --------------------
+def _escape(text):
+    return (str(text).replace("\\", "\\\\").replace(";", "\\;")
+            .replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n"))
+
+# RFC 5545：每行不超過 75 位元組，續行以一個空白開頭；不可切斷多位元組字元
+def _fold(line):
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return data + b"\r\n"
+    out, chunk = [], b""
+    for ch in line:
+        encoded = ch.encode("utf-8")
+        if len(chunk) + len(encoded) > 75:
+            out.append(chunk)
+            chunk = b" "
+        chunk += encoded
+    out.append(chunk)
+    return b"\r\n".join(out) + b"\r\n"
+
+# 逐筆產生 .ics 內容 (bytes)，全天事件；summary(record) 決定事件標題
+def iter_ics(reminders, summary=None, calendar_name="HRP Reminders"):
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    for line in ("BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//ST Engineering//HRM//ZH-TW",
+                 "CALSCALE:GREGORIAN", f"X-WR-CALNAME:{_escape(calendar_name)}"):
+        yield _fold(line)
+    for r in reminders:
+        try:
+            day = datetime.strptime(str(r.get('date')), "%Y-%m-%d").date()
+        except ValueError:
+            continue
+        title = summary(r) if summary else r.get('note', '')
+        lines = [
+            "BEGIN:VEVENT",
+            f"UID:{r.get('id') or uuid.uuid4()}@hrm",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART;VALUE=DATE:{day:%Y%m%d}",
+            f"DTEND;VALUE=DATE:{day + timedelta(days=1):%Y%m%d}",
+            f"SUMMARY:{_escape(title)}",
+        ]
+        if r.get('note') and summary:
+            lines.append(f"DESCRIPTION:{_escape(r['note'])}")
+        lines.append("END:VEVENT")
+        for line in lines:
+            yield _fold(line)
+    yield _fold("END:VCALENDAR")
+
+# -------------------- 全程序共用的提醒索引 --------------------
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+# 建立索引時一併向 store 註冊 entry_id 查詢，連帶刪除不再掃描整份提醒
+def get_reminders(name, date_field='date', key_field='entry_id', store=None):
+    store = store or get_store()
+    with _indexes_lock:
+        index = _indexes.get((store, name))
+        if index is None:
+            index = _indexes[(store, name)] = ReminderIndex(date_field, key_field)
+            index.attach(store, name, lookup_field=key_field)
+        return index
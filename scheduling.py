@@ -0,0 +1,171 @@
+# scheduling.py — 面試排程：時間區間索引、衝突偵測與空檔查詢
+#
+# 每筆面試解析為 [start, end) 區間，依「地點」與「候選人」各自建立依開始時間排序的區間清單。
+# 查詢與某區間重疊的面試時，只需以二分搜尋找出開始時間落在 (start - 最長面試時長, end) 的視窗，
+# 成本為 O(log n + 視窗內筆數)，與整體面試數量無關。索引隨 store 的寫入增量更新。
+# 未填地點的面試 (例如線上面試) 不列入地點索引，也不與其他面試比對地點衝突。
+import re
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from store import DerivedIndex, get_store
+
+DEFAULT_MINUTES = 60
+DAY_START = "09:00"
+DAY_END = "18:00"
+TIME_FORMAT = "%Y-%m-%d %H:%M"
+
+_TIME_RE = re.compile(r"^\s*(\d{1,2})\s*[:：.時点點]?\s*(\d{2})?\s*分?\s*$")
+
+# 解析自由格式的時間 ("9:00"、"0930"、"14點30"…)，回傳 (時, 分)
+def parse_time(text):
+    m = _TIME_RE.match(str(text))
+    if not m:
+        raise ValueError(f"無法解析時間：{text}")
+    hour, minute = int(m.group(1)), int(m.group(2) or 0)
+    if hour > 23 or minute > 59:
+        raise ValueError(f"無效的時間：{text}")
+    return hour, minute
+
+# 記錄的面試區間；舊資料只有 "日期 時間" 字串，長度以 DEFAULT_MINUTES 計。無法解析時回傳 None
+def interval_of(record):
+    try:
+        if record.get('start'):
+            start = datetime.strptime(record['start'], TIME_FORMAT)
+        else:
+            day, _, time = str(record.get('datetime', '')).partition(" ")
+            hour, minute = parse_time(time)
+            start = datetime.strptime(day, "%Y-%m-%d").replace(hour=hour, minute=minute)
+        if record.get('end'):
+            end = datetime.strptime(record['end'], TIME_FORMAT)
+        else:
+            end = start + timedelta(minutes=DEFAULT_MINUTES)
+    except (TypeError, ValueError):
+        return None
+    return (start, end) if end > start else None
+
+# 每個鍵另外記錄各種時長的筆數：移除最長的面試後，最長時長改取剩餘時長中的最大值，
+# 查詢視窗不會一直停在已刪除的長時段 (不同時長的種類很少，重算成本可忽略)
+class IntervalIndex:
+    def __init__(self):
+        self._items = {}
+        self._lengths = {}
+        self._longest = {}
+
+    def add(self, key, start, end, item_id):
+        insort(self._items.setdefault(key, []), (start, end, item_id))
+        lengths = self._lengths.setdefault(key, {})
+        lengths[end - start] = lengths.get(end - start, 0) + 1
+        self._longest[key] = max(self._longest.get(key, timedelta(0)), end - start)
+
+    def remove(self, key, start, end, item_id):
+        items = self._items.get(key)
+        if not items:
+            return
+        i = bisect_left(items, (start, end, item_id))
+        if i == len(items) or items[i] != (start, end, item_id):
+            return
+        del items[i]
+        if not items:
+            del self._items[key], self._lengths[key], self._longest[key]
+            return
+        lengths = self._lengths[key]
+        lengths[end - start] -= 1
+        if not lengths[end - start]:
+            del lengths[end - start]
+            if end - start == self._longest[key]:
+                self._longest[key] = max(lengths)
+
+    # 與 [start, end) 重疊的 (start, end, id)
+    def overlapping(self, key, start, end):
+        items = self._items.get(key)
+        if not items:
+            return []
+        lo = bisect_left(items, (start - self._longest[key],))
+        hi = bisect_left(items, (end,))
+        return [it for it in items[lo:hi] if it[1] > start]
+
+class InterviewSchedule(DerivedIndex):
+    def __init__(self):
+        self._by_location = IntervalIndex()
+        self._by_candidate = IntervalIndex()
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _add(self, record):
+        item_id = record.get('id')
+        if item_id is None:
+            return
+        self._remove(item_id)
+        span = interval_of(record)
+        if span is None:
+            return
+        location, candidate = str(record.get('location') or "").strip(), record.get('candidate_id')
+        self._entries[item_id] = (location, candidate, span)
+        if location:
+            self._by_location.add(location, *span, item_id)
+        self._by_candidate.add(candidate, *span, item_id)
+
+    def _remove(self, item_id):
+        entry = self._entries.pop(item_id, None)
+        if entry is None:
+            return
+        location, candidate, span = entry
+        if location:
+            self._by_location.remove(location, *span, item_id)
+        self._by_candidate.remove(candidate, *span, item_id)
+
+    # store 的 listener：ops 為 None 時整份重建，否則只處理本次異動的記錄
+    def apply(self, records, ops):
+        with self._lock:
+            if ops is None:
+                self._by_location, self._by_candidate, self._entries = IntervalIndex(), IntervalIndex(), {}
+                for r in records:
+                    self._add(r)
+                return
+            for op, payload in ops:
+                if op == 'delete':
+                    self._remove(payload)
+                else:
+                    self._add(payload)
+
+    # 回傳 [(衝突類型, 面試 id)]，衝突類型為 'location' 或 'candidate'；exclude_id 用於修改既有面試。
+    # 地點空白時只檢查候選人
+    def conflicts(self, candidate_id, location, start, end, exclude_id=None):
+        self.refresh(force=True)
+        location = str(location or "").strip()
+        with self._lock:
+            found = []
+            if location:
+                found += [('location', it[2]) for it in self._by_location.overlapping(location, start, end)]
+            found += [('candidate', it[2]) for it in self._by_candidate.overlapping(candidate_id, start, end)]
+        return [(kind, item_id) for kind, item_id in found if item_id != exclude_id]
+
+    # 某地點某日在上班時段內、長度至少 minutes 分鐘的空檔 [(start, end)]
+    def free_slots(self, location, day, minutes=DEFAULT_MINUTES, day_start=DAY_START, day_end=DAY_END):
+        self.refresh()
+        open_at = datetime.combine(day, datetime.strptime(day_start, "%H:%M").time())
+        close_at = datetime.combine(day, datetime.strptime(day_end, "%H:%M").time())
+        with self._lock:
+            busy = self._by_location.overlapping(str(location or "").strip(), open_at, close_at)
+        slots, cursor = [], open_at
+        for start, end, _ in busy:
+            if start - cursor >= timedelta(minutes=minutes):
+                slots.append((cursor, start))
+            cursor = max(cursor, end)
+        if close_at - cursor >= timedelta(minutes=minutes):
+            slots.append((cursor, close_at))
+        return slots
+
+# -------------------- 全程序共用的排程索引 --------------------
+_schedules = {}
+_schedules_lock = threading.Lock()
+
+def get_schedule(name, store=None):
+    store = store or get_store()
+    with _schedules_lock:
+        schedule = _schedules.get((store, name))
+        if schedule is None:
+            schedule = _schedules[(store, name)] = InterviewSchedule()
+            schedule.attach(store, name)
+        return schedule
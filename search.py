@@ -0,0 +1,140 @@
+# search.py — 增量維護的倒排索引，提供候選人與員工申訴的全文排序搜尋
+#
+# 中文沒有空白斷詞，因此連續的 CJK 字元同時以單字 (unigram) 與雙字 (bigram) 建索引；
+# 英數字以整個單字 (小寫) 建索引。查詢時以相同方式切詞，所有詞都要命中 (AND)，
+# 從最稀有的詞開始交集 posting，只碰觸包含查詢詞的記錄而非整個資料集。
+import math
+import re
+import threading
+from collections import Counter
+from store import DerivedIndex, get_store
+
+SEARCH_LIMIT = 1000
+
+_CJK = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+_TOKEN_RE = re.compile(rf"[{_CJK}]+|[0-9a-z]+")
+_CJK_RE = re.compile(rf"[{_CJK}]")
+
+# 將文字切成 (片段, 是否為 CJK) 序列；英數字轉為小寫，其餘標點與空白捨棄
+def split_runs(text):
+    return [(run, bool(_CJK_RE.match(run))) for run in _TOKEN_RE.findall(str(text or "").lower())]
+
+def bigrams(run):
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+def tokenize(text):
+    terms = []
+    for run, cjk in split_runs(text):
+        if cjk:
+            terms.extend(run)
+            terms.extend(bigrams(run))
+        else:
+            terms.append(run)
+    return terms
+
+# 查詢詞：CJK 片段長度 ≥ 2 時只用 bigram (unigram 太常見，交集成本高且不增加精確度)
+def query_terms(text):
+    terms = []
+    for run, cjk in split_runs(text):
+        if cjk and len(run) > 1:
+            terms.extend(bigrams(run))
+        else:
+            terms.append(run)
+    return list(dict.fromkeys(terms))
+
+class InvertedIndex(DerivedIndex):
+    # fields 為 {欄位: 權重}，例如姓名命中比簡歷命中更重要
+    def __init__(self, fields):
+        self.fields = dict(fields)
+        self._postings = {}
+        self._docs = {}
+        self._lock = threading.Lock()
+
+    def _terms(self, record):
+        counts = Counter()
+        for field, weight in self.fields.items():
+            for term in tokenize(record.get(field)):
+                counts[term] += weight
+        return counts
+
+    def _add(self, record):
+        doc_id = record.get('id')
+        if doc_id is None:
+            return
+        self._remove(doc_id)
+        counts = self._terms(record)
+        self._docs[doc_id] = counts
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+
+    def _remove(self, doc_id):
+        counts = self._docs.pop(doc_id, None)
+        if not counts:
+            return
+        for term in counts:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self._postings[term]
+
+    # store 的 listener：ops 為 None 時整份重建，否則只處理本次異動的記錄
+    def apply(self, records, ops):
+        with self._lock:
+            if ops is None:
+                self._postings, self._docs = {}, {}
+                for r in records:
+                    self._add(r)
+                return
+            for op, payload in ops:
+                if op == 'delete':
+                    self._remove(payload)
+                else:
+                    self._add(payload)
+
+    # 回傳依相關度排序的 [(id, 分數)]；分數為 tf-idf 加總
+    def search(self, text, limit=SEARCH_LIMIT):
+        self.refresh()
+        terms = query_terms(text)
+        if not terms:
+            return []
+        with self._lock:
+            postings = [self._postings.get(t) for t in terms]
+            if not all(postings):
+                return []
+            postings.sort(key=len)
+            n = len(self._docs)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates.intersection_update(posting)
+                if not candidates:
+                    return []
+            scores = {}
+            for posting in postings:
+                idf = math.log(1 + n / len(posting))
+                for doc_id in candidates:
+                    scores[doc_id] = scores.get(doc_id, 0.0) + (1 + math.log(posting[doc_id])) * idf
+        ranked = sorted(scores.items(), key=lambda kv: -kv[1])
+        return ranked[:limit] if limit else ranked
+
+    def __len__(self):
+        self.refresh()
+        return len(self._docs)
+
+# -------------------- 全程序共用的索引 --------------------
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+# 每個 (資料集, 欄位設定) 只建一次索引，之後隨 store 的寫入增量更新
+def get_index(name, fields, store=None):
+    store = store or get_store()
+    key = (store, name, tuple(sorted(fields.items())))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = InvertedIndex(fields)
+            index.attach(store, name)
+        return index
+
+def search_ids(name, fields, text, limit=SEARCH_LIMIT, store=None):
+    return [doc_id for doc_id, _ in get_index(name, fields, store).search(text, limit)]
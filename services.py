@@ -0,0 +1,611 @@
+# services.py — 不依賴 Streamlit 的業務邏輯層：各模組的新增/修改/刪除、匯入匯出、分析與日誌
+#
+# Streamlit 頁面只負責表單與呈現，實際操作都呼叫這裡的服務；批次作業 (cli.py) 直接使用同一組服務，
+# 不經過 Streamlit 的重跑流程。驗證失敗時拋出 ValueError (訊息可直接顯示給使用者)，
+# 樂觀鎖衝突時拋出 store.ConflictError。
+# pandas、報表與 PDF 相關模組只在用到的方法內匯入，頁面匯入本模組時不增加冷啟動成本。
+import os
+import shutil
+import threading
+import uuid
+from datetime import datetime, timedelta
+import export
+import importer
+import journal
+from aggregates import SPECS as SUMMARY_SPECS, get_summary
+from employees import (ANONYMOUS, EMPLOYEE_FILE, LINKED, backfill, create_employees, ensure_employees,
+                       get_registry, link_employee, link_records, normalize_name)
+from keywords import get_stats
+from relations import get_group_index
+from reminders import get_reminders, iter_ics
+from scheduling import TIME_FORMAT, get_schedule
+from search import search_ids
+from store import get_store
+
+def now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+def _blank(value):
+    return not str(value if value is not None else "").strip()
+
+class Service:
+    key = ""                 # 模組代號 (CLI 與 get_service 使用)
+    title = ""
+    data_file = None
+    log_file = None
+    import_schema = {}
+    search_fields = {}
+    required = {}            # 新增/修改時不可為空的欄位 → 顯示名稱
+    actions = {'create': "新增", 'update': "修改", 'delete': "刪除", 'batch_delete': "批量刪除"}
+
+    def __init__(self, store=None):
+        self.store = store or get_store()
+
+    # ---- 日誌 ----
+    def log(self, action, details):
+        journal.append_entry(self.log_file, {'id': str(uuid.uuid4()), 'action': action,
+                                             'details': details, 'timestamp': now()})
+
+    def logs(self, limit=None, start=None, end=None):
+        return journal.read_entries(self.log_file, limit=limit, start=start, end=end)
+
+    # 由新到舊分頁，回傳 (本頁日誌, 範圍內總筆數)
+    def log_page(self, page=1, page_size=50, start=None, end=None):
+        return journal.read_page(self.log_file, page, page_size, start, end)
+
+    # ---- 讀取 ----
+    def records(self):
+        return self.store.records(self.data_file)
+
+    def get(self, record_id):
+        return self.store.get(self.data_file, record_id)
+
+    def page(self, where=(), sort_by=None, descending=False, page=1, page_size=50, ids=None):
+        return self.store.page(self.data_file, where, sort_by, descending, page, page_size, ids=ids)
+
+    def search(self, text, limit=1000):
+        return search_ids(self.data_file, self.search_fields, text, limit, store=self.store)
+
+    # 記錄在日誌與訊息中的簡短描述
+    def describe(self, record):
+        return str(record.get('id'))
+
+    # ---- 寫入 ----
+    # 驗證並補上衍生欄位 (子類別覆寫)；回傳要寫入的欄位
+    def prepare(self, fields):
+        for field, label in self.required.items():
+            if _blank(fields.get(field)):
+                raise ValueError(f"{label}不可為空。")
+        return dict(fields)
+
+    def create(self, fields):
+        record = self.store.insert(self.data_file, {'id': str(uuid.uuid4()), **self.prepare(fields), 'created_at': now()})
+        self.log(self.actions['create'], self.describe(record))
+        return record
+
+    def update(self, record_id, fields, expected_version=None):
+        updated = self.store.update(self.data_file, record_id, {**self.prepare(fields), 'updated_at': now()},
+                                    expected_version=expected_version)
+        if updated is not None:
+            self.log(self.actions['update'], self.describe(updated))
+        return updated
+
+    # 刪除一筆或多筆 (依 CASCADES 連帶刪除從屬記錄)；回傳 {資料集: 刪除筆數}
+    def delete(self, records, expected_versions=None):
+        records = list(records)
+        deleted = self.store.delete_many(self.data_file, {r['id'] for r in records}, expected_versions)
+        if len(records) == 1:
+            self.log(self.actions['delete'], self.describe(records[0]))
+        elif records:
+            self.log(self.actions['batch_delete'], f"{len(records)} 筆：{', '.join(self.describe(r) for r in records)}")
+        return deleted
+
+    # ---- 批次匯入 ----
+    # 匯入時以向量化方式補上衍生欄位 (DataFrame → DataFrame)
+    derive = None
+
+    # 寫入前補上欄位 (例如連結員工主檔)，就地修改 records
+    def before_import(self, records):
+        pass
+
+    def after_import(self, inserted):
+        pass
+
+    def prepare_import(self, file, file_name):
+        return importer.prepare_import(file, file_name, self.import_schema, self.derive)
+
+    def commit_import(self, records, source=""):
+        self.before_import(records)
+        inserted = importer.commit_import(self.data_file, records, self.store)
+        self.after_import(inserted)
+        self.log("批次匯入", f"{source}：{len(inserted)} 筆")
+        return inserted
+
+    # 由檔案路徑匯入；dry_run 時只驗證不寫入。回傳 (記錄, 錯誤清單)
+    def import_path(self, path, dry_run=False):
+        with open(path, "rb") as f:
+            records, errors = self.prepare_import(f, os.path.basename(path))
+        if records and not dry_run:
+            records = self.commit_import(records, os.path.basename(path))
+        return records, errors
+
+    # ---- 匯出 ----
+    def datasets(self):
+        return [self.data_file]
+
+    # 回傳 (檔案路徑, 下載檔名, MIME 類型)；指定 dest 時另複製一份到該路徑
+    def export(self, fmt='json', compress=False, dataset=None, dest=None):
+        dataset = dataset or self.data_file
+        path, file_name, mime = export.export_file(dataset, fmt, compress, store=self.store)
+        if dest:
+            if os.path.isdir(dest):
+                dest = os.path.join(dest, file_name)
+            shutil.copyfile(path, dest)
+            path = dest
+        return path, file_name, mime
+
+    # ---- 分析 ----
+    def analytics(self):
+        if self.data_file in SUMMARY_SPECS:
+            return get_summary(self.data_file, self.store)
+        return {'dataset': self.data_file, 'count': len(self.records())}
+
+# -------------------- 人力資源規劃 --------------------
+class HRPlanningService(Service):
+    key = "hrp"
+    title = "人力資源規劃"
+    data_file = "hrp_data.json"
+    log_file = "hrp_logs.jsonl"
+    calendar_file = "hrp_calendar.json"
+    default_reminder = "請安排招聘會議"
+    import_schema = {
+        'year': {'type': 'int', 'required': True, 'min': 2023, 'max': 2030},
+        'department': {'default': ''},
+        'position': {'default': ''},
+        'demand': {'required': True},
+        'deadline': {'type': 'date', 'required': True},
+        'notes': {'default': ''},
+    }
+    required = {'demand': "需求描述"}
+    actions = {'create': "新增需求", 'update': "修改需求", 'delete': "刪除需求", 'batch_delete': "批量刪除"}
+
+    def __init__(self, store=None):
+        super().__init__(store)
+        # 提醒索引在建立服務時就向 store 註冊，刪除需求時的連帶刪除才能使用 entry_id 索引
+        self.calendar = get_reminders(self.calendar_file, store=self.store)
+
+    def describe(self, record):
+        return f"{record.get('year')} {record.get('department', '')} - {record.get('position', '')}"
+
+    # 每筆需求同步一筆日曆提醒 (期限當天)
+    def create(self, fields, reminder_note=None):
+        record = super().create(fields)
+        self.store.insert(self.calendar_file, {'id': str(uuid.uuid4()), 'entry_id': record['id'],
+                                               'date': record['deadline'], 'note': reminder_note or self.default_reminder})
+        return record
+
+    def after_import(self, inserted):
+        self.store.insert_many(self.calendar_file, [
+            {'id': str(uuid.uuid4()), 'entry_id': e['id'], 'date': e['deadline'], 'note': self.default_reminder}
+            for e in inserted
+        ])
+
+    def datasets(self):
+        return [self.data_file, self.calendar_file]
+
+    def reminders(self, start=None, end=None, days=None):
+        if days is not None:
+            return self.calendar.upcoming(days)
+        return self.calendar.between(start, end)
+
+    def reminder_title(self, reminder, entries=None):
+        entry = entries.get(reminder.get('entry_id')) if entries is not None else self.get(reminder.get('entry_id'))
+        note = reminder.get('note', '')
+        return f"{entry['department']} - {entry['position']}：{note}" if entry else note
+
+    # 提醒 → .ics bytes
+    def ics(self, reminders):
+        entries = {e['id']: e for e in self.records()}
+        return b"".join(iter_ics(reminders, lambda r: self.reminder_title(r, entries)))
+
+    def top_keywords(self, k=10, year=None, department=None):
+        return get_stats(self.data_file, store=self.store).top(k, year=year, department=department)
+
+    def analytics(self):
+        from collections import Counter
+        records = self.records()
+        return {
+            'dataset': self.data_file,
+            'count': len(records),
+            'by_year': dict(sorted(Counter(str(r.get('year')) for r in records).items())),
+            'by_department': dict(Counter(r.get('department', '') for r in records).most_common(10)),
+            'keywords': self.top_keywords(),
+        }
+
+# -------------------- 招募與遴選 --------------------
+# 面試時段衝突；conflicts 為 [(種類, 面試 id)]，種類為 'location' 或 'candidate'
+class ScheduleConflict(ValueError):
+    KINDS = {'location': "地點已被預約", 'candidate': "候選人已有其他面試"}
+
+    def __init__(self, conflicts):
+        self.conflicts = conflicts
+        super().__init__("時段衝突：" + "；".join(sorted({self.KINDS[k] for k, _ in conflicts})))
+
+class RecruitmentService(Service):
+    key = "rs"
+    title = "招募與遴選"
+    data_file = "rs_data.json"
+    log_file = "rs_logs.jsonl"
+    interview_file = "rs_interviews.json"
+    # 全文搜尋欄位與權重：姓名命中 > 職位 > 簡歷
+    search_fields = {'name': 3, 'position': 2, 'resume': 1}
+    import_schema = {
+        'name': {'required': True},
+        'position': {'required': True},
+        'resume': {'default': ''},
+        'rating': {'type': 'int', 'min': 1, 'max': 5, 'default': 3},
+    }
+    required = {'name': "姓名", 'position': "職位"}
+    actions = {'create': "新增候選人", 'update': "修改候選人", 'delete': "刪除候選人", 'batch_delete': "批量刪除"}
+
+    def describe(self, record):
+        return f"{record.get('name')} - {record.get('position')}"
+
+    def datasets(self):
+        return [self.data_file, self.interview_file]
+
+    def schedule(self):
+        return get_schedule(self.interview_file, self.store)
+
+    def free_slots(self, location, day, minutes):
+        return self.schedule().free_slots(location, day, minutes)
+
+    # 安排面試；時段衝突時拋出 ScheduleConflict，force=True 則照常安排並標記為衝突
+    def schedule_interview(self, candidate, start, minutes, location, force=False):
+        end = start + timedelta(minutes=minutes)
+        conflicts = self.schedule().conflicts(candidate['id'], location, start, end)
+        if conflicts and not force:
+            raise ScheduleConflict(conflicts)
+        interview = {
+            'id': str(uuid.uuid4()),
+            'candidate_id': candidate['id'],
+            'datetime': start.strftime(TIME_FORMAT),
+            'start': start.strftime(TIME_FORMAT),
+            'end': end.strftime(TIME_FORMAT),
+            'location': location,
+            'conflict': bool(conflicts),
+        }
+        interview = self.store.insert(self.interview_file, interview)
+        self.log("安排面試", f"{self.describe(candidate)} on {interview['datetime']}")
+        return interview
+
+# -------------------- 訓練與發展 --------------------
+class TrainingService(Service):
+    key = "td"
+    title = "訓練與發展"
+    data_file = "td_data.json"
+    log_file = "td_logs.jsonl"
+    session_file = "td_attendance.json"     # 培訓場次
+    attendee_file = "td_attendees.json"     # 每位員工的出席記錄
+    cert_file = "td_certificates.json"
+    statuses = ["出席", "缺席", "請假"]
+    import_schema = {
+        'course': {'required': True},
+        'description': {'default': ''},
+        'duration': {'type': 'int', 'min': 1, 'max': 8, 'default': 2},
+        'start_date': {'type': 'date', 'required': True},
+        'expected_rating': {'type': 'int', 'min': 1, 'max': 5, 'default': 3},
+    }
+    required = {'course': "課程名稱"}
+    actions = {'create': "新增課程", 'update': "更新課程", 'delete': "刪除課程", 'batch_delete': "批次刪除"}
+
+    def __init__(self, store=None):
+        super().__init__(store)
+        # 關聯索引：以 id 查課程、課程 → 場次、場次 → 出席者、課程 → 證書
+        self.courses = get_group_index(self.data_file, 'id', self.store)
+        self.sessions_by_course = get_group_index(self.session_file, 'course_id', self.store)
+        self.attendees_by_session = get_group_index(self.attendee_file, 'session_id', self.store)
+        self.certificates_by_course = get_group_index(self.cert_file, 'course_id', self.store)
+
+    def describe(self, record):
+        return str(record.get('course'))
+
+    def datasets(self):
+        return [self.data_file, self.session_file, self.attendee_file, self.cert_file]
+
+    def session_label(self, session):
+        course = self.courses.record(session.get('course_id'))
+        return f"{course['course'] if course else '(已刪除課程)'} @ {session['date']}"
+
+    def schedule_session(self, course, day, venue):
+        session = {'id': str(uuid.uuid4()), 'course_id': course['id'], 'date': str(day), 'venue': venue}
+        session = self.store.insert(self.session_file, session)
+        self.log("安排場次", course['course'])
+        return session
+
+    # 同一場次一次標記多位員工：新員工新增一筆，狀態改變者更新。回傳 (新增, 更新) 記錄
+    def mark_attendance(self, session, emps, status):
+        emps = list(dict.fromkeys(e.strip() for e in emps if e and e.strip()))
+        if not emps:
+            raise ValueError("請輸入至少一位員工。")
+        if status not in self.statuses:
+            raise ValueError(f"狀態必須是 {'/'.join(self.statuses)}。")
+        # 其他程序可能剛標記過同一場次，先強制同步再比對，避免重複新增出席記錄
+        self.attendees_by_session.refresh(force=True)
+        existing = {a['emp']: a for a in self.attendees_by_session.group(session['id'])}
+        stamp = now()
+        emp_ids = ensure_employees(emps, store=self.store)
+        new = [{'id': str(uuid.uuid4()), 'session_id': session['id'], 'course_id': session['course_id'],
+                'emp': emp, 'emp_id': emp_ids.get(normalize_name(emp)), 'status': status, 'marked_at': stamp}
+               for emp in emps if emp not in existing]
+        changed = {existing[emp]['id'] for emp in emps if emp in existing and existing[emp].get('status') != status}
+        self.store.insert_many(self.attendee_file, new)
+        updated = self.store.update_many(self.attendee_file, changed, {'status': status, 'marked_at': stamp})
+        self.log("出席標記", f"{self.session_label(session)}：{len(emps)} 位 {status}")
+        return new, updated
+
+    def attendees(self, session, status=None):
+        return [a for a in self.attendees_by_session.group(session['id']) if status is None or a.get('status') == status]
+
+    def issue_certificate(self, course, name):
+        if _blank(name):
+            raise ValueError("員工姓名不可為空。")
+        cert = {'id': str(uuid.uuid4()), 'course_id': course['id'], 'name': name,
+                'emp_id': link_employee(name, store=self.store), 'date': datetime.now().strftime("%Y-%m-%d")}
+        self.store.insert(self.cert_file, cert)
+        self.log("生成證書", f"{name} - {course['course']}")
+        return cert
+
+    # 為場次所有出席者發證 (已發過證書者沿用原證書)。回傳 (證書清單, 新發張數)，清單依姓名排序
+    def issue_session_certificates(self, session):
+        course = self.courses.record(session.get('course_id'))
+        if course is None:
+            raise ValueError("此場次的課程已被刪除。")
+        attendees = sorted({a['emp'] for a in self.attendees(session, "出席")})
+        self.certificates_by_course.refresh(force=True)
+        issued = {c['name']: c for c in self.certificates_by_course.group(course['id'])}
+        today = datetime.now().strftime("%Y-%m-%d")
+        emp_ids = ensure_employees(attendees, store=self.store)
+        new = [{'id': str(uuid.uuid4()), 'course_id': course['id'], 'session_id': session['id'],
+                'name': emp, 'emp_id': emp_ids.get(normalize_name(emp)), 'date': today}
+               for emp in attendees if emp not in issued]
+        self.store.insert_many(self.cert_file, new)
+        certs = [issued[emp] for emp in attendees if emp in issued] + new
+        return [{**c, 'course': course['course']} for c in certs], len(new)
+
+    # 產生證書 PDF 並打包成 zip，回傳 (zip 路徑, 證書張數, 新發張數)。
+    # 先確認 reportlab 可用，避免發了證書記錄卻產生不出 PDF
+    def certificate_zip(self, session, workers=None):
+        import certificates
+        if not certificates.available():
+            raise ValueError(certificates.REPORTLAB_HINT)
+        certs, fresh = self.issue_session_certificates(session)
+        path = certificates.build_zip(certs, workers=workers)
+        self.log("批次產生證書", f"{self.session_label(session)}：{len(certs)} 張 (新發 {fresh})")
+        return path, len(certs), fresh
+
+# -------------------- 績效管理 --------------------
+class PerformanceService(Service):
+    key = "kpi"
+    title = "績效管理"
+    data_file = "kpi_data.json"
+    log_file = "kpi_logs.jsonl"
+    import_schema = {
+        'emp': {'required': True},
+        'department': {'default': ''},
+        'manager': {'default': ''},
+        'score': {'type': 'int', 'required': True, 'min': 0, 'max': 100},
+        'goal_rate': {'type': 'int', 'required': True, 'min': 0, 'max': 100},
+        'comments': {'default': ''},
+    }
+    required = {'emp': "員工姓名"}
+    actions = {'create': "新增績效", 'update': "修改績效", 'delete': "刪除績效", 'batch_delete': "批量刪除績效"}
+
+    def describe(self, record):
+        return f"{record.get('emp')} - {record.get('score')}"
+
+    def prepare(self, fields):
+        fields = super().prepare(fields)
+        fields['emp_id'] = link_employee(fields['emp'], fields.get('department', ''), self.store)
+        return fields
+
+    def before_import(self, records):
+        link_records(records, store=self.store)
+
+    def frame(self):
+        from frames import get_frame
+        return get_frame(self.data_file, self.store)
+
+    def calibration_years(self):
+        import calibration
+        return calibration.year_options(self.frame())
+
+    def calibrate(self, year, curve=None, score_weight=None):
+        import calibration
+        return calibration.calibrate(self.frame(), year, curve or calibration.DEFAULT_CURVE,
+                                     calibration.SCORE_WEIGHT if score_weight is None else score_weight)
+
+    # 將校準結果 (calibrated / grade) 寫回績效記錄，一次寫入
+    def apply_calibration(self, result, year, note=""):
+        changes = {row.id: {'calibrated': float(row.calibrated), 'grade': str(row.grade), 'calibrated_year': str(year)}
+                   for row in result[['id', 'calibrated', 'grade']].itertuples(index=False)}
+        updated = self.store.update_each(self.data_file, changes)
+        self.log("績效校準", f"{year}：{len(updated)} 筆" + (f"，曲線 {note}" if note else ""))
+        return updated
+
+# -------------------- 薪酬與福利 --------------------
+class CompensationService(Service):
+    key = "comp"
+    title = "薪酬與福利"
+    data_file = "comp_data.json"
+    log_file = "comp_logs.jsonl"
+    run_file = "comp_payroll_runs.json"     # 每次薪資計算的摘要；明細見 payroll.RUN_DIR
+    # total 由 salary + bonus 計算
+    import_schema = {
+        'emp': {'required': True},
+        'department': {'default': ''},
+        'salary': {'type': 'int', 'required': True, 'min': 0},
+        'bonus': {'type': 'int', 'min': 0, 'default': 0},
+        'benefits': {'default': ''},
+    }
+    required = {'emp': "員工姓名"}
+    actions = {'create': "新增薪酬", 'update': "修改薪酬", 'delete': "刪除薪酬", 'batch_delete': "批量刪除薪酬"}
+
+    @staticmethod
+    def derive(df):
+        return df.assign(total=df['salary'] + df['bonus'])
+
+    def describe(self, record):
+        return f"{record.get('emp')} - {record.get('total')}"
+
+    def prepare(self, fields):
+        fields = super().prepare(fields)
+        fields['total'] = (fields.get('salary') or 0) + (fields.get('bonus') or 0)
+        fields['emp_id'] = link_employee(fields['emp'], fields.get('department', ''), self.store)
+        return fields
+
+    def before_import(self, records):
+        link_records(records, store=self.store)
+
+    def datasets(self):
+        return [self.data_file, self.run_file]
+
+    def frame(self):
+        from frames import get_frame
+        return get_frame(self.data_file, self.store)
+
+    # 計算並保存一個月份的薪資；回傳 (明細 DataFrame, 摘要記錄)
+    def run_payroll(self, year, month):
+        import payroll
+        run = payroll.run_payroll(self.frame(), year, month)
+        _, summary = payroll.save_run(run, year, month)
+        self.store.insert(self.run_file, summary)
+        self.log("薪資計算", f"{summary['month']}：{summary['headcount']} 人，實發合計 {summary['net']:,.0f}")
+        return run, summary
+
+    def payroll_runs(self):
+        return sorted(self.store.records(self.run_file), key=lambda r: r['created_at'], reverse=True)
+
+    def monthly_totals(self, months):
+        import payroll
+        return payroll.monthly_totals(self.frame(), months)
+
+# -------------------- 員工關係 --------------------
+class EmployeeRelationsService(Service):
+    key = "er"
+    title = "員工關係"
+    data_file = "er_data.json"
+    log_file = "er_logs.jsonl"
+    categories = ["工作環境", "薪酬福利", "管理風格", "其他"]
+    search_fields = {'issue': 1}
+    import_schema = {
+        'emp': {'default': ANONYMOUS},
+        'category': {'required': True, 'choices': categories},
+        'urgency': {'type': 'int', 'min': 1, 'max': 5, 'default': 3},
+        'issue': {'required': True},
+    }
+    required = {'issue': "內容"}
+    actions = {'create': "提交意見", 'update': "修改意見", 'delete': "刪除意見", 'batch_delete': "批量刪除意見"}
+
+    def describe(self, record):
+        return f"{record.get('emp')} | {record.get('category')} | {str(record.get('issue', ''))[:20]}"
+
+    # 姓名留空視為匿名，匿名提交不連結員工主檔
+    def prepare(self, fields):
+        fields = super().prepare(fields)
+        fields['emp'] = str(fields.get('emp') or "").strip() or ANONYMOUS
+        fields['emp_id'] = link_employee(fields['emp'], store=self.store)
+        return fields
+
+    def before_import(self, records):
+        link_records(records, store=self.store)
+
+# -------------------- 員工主檔 --------------------
+class EmployeeService(Service):
+    key = "em"
+    title = "員工主檔"
+    data_file = EMPLOYEE_FILE
+    log_file = "em_logs.jsonl"
+    search_fields = {'name': 3, 'emp_no': 2, 'department': 1}
+    import_schema = {
+        'name': {'required': True},
+        'department': {'default': ''},
+    }
+    required = {'name': "姓名"}
+    actions = {'create': "新增員工", 'update': "修改員工", 'delete': "刪除員工", 'batch_delete': "批量刪除員工"}
+
+    def __init__(self, store=None):
+        super().__init__(store)
+        self.registry = get_registry(self.store)
+        # 各模組記錄依 emp_id 分組，員工檔案直接以 emp_id 取回，不掃描整份資料
+        self.by_employee = {name: get_group_index(name, 'emp_id', self.store) for name in LINKED}
+
+    def describe(self, record):
+        return f"{record.get('emp_no', '')} {record.get('name')}（{record.get('department') or '未填部門'}）"
+
+    # 手動新增一律建立新員工 (同名由介面提示)，員工編號在寫入鎖內配發
+    def create(self, fields):
+        fields = self.prepare(fields)
+        _, (record,) = create_employees([(fields['name'], fields.get('department', ''))], reuse=False,
+                                        status=fields.get('status') or "在職", store=self.store)
+        self.log(self.actions['create'], self.describe(record))
+        return record
+
+    def prepare(self, fields):
+        fields = super().prepare(fields)
+        fields['name'] = fields['name'].strip()
+        fields['name_key'] = normalize_name(fields['name'])
+        return fields
+
+    # 更名時一併更新各模組記錄中的姓名欄位 (以 emp_id 找出記錄，每個資料集寫入一次)
+    def update(self, record_id, fields, expected_version=None):
+        before = self.get(record_id)
+        updated = super().update(record_id, fields, expected_version)
+        renamed = 0
+        if updated and before and updated['name'] != before['name']:
+            for dataset, field in LINKED.items():
+                ids = self.by_employee[dataset].ids_for([record_id])
+                renamed += len(self.store.update_each(dataset, {rid: {field: updated['name']} for rid in ids}))
+            self.log("同步更名", f"{self.describe(updated)}：{renamed} 筆記錄")
+        return updated
+
+    # 匯入員工名冊：已存在的姓名略過，新姓名依序編號並保留匯入的部門；只回傳新增的員工
+    def commit_import(self, records, source=""):
+        _, inserted = create_employees([(r['name'], r.get('department', '')) for r in records], store=self.store)
+        self.log("批次匯入", f"{source}：{len(inserted)} 筆")
+        return inserted
+
+    def backfill(self):
+        result = backfill(store=self.store)
+        self.log("同步既有記錄", ", ".join(f"{k}: {v}" for k, v in result.items()))
+        return result
+
+    # 360° 檔案：員工在各模組的記錄 {資料集: [記錄]}
+    def profile(self, emp_id):
+        return {name: index.group(emp_id) for name, index in self.by_employee.items()}
+
+    def analytics(self):
+        from collections import Counter
+        employees = self.registry.all()
+        return {
+            'dataset': self.data_file,
+            'count': len(employees),
+            'by_status': dict(Counter(e.get('status', '') for e in employees)),
+            'by_department': dict(Counter(e.get('department', '') for e in employees).most_common()),
+        }
+
+# -------------------- 服務註冊表 --------------------
+SERVICES = {cls.key: cls for cls in (
+    HRPlanningService, RecruitmentService, TrainingService, PerformanceService,
+    CompensationService, EmployeeRelationsService, EmployeeService,
+)}
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+def get_service(key):
+    with _instances_lock:
+        service = _instances.get(key)
+        if service is None:
+            service = _instances[key] = SERVICES[key]()
+        return service
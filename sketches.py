@@ -0,0 +1,248 @@
+# sketches.py — 可合併的分位數草圖 (KLL)：中位數、P90、分位帶與直方圖
+#
+# KLLSketch 只保留約 O(k·log(n/k)) 個樣本，分位數誤差約 1.7/k (k=200 時約 1%)，
+# 兩份草圖可直接 merge，因此各分區 (部門 × 年度) 各自維護，查詢時再合併所需的分區。
+# 草圖本身不支援刪除：記錄被修改或刪除時舊值先留在草圖中，只計入墓碑數；墓碑超過現存記錄的
+# REBUILD_RATIO 時以 store 傳入的快照整份重建。重建為 O(n)，攤銷到每次異動為 O(1/REBUILD_RATIO)，
+# 查詢結果最多混入該比例的舊值；索引不另存原始值。新增記錄直接增量加入。
+import random
+import threading
+from bisect import bisect_right
+from itertools import accumulate
+from store import DerivedIndex, get_store
+
+DEFAULT_K = 200
+REBUILD_RATIO = 0.05
+BANDS = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+class KLLSketch:
+    def __init__(self, k=DEFAULT_K, seed=None):
+        self.k = k
+        self.n = 0
+        self.min = None
+        self.max = None
+        self.levels = [[]]
+        self._rng = random.Random(seed)
+        self._sorted = None
+        self._size = 0
+        self._limit = self._max_size()
+
+    # 第 h 層的容量：越高層越大，最上層為 k，最低不少於 2
+    def _capacity(self, h):
+        depth = len(self.levels) - h - 1
+        return max(2, int(self.k * (2 / 3) ** depth) + 1)
+
+    def _max_size(self):
+        return sum(self._capacity(h) for h in range(len(self.levels)))
+
+    # 找出第一個超出容量的層，排序後隨機取奇數或偶數位置的一半升到上一層 (權重加倍)
+    def _compress(self):
+        while self._size > self._limit:
+            for h, level in enumerate(self.levels):
+                if len(level) >= self._capacity(h):
+                    if h + 1 == len(self.levels):
+                        self.levels.append([])
+                        self._limit = self._max_size()
+                    level.sort()
+                    keep = [level.pop()] if len(level) % 2 else []
+                    promoted = level[self._rng.randint(0, 1)::2]
+                    self.levels[h + 1].extend(promoted)
+                    self._size -= len(level) - len(promoted)
+                    self.levels[h] = keep
+                    break
+
+    def update(self, value):
+        value = float(value)
+        self.levels[0].append(value)
+        self.n += 1
+        self._size += 1
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self._sorted = None
+        if self._size > self._limit:
+            self._compress()
+
+    def merge(self, other):
+        if not other.n:
+            return self
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for h, level in enumerate(other.levels):
+            self.levels[h].extend(level)
+        self.n += other.n
+        self._size += other._size
+        self._limit = self._max_size()
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self._sorted = None
+        self._compress()
+        return self
+
+    def copy(self):
+        sketch = KLLSketch(self.k)
+        sketch.merge(self)
+        return sketch
+
+    # (已排序的值, 累積權重)，查詢之間快取
+    def _weighted(self):
+        if self._sorted is None:
+            items = sorted((v, 1 << h) for h, level in enumerate(self.levels) for v in level)
+            self._sorted = ([v for v, _ in items], list(accumulate(w for _, w in items)))
+        return self._sorted
+
+    def quantile(self, q):
+        if not self.n:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        values, weights = self._weighted()
+        target = q * weights[-1]
+        i = min(bisect_right(weights, target), len(values) - 1)
+        return values[i]
+
+    def quantiles(self, qs=BANDS):
+        return {q: self.quantile(q) for q in qs}
+
+    # 小於等於 value 的比例
+    def cdf(self, value):
+        if not self.n:
+            return None
+        values, weights = self._weighted()
+        i = bisect_right(values, value)
+        return weights[i - 1] / weights[-1] if i else 0.0
+
+    # 等寬直方圖：以 cdf 在各組界的差估計每組筆數，回傳 [(下界, 上界, 筆數)]
+    def histogram(self, bins=10):
+        if not self.n:
+            return []
+        lo, hi = self.min, self.max
+        width = (hi - lo) / bins or 1.0
+        edges = [lo + width * i for i in range(bins + 1)]
+        edges[-1] = hi
+        below = [0.0] + [self.cdf(e) for e in edges[1:-1]] + [1.0]
+        return [(edges[i], edges[i + 1], round((below[i + 1] - below[i]) * self.n))
+                for i in range(bins)]
+
+    def to_dict(self):
+        return {'k': self.k, 'n': self.n, 'min': self.min, 'max': self.max, 'levels': [list(l) for l in self.levels]}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data.get('k', DEFAULT_K))
+        sketch.n = data.get('n', 0)
+        sketch.min = data.get('min')
+        sketch.max = data.get('max')
+        sketch.levels = [list(l) for l in data.get('levels', [[]])] or [[]]
+        sketch._size = sum(len(l) for l in sketch.levels)
+        sketch._limit = sketch._max_size()
+        return sketch
+
+    def __len__(self):
+        return self.n
+
+# -------------------- 依分區維護的草圖 --------------------
+# 各資料集要建立草圖的數值欄位；分區為 (部門, 年度)
+SPECS = {
+    "comp_data.json": ['salary', 'bonus', 'total'],
+    "kpi_data.json": ['score'],
+}
+
+def _number(value):
+    if isinstance(value, bool) or value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+# 年度取自 year 欄位，沒有時取 created_at 的前四碼
+def partition_of(record):
+    year = record.get('year') or str(record.get('created_at') or "")[:4]
+    return (str(record.get('department') or ""), str(year))
+
+class QuantileIndex(DerivedIndex):
+    def __init__(self, fields, k=DEFAULT_K, rebuild_ratio=REBUILD_RATIO):
+        self.fields = list(fields)
+        self.k = k
+        self.rebuild_ratio = rebuild_ratio
+        self._sketches = {}    # 分區 -> {欄位: KLLSketch}
+        self._tombstones = 0   # 舊值仍留在草圖中的修改/刪除筆數
+        self._lock = threading.Lock()
+
+    def _empty(self):
+        return {f: KLLSketch(self.k) for f in self.fields}
+
+    def _add(self, record):
+        part = partition_of(record)
+        sketches = self._sketches.get(part)
+        if sketches is None:
+            sketches = self._sketches[part] = self._empty()
+        for field in self.fields:
+            x = _number(record.get(field))
+            if x is not None:
+                sketches[field].update(x)
+
+    def _rebuild(self, records):
+        self._sketches, self._tombstones = {}, 0
+        for r in records:
+            self._add(r)
+
+    # store 的 listener：ops 為 None 時整份重建，否則增量加入新值並累計墓碑，
+    # 墓碑過多時再以 records (異動後的完整快照) 重建
+    def apply(self, records, ops):
+        with self._lock:
+            if ops is None:
+                self._rebuild(records)
+                return
+            for op, payload in ops:
+                if op != 'insert':
+                    self._tombstones += 1
+                if op != 'delete':
+                    self._add(payload)
+            if self._tombstones > self.rebuild_ratio * len(records):
+                self._rebuild(records)
+
+    # 分區在下次重建前可能只剩已刪除的舊值
+    def partitions(self):
+        self.refresh()
+        with self._lock:
+            return sorted(self._sketches)
+
+    def _matching(self, department=None, year=None):
+        for part in self._sketches:
+            if (department is None or part[0] == department) and (year is None or part[1] == year):
+                yield part
+
+    # 合併符合條件的分區，回傳新的草圖 (不影響索引內的草圖)
+    def sketch(self, field, department=None, year=None):
+        self.refresh()
+        with self._lock:
+            merged = KLLSketch(self.k)
+            for part in self._matching(department, year):
+                merged.merge(self._sketches[part][field])
+            return merged
+
+    # 依部門或年度分組的分位帶：{組別: {'count': n, q: 值, ...}}
+    def bands(self, field, by='department', qs=BANDS, **filters):
+        self.refresh()
+        pos = 0 if by == 'department' else 1
+        with self._lock:
+            groups = {}
+            for part in self._matching(**filters):
+                groups.setdefault(part[pos], KLLSketch(self.k)).merge(self._sketches[part][field])
+        return {key: {'count': s.n, **s.quantiles(qs)} for key, s in sorted(groups.items())}
+
+# -------------------- 全程序共用的草圖索引 --------------------
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_quantiles(name, store=None):
+    store = store or get_store()
+    with _indexes_lock:
+        index = _indexes.get((store, name))
+        if index is None:
+            index = _indexes[(store, name)] = QuantileIndex(SPECS[name])
+            index.attach(store, name)
+        return index
@@ -0,0 +1,413 @@
+# storage.py — 可插拔的持久化後端：JSON 檔 (預設) 與 SQLite (每模組一張資料表並建立索引)
+import functools
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from persistence import file_lock, get_writer, write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+# 資料集 (沿用原本的 JSON 檔名) → (資料表名稱, 需建立索引的欄位)
+TABLES = {
+    "hrp_data.json": ("hrp_data", ["year", "department", "created_at"]),
+    "hrp_calendar.json": ("hrp_calendar", ["entry_id", "date"]),
+    "rs_data.json": ("rs_data", ["position", "created_at"]),
+    "rs_interviews.json": ("rs_interviews", ["candidate_id"]),
+    "td_data.json": ("td_data", ["created_at"]),
+    "td_attendance.json": ("td_attendance", ["course_id", "date"]),
+    "td_certificates.json": ("td_certificates", ["course_id", "emp_id"]),
+    "td_attendees.json": ("td_attendees", ["session_id", "emp", "emp_id"]),
+    "kpi_data.json": ("kpi_data", ["emp", "emp_id", "created_at"]),
+    "comp_data.json": ("comp_data", ["emp", "emp_id", "created_at"]),
+    "comp_payroll_runs.json": ("comp_payroll_runs", ["month", "created_at"]),
+    "er_data.json": ("er_data", ["emp", "emp_id", "category", "created_at"]),
+    "employees.json": ("employees", ["emp_no", "name_key", "department"]),
+}
+
+# -------------------- 檔案 I/O --------------------
+def load_json(filename):
+    if os.path.exists(filename):
+        with open(filename, "r", encoding="utf-8") as f:
+            try:
+                return json.load(f)
+            except json.JSONDecodeError:
+                return []
+    return []
+
+# 另一個程序已修改或刪除同一筆記錄 (樂觀鎖版本不符)
+class ConflictError(Exception):
+    pass
+
+# -------------------- 查詢條件 --------------------
+# 欄位名稱只允許字母、數字與底線 (含中文)；SQLite 後端會把欄位名稱組進 SQL 與 JSON 路徑
+FIELD_NAME = re.compile(r"^\w+$")
+
+def check_field(field):
+    if not isinstance(field, str) or not FIELD_NAME.match(field):
+        raise ValueError(f"無效的欄位名稱：{field!r}")
+    return field
+
+# 條件以 (欄位, 運算子, 值) 的清單表示，彼此為 AND：
+#   '='  等於      'in' 屬於集合      'contains' 包含字串 (不分大小寫)      'prefix' 字首
+# 欄位可以是 tuple，表示任一欄位符合即可 (OR)，例如 (('name', 'position'), 'contains', kw)
+def filters_to_where(filters):
+    return [(f, 'in' if isinstance(v, (list, tuple, set)) else '=', v) for f, v in filters.items()]
+
+def _match_one(value, op, target):
+    if op == '=':
+        return value == target
+    if op == 'in':
+        return value in target
+    if value is None:
+        return False
+    if op == 'contains':
+        return str(target).lower() in str(value).lower()
+    if op == 'prefix':
+        return str(value).startswith(str(target))
+    raise ValueError(f"不支援的運算子：{op}")
+
+def match_where(record, where):
+    for field, op, target in where:
+        fields = field if isinstance(field, tuple) else (field,)
+        if not any(_match_one(record.get(f), op, target) for f in fields):
+            return False
+    return True
+
+# -------------------- 合併寫入 --------------------
+# 寫入以操作清單 ops 表示：('insert', record) / ('update', record) / ('delete', id)。
+# 每筆記錄帶有 _version；套用到磁碟上的最新資料時，只接受版本比磁碟新的更新，
+# 其他程序同時寫入的記錄會被保留，而不是整檔以最後寫入者為準。
+def merge_ops(records, ops):
+    merged = list(records)
+    index = {r.get('id'): i for i, r in enumerate(merged)}
+    conflicts = []
+    for op, payload in ops:
+        if op == "insert":
+            if payload.get('id') not in index:
+                index[payload.get('id')] = len(merged)
+                merged.append(payload)
+        elif op == "update":
+            i = index.get(payload.get('id'))
+            if i is None:
+                conflicts.append((payload.get('id'), "記錄已被刪除"))
+            elif merged[i].get('_version', 0) >= payload.get('_version', 0):
+                conflicts.append((payload.get('id'), "記錄已被其他使用者修改"))
+            else:
+                merged[i] = payload
+        elif op == "delete":
+            i = index.pop(payload, None)
+            if i is not None:
+                merged[i] = None
+    return [r for r in merged if r is not None], conflicts
+
+# -------------------- JSON 後端 --------------------
+# JSON 檔無法局部修改：異動交給背景寫入佇列，落盤時在檔案鎖內讀取磁碟上的最新內容、
+# 合併本程序的 ops 後原子化寫回。以檔案簽章 (inode, mtime, size) 偵測其他程序的寫入。
+# 含更新的寫入可能與其他程序衝突，改為在呼叫端同步合併：版本不符時不寫入本批異動並拋出
+# ConflictError，使用者不會先看到「已儲存」、更新卻在背景被丟棄。新增與刪除不會衝突，仍走背景佇列。
+class JsonBackend:
+    def __init__(self):
+        self._known = {}
+        self._lock = threading.Lock()
+
+    def signature(self, name):
+        try:
+            st = os.stat(name)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def load(self, name):
+        with self._lock:
+            sig = self.signature(name)
+            records = load_json(name)
+            # 舊資料 (例如早期的日曆提醒) 可能沒有 id，一次性補上後才能逐筆合併
+            if any('id' not in r for r in records):
+                with file_lock(name):
+                    records = load_json(name)
+                    records = [r if 'id' in r else {**r, 'id': str(uuid.uuid4())} for r in records]
+                    write_json_atomic(name, records)
+                    sig = self.signature(name)
+            self._known[name] = sig
+        return records
+
+    def stale(self, name):
+        with self._lock:
+            return self.signature(name) != self._known.get(name)
+
+    # 讓佇列中尚未落盤的異動先寫入，重新載入前呼叫
+    def sync(self):
+        get_writer().flush()
+
+    def write(self, name, records, ops):
+        if any(op == "update" for op, _ in ops):
+            get_writer().write_ops_now(name, ops, self._merge_write)
+        else:
+            get_writer().put_ops(name, ops, self._merge_write)
+
+    # 新增內容取決於最新資料時 (例如配發員工編號)：build(磁碟上的記錄) 在檔案鎖內執行，
+    # 回傳的記錄同步寫入；其他程序無法在讀取與寫入之間插入異動
+    def insert_locked(self, name, build):
+        ops = get_writer().write_ops_now(name, [], functools.partial(self._merge_write, build=build))
+        return [payload for _, payload in ops]
+
+    # ops 為佇列中較早的異動；checked 為呼叫端等待結果的異動，任一筆衝突即整批不寫入。
+    # 指定 build 時 checked 改由 build(合併後的記錄) 產生的新增異動組成。回傳寫入的 checked
+    def _merge_write(self, name, ops, checked=(), build=None):
+        with file_lock(name):
+            before = self.signature(name)
+            merged, conflicts = merge_ops(load_json(name), ops)
+            if build is not None:
+                checked = [('insert', r) for r in build(merged)]
+            rejected = []
+            if checked:
+                result, rejected = merge_ops(merged, checked)
+                if not rejected:
+                    merged = result
+            if ops or (checked and not rejected):
+                write_json_atomic(name, merged)
+            after = self.signature(name)
+        with self._lock:
+            # 檔案在上次讀寫後被其他程序改過，合併結果含他人資料，記憶體快照需重新載入
+            if before != self._known.get(name) or conflicts or rejected:
+                self._known[name] = None
+            else:
+                self._known[name] = after
+        for record_id, reason in conflicts:
+            logger.warning("%s 記錄 %s 未寫入：%s", name, record_id, reason)
+        if rejected:
+            raise ConflictError(rejected[0][1])
+        return checked
+
+    # JSON 後端不支援下推查詢，由 RecordStore 在記憶體中過濾
+    def query(self, name, filters, limit=None, offset=0):
+        return None
+
+    def distinct(self, name, field):
+        return None
+
+    def page(self, name, where, sort_by, descending, limit, offset):
+        return None
+
+# -------------------- SQLite 後端 --------------------
+def table_for(name):
+    if name in TABLES:
+        return TABLES[name]
+    base = os.path.splitext(os.path.basename(name))[0]
+    return "".join(ch if ch.isalnum() else "_" for ch in base), []
+
+class SqliteBackend:
+    def __init__(self, path="hrm.db"):
+        self.path = path
+        self._local = threading.local()
+        self._ready = set()
+        self._ready_lock = threading.Lock()
+        self._known = {}
+
+    # Streamlit 每個 session 在不同執行緒執行，連線以執行緒為單位保存
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def ensure_table(self, name):
+        table, columns = table_for(name)
+        if table in self._ready:
+            return table, columns
+        with self._ready_lock:
+            conn = self.connection()
+            # hrm_meta 記錄每張表的異動次數，讓各程序判斷自己的記憶體快照是否過期
+            conn.execute('CREATE TABLE IF NOT EXISTS hrm_meta (name TEXT PRIMARY KEY, version INTEGER NOT NULL)')
+            cols = "".join(f', "{c}"' for c in columns)
+            conn.execute(
+                f'CREATE TABLE IF NOT EXISTS "{table}" '
+                f'(seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT, data TEXT NOT NULL{cols})'
+            )
+            # 既有資料表缺少後來新增的索引欄位時補上，並由 data 回填
+            existing = {row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')}
+            for c in columns:
+                if c not in existing:
+                    conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "{c}"')
+                    conn.execute(f'UPDATE "{table}" SET "{c}" = json_extract(data, ?)', (f'$.{c}',))
+            conn.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS "ix_{table}_id" ON "{table}"(id)')
+            for c in columns:
+                conn.execute(f'CREATE INDEX IF NOT EXISTS "ix_{table}_{c}" ON "{table}"("{c}")')
+            conn.commit()
+            self._ready.add(table)
+        return table, columns
+
+    def _table_version(self, conn, table):
+        row = conn.execute('SELECT version FROM hrm_meta WHERE name = ?', (table,)).fetchone()
+        return row[0] if row else 0
+
+    def load(self, name):
+        table, _ = self.ensure_table(name)
+        conn = self.connection()
+        # 在同一個讀取交易內取得版本與資料，兩者才會一致
+        with conn:
+            conn.execute("BEGIN")
+            self._known[name] = self._table_version(conn, table)
+            rows = conn.execute(f'SELECT data FROM "{table}" ORDER BY seq').fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def stale(self, name):
+        table, _ = self.ensure_table(name)
+        return self._table_version(self.connection(), table) != self._known.get(name)
+
+    def sync(self):
+        pass
+
+    def _row(self, record, columns):
+        return [record.get("id"), json.dumps(record, ensure_ascii=False)] + [record.get(c) for c in columns]
+
+    # 以 records 取代整張表 (遷移用)：清空、新增與版本遞增在同一個交易內完成，
+    # 其他程序不會讀到清空後的空表，並會因版本變動重新載入
+    def replace_all(self, name, records):
+        table, columns = self.ensure_table(name)
+        names = ", ".join(["id", "data"] + [f'"{c}"' for c in columns])
+        marks = ", ".join("?" * (len(columns) + 2))
+        conn = self.connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            before = self._table_version(conn, table)
+            conn.execute(f'DELETE FROM "{table}"')
+            conn.executemany(
+                f'INSERT OR REPLACE INTO "{table}" ({names}) VALUES ({marks})',
+                [self._row(r, columns) for r in records]
+            )
+            conn.execute('INSERT OR REPLACE INTO hrm_meta (name, version) VALUES (?, ?)', (table, before + 1))
+        self._known[name] = None
+
+    # 同 JsonBackend.insert_locked：在同一個寫入交易內讀取最新資料並新增 build 回傳的記錄
+    def insert_locked(self, name, build):
+        table, columns = self.ensure_table(name)
+        names = ", ".join(["id", "data"] + [f'"{c}"' for c in columns])
+        marks = ", ".join("?" * (len(columns) + 2))
+        conn = self.connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            before = self._table_version(conn, table)
+            rows = conn.execute(f'SELECT data FROM "{table}" ORDER BY seq').fetchall()
+            records = build([json.loads(data) for (data,) in rows])
+            if not records:
+                return records
+            conn.executemany(f'INSERT OR IGNORE INTO "{table}" ({names}) VALUES ({marks})',
+                             [self._row(r, columns) for r in records])
+            conn.execute('INSERT OR REPLACE INTO hrm_meta (name, version) VALUES (?, ?)', (table, before + 1))
+        self._known[name] = before + 1 if before == self._known.get(name) else None
+        return records
+
+    # 單筆異動只寫入對應的資料列，並在同一個交易內完成；
+    # 更新時要求磁碟上的 _version 比新版本舊，否則整個交易回滾並拋出 ConflictError
+    def write(self, name, records, ops):
+        table, columns = self.ensure_table(name)
+        names = ", ".join(["id", "data"] + [f'"{c}"' for c in columns])
+        marks = ", ".join("?" * (len(columns) + 2))
+        sets = ", ".join(["data = ?"] + [f'"{c}" = ?' for c in columns])
+        conn = self.connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            before = self._table_version(conn, table)
+            for op, payload in ops:
+                if op == "insert":
+                    conn.execute(f'INSERT OR IGNORE INTO "{table}" ({names}) VALUES ({marks})',
+                                 self._row(payload, columns))
+                elif op == "update":
+                    row = self._row(payload, columns)
+                    cur = conn.execute(
+                        f'UPDATE "{table}" SET {sets} WHERE id = ? '
+                        f"AND COALESCE(json_extract(data, '$._version'), 0) < ?",
+                        row[1:] + [row[0], payload.get('_version', 0)]
+                    )
+                    if cur.rowcount == 0:
+                        raise ConflictError("記錄已被其他使用者修改或刪除")
+                elif op == "delete":
+                    conn.execute(f'DELETE FROM "{table}" WHERE id = ?', (payload,))
+            conn.execute('INSERT OR REPLACE INTO hrm_meta (name, version) VALUES (?, ?)', (table, before + 1))
+        # 其他程序在上次載入後寫過這張表，記憶體快照需重新載入
+        self._known[name] = before + 1 if before == self._known.get(name) else None
+
+    def _column(self, field, columns):
+        check_field(field)
+        if field in columns or field == "id":
+            return f'"{field}"'
+        return f"json_extract(data, '$.{field}')"
+
+    def _where(self, where, columns):
+        clauses, params = [], []
+        for field, op, value in where:
+            parts = []
+            for f in (field if isinstance(field, tuple) else (field,)):
+                col = self._column(f, columns)
+                if op == '=':
+                    parts.append(f"{col} = ?")
+                    params.append(value)
+                elif op == 'in':
+                    value = list(value)
+                    parts.append(f"{col} IN ({', '.join('?' * len(value))})")
+                    params.extend(value)
+                elif op in ('contains', 'prefix'):
+                    escaped = str(value).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                    if op == 'contains':
+                        parts.append(f"LOWER({col}) LIKE ? ESCAPE '\\'")
+                        params.append(f"%{escaped.lower()}%")
+                    else:
+                        parts.append(f"{col} LIKE ? ESCAPE '\\'")
+                        params.append(f"{escaped}%")
+                else:
+                    raise ValueError(f"不支援的運算子：{op}")
+            clauses.append("(" + " OR ".join(parts) + ")")
+        sql = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        return sql, params
+
+    # 篩選條件下推到 SQL，命中索引欄位時不需掃描整張表
+    def query(self, name, filters, limit=None, offset=0):
+        table, columns = self.ensure_table(name)
+        where, params = self._where(filters_to_where(filters), columns)
+        sql = f'SELECT data FROM "{table}"{where} ORDER BY seq'
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        rows = self.connection().execute(sql, params)
+        return [json.loads(data) for (data,) in rows]
+
+    def distinct(self, name, field):
+        table, columns = self.ensure_table(name)
+        col = self._column(field, columns)
+        rows = self.connection().execute(f'SELECT DISTINCT {col} FROM "{table}" WHERE {col} IS NOT NULL')
+        return sorted(v for (v,) in rows)
+
+    # 分頁：篩選、排序與 LIMIT/OFFSET 都在 SQL 完成，只取回目前這一頁
+    def page(self, name, where, sort_by, descending, limit, offset):
+        table, columns = self.ensure_table(name)
+        clause, params = self._where(where, columns)
+        conn = self.connection()
+        total = conn.execute(f'SELECT COUNT(*) FROM "{table}"{clause}', params).fetchone()[0]
+        order = "seq"
+        if sort_by:
+            order = f"{self._column(sort_by, columns)} {'DESC' if descending else 'ASC'}, seq"
+        rows = conn.execute(
+            f'SELECT data FROM "{table}"{clause} ORDER BY {order} LIMIT ? OFFSET ?',
+            params + [limit, offset]
+        )
+        return [json.loads(data) for (data,) in rows], total
+
+    def count(self, name):
+        table, _ = self.ensure_table(name)
+        return self.connection().execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+
+# -------------------- 後端選擇 --------------------
+# HRM_STORAGE=sqlite 時改用 SQLite，資料庫路徑由 HRM_DB_PATH 指定
+def create_backend():
+    kind = os.environ.get("HRM_STORAGE", "json").lower()
+    if kind == "sqlite":
+        return SqliteBackend(os.environ.get("HRM_DB_PATH", "hrm.db"))
+    return JsonBackend()
@@ -0,0 +1,342 @@
+# store.py — 全程序共享的資料儲存層，六個模組透過同一份快照讀寫資料
+import os
+import threading
+import time
+from datetime import datetime
+from storage import ConflictError, create_backend, filters_to_where, match_where
+
+# 從屬資料：刪除主記錄時一併刪除參照它的記錄 (資料集 → [(從屬資料集, 外鍵欄位)])
+CASCADES = {
+    "hrp_data.json": [("hrp_calendar.json", "entry_id")],
+    "rs_data.json": [("rs_interviews.json", "candidate_id")],
+    "td_data.json": [("td_attendance.json", "course_id")],
+    "td_attendance.json": [("td_attendees.json", "session_id")],
+}
+
+# -------------------- 共享儲存 --------------------
+# 每個資料集 (以檔名為鍵) 只在記憶體保留一份 tuple 快照；寫入時產生新的 tuple
+# (copy-on-write)，舊快照仍可被正在重跑的 session 安全讀取，不會被就地修改。
+# 實際持久化交給 storage 後端 (JSON 或 SQLite)，只傳遞本次異動的 ops。
+# 多程序部署時，讀取前會 (節流地) 檢查後端是否被其他程序寫過，過期則重新載入。
+class RecordStore:
+    def __init__(self, backend=None, refresh_interval=None):
+        self.backend = backend or create_backend()
+        if refresh_interval is None:
+            refresh_interval = float(os.environ.get("HRM_REFRESH_INTERVAL", "1.0"))
+        self.refresh_interval = refresh_interval
+        self._lock = threading.RLock()
+        self._data = {}
+        self._versions = {}
+        self._updated = {}
+        self._checked = {}
+        self._sorted = {}
+        self._by_id = {}
+        self._listeners = {}
+        self._lookups = {}
+
+    def _load(self, name):
+        self._data[name] = tuple(self.backend.load(name))
+        # 重新載入也遞增版本，下游快取 (以版本為鍵) 才會失效
+        self._versions[name] = self._versions.get(name, -1) + 1
+        self._updated[name] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self._checked[name] = time.monotonic()
+        self._notify(name, None)
+
+    def _ensure(self, name, force=False):
+        if name not in self._data:
+            self._load(name)
+            return
+        now = time.monotonic()
+        if not force and now - self._checked[name] < self.refresh_interval:
+            return
+        self._checked[name] = now
+        if self.backend.stale(name):
+            self.backend.sync()
+            self._load(name)
+
+    def _commit(self, name, records, ops):
+        records = tuple(records)
+        try:
+            self.backend.write(name, records, ops)
+        except ConflictError:
+            self._load(name)
+            raise
+        self._publish(name, records, ops)
+
+    def _publish(self, name, records, ops):
+        self._data[name] = records
+        self._versions[name] += 1
+        self._updated[name] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self._notify(name, ops)
+
+    # ---- 變更通知 ----
+    # 衍生結構 (例如全文索引) 以 listener(records, ops) 訂閱資料集的異動：
+    # ops 為本次寫入的 ops 清單，可增量套用；ops 為 None 表示整份重新載入，需依 records 重建。
+    # 通知在 store 鎖內同步呼叫，listener 應盡量輕量且不可再寫入 store。
+    def subscribe(self, name, listener):
+        with self._lock:
+            self._ensure(name)
+            self._listeners.setdefault(name, []).append(listener)
+            listener(self._data[name], None)
+
+    # 衍生索引可註冊外鍵查詢 fn(值集合) → id 集合，連帶刪除時用來取代整份掃描
+    def register_lookup(self, name, field, fn):
+        with self._lock:
+            self._lookups[(name, field)] = fn
+
+    def _notify(self, name, ops):
+        for listener in self._listeners.get(name, ()):
+            listener(self._data[name], ops)
+
+    # ---- 讀取 ----
+    def records(self, name):
+        with self._lock:
+            self._ensure(name)
+            return self._data[name]
+
+    def snapshot(self, name):
+        with self._lock:
+            self._ensure(name)
+            return self._versions[name], self._data[name]
+
+    def version(self, name):
+        with self._lock:
+            self._ensure(name)
+            return self._versions[name]
+
+    # 立即確認資料集是否被其他程序改過 (force=True 時不受 refresh_interval 節流)
+    def refresh(self, name, force=False):
+        with self._lock:
+            self._ensure(name, force)
+            return self._versions[name]
+
+    def updated_at(self, name):
+        with self._lock:
+            self._ensure(name)
+            return self._updated[name]
+
+    # id → 記錄的對照表，依版本快取
+    def _id_map(self, name):
+        version, records = self.snapshot(name)
+        cached = self._by_id.get(name)
+        if cached is None or cached[0] != version:
+            cached = self._by_id[name] = (version, {r.get('id'): r for r in records})
+        return cached[1]
+
+    def get(self, name, record_id):
+        return self._id_map(name).get(record_id)
+
+    # 依傳入順序取回多筆記錄，不存在的 id 略過
+    def get_many(self, name, record_ids):
+        by_id = self._id_map(name)
+        return [by_id[rid] for rid in record_ids if rid in by_id]
+
+    # 等值篩選；後端支援時下推 (SQLite)，否則在記憶體快照上過濾
+    def query(self, name, **filters):
+        result = self.backend.query(name, filters)
+        if result is not None:
+            return result
+        where = filters_to_where(filters)
+        return [r for r in self.records(name) if match_where(r, where)]
+
+    def distinct(self, name, field):
+        result = self.backend.distinct(name, field)
+        if result is not None:
+            return result
+        return sorted({r[field] for r in self.records(name) if r.get(field) is not None})
+
+    # 伺服器端分頁：回傳 (目前頁的記錄, 符合條件的總筆數)。
+    # where 格式見 storage.match_where；SQLite 後端直接以 SQL 完成，
+    # 記憶體路徑在無篩選時沿用依版本快取的排序結果，總筆數為 O(1)。
+    # ids 為全文搜尋的結果 (依相關度排序)：只在這些記錄中篩選，未指定 sort_by 時維持相關度順序；
+    # 以 id 對照表取回，成本與搜尋結果筆數成正比，不掃描整份資料也不把 id 清單綁進 SQL。
+    def page(self, name, where=(), sort_by=None, descending=False, page=1, page_size=50, ids=None):
+        where = list(where)
+        offset = (page - 1) * page_size
+        if ids is not None:
+            records = [r for r in self.get_many(name, ids) if match_where(r, where)]
+            if sort_by:
+                records.sort(key=lambda r: _sort_key(r, sort_by), reverse=descending)
+            return records[offset:offset + page_size], len(records)
+        result = self.backend.page(name, where, sort_by, descending, page_size, offset)
+        if result is not None:
+            return result
+        version, records = self.snapshot(name)
+        if where:
+            records = [r for r in records if match_where(r, where)]
+            if sort_by:
+                records = sorted(records, key=lambda r: _sort_key(r, sort_by), reverse=descending)
+        elif sort_by:
+            key = (name, sort_by, descending)
+            cached = self._sorted.get(key)
+            if cached is None or cached[0] != version:
+                cached = (version, sorted(records, key=lambda r: _sort_key(r, sort_by), reverse=descending))
+                self._sorted[key] = cached
+            records = cached[1]
+        return list(records[offset:offset + page_size]), len(records)
+
+    # ---- 寫入 ----
+    # 每筆記錄帶有 _version：新增為 1，每次更新 +1。
+    # expected_version / expected_versions 為使用者開啟表單時看到的版本 (樂觀鎖)，
+    # 與最新資料不符時拋出 ConflictError，而不是覆蓋別人的修改。
+    def insert(self, name, record):
+        record = {**record, '_version': 1}
+        with self._lock:
+            self._ensure(name)
+            self._commit(name, self._data[name] + (record,), [('insert', record)])
+            return record
+
+    # 多筆新增合併為一次寫入 (批次匯入用)
+    def insert_many(self, name, records):
+        records = [{**r, '_version': 1} for r in records]
+        if not records:
+            return records
+        with self._lock:
+            self._ensure(name)
+            self._commit(name, self._data[name] + tuple(records), [('insert', r) for r in records])
+            return records
+
+    # 新增內容取決於最新資料時 (例如配發員工編號)：build(目前記錄) 在後端的檔案鎖或寫入交易內執行，
+    # 讀到的包含其他程序剛寫入的記錄；回傳新增的記錄
+    def insert_locked(self, name, build):
+        with self._lock:
+            self._ensure(name)
+            records = self.backend.insert_locked(
+                name, lambda current: [{**r, '_version': 1} for r in build(current)])
+            if records:
+                self._publish(name, self._data[name] + tuple(records), [('insert', r) for r in records])
+            return records
+
+    def update(self, name, record_id, fields, expected_version=None):
+        with self._lock:
+            self._ensure(name, force=expected_version is not None)
+            updated = None
+            records = []
+            for r in self._data[name]:
+                if r.get('id') == record_id:
+                    if expected_version is not None and r.get('_version', 0) != expected_version:
+                        raise ConflictError("記錄已被其他使用者修改")
+                    updated = {**r, **fields, '_version': r.get('_version', 0) + 1}
+                    r = updated
+                records.append(r)
+            if updated is None:
+                if expected_version is not None:
+                    raise ConflictError("記錄已被刪除")
+                return None
+            self._commit(name, records, [('update', updated)])
+            return updated
+
+    # 以 id 集合批次更新：所有欄位變更合併為一次寫入 (每個檔案只寫一次)，回傳更新後的記錄
+    def update_many(self, name, record_ids, fields, expected_versions=None):
+        record_ids = set(record_ids)
+        with self._lock:
+            self._ensure(name, force=bool(expected_versions))
+            records, ops = [], []
+            for r in self._data[name]:
+                rid = r.get('id')
+                if rid in record_ids:
+                    if expected_versions and rid in expected_versions and r.get('_version', 0) != expected_versions[rid]:
+                        raise ConflictError("記錄已被其他使用者修改")
+                    r = {**r, **fields, '_version': r.get('_version', 0) + 1}
+                    ops.append(('update', r))
+                records.append(r)
+            if expected_versions and len(ops) < len(set(expected_versions) & record_ids):
+                raise ConflictError("記錄已被刪除")
+            if ops:
+                self._commit(name, records, ops)
+            return [payload for _, payload in ops]
+
+    # 每筆記錄各自的欄位異動 {id: fields}，一次寫入；回傳更新後的記錄
+    def update_each(self, name, changes):
+        with self._lock:
+            self._ensure(name)
+            records, ops = [], []
+            for r in self._data[name]:
+                fields = changes.get(r.get('id'))
+                if fields is not None:
+                    r = {**r, **fields, '_version': r.get('_version', 0) + 1}
+                    ops.append(('update', r))
+                records.append(r)
+            if ops:
+                self._commit(name, records, ops)
+            return [payload for _, payload in ops]
+
+    # 以 id 集合批次刪除，並依 CASCADES 連帶刪除從屬記錄；每個受影響的資料集只寫入一次。
+    # 回傳 {資料集: 刪除筆數}
+    def delete_many(self, name, record_ids, expected_versions=None):
+        record_ids = set(record_ids)
+        with self._lock:
+            deleted = {name: self.delete(name, record_ids, expected_versions)}
+            for child, key in CASCADES.get(name, ()):
+                lookup = self._lookups.get((child, key))
+                if lookup is not None:
+                    self._ensure(child)
+                    child_ids = lookup(record_ids)
+                else:
+                    child_ids = {r.get('id') for r in self.records(child) if r.get(key) in record_ids}
+                if child_ids:
+                    for dataset, n in self.delete_many(child, child_ids).items():
+                        deleted[dataset] = deleted.get(dataset, 0) + n
+            return deleted
+
+    def delete(self, name, record_ids, expected_versions=None):
+        if isinstance(record_ids, str):
+            record_ids = {record_ids}
+        record_ids = set(record_ids)
+        with self._lock:
+            if expected_versions:
+                self._ensure(name, force=True)
+                for r in self._data[name]:
+                    rid = r.get('id')
+                    if rid in expected_versions and r.get('_version', 0) != expected_versions[rid]:
+                        raise ConflictError("記錄已被其他使用者修改")
+            return self.delete_where(name, lambda r: r.get('id') in record_ids)
+
+    def delete_where(self, name, predicate):
+        with self._lock:
+            self._ensure(name)
+            records, ops = [], []
+            for r in self._data[name]:
+                if predicate(r):
+                    ops.append(('delete', r.get('id')))
+                else:
+                    records.append(r)
+            if ops:
+                self._commit(name, records, ops)
+            return len(ops)
+
+# -------------------- 衍生索引 --------------------
+# 索引只在收到 listener 通知時更新；而通知只發生在本程序寫入或 _ensure 重新載入時。
+# 多程序部署下，其他程序寫入後若本程序沒有讀取該資料集，索引會一直停在舊資料。
+# 因此索引的讀取方法先呼叫 refresh()：經由 store.refresh() 觸發 (節流的) 過期檢查，
+# 資料集過期時重新載入並以 ops=None 通知索引整份重建。寫入前的檢查 (例如時段衝突、
+# 同名員工) 以 force=True 略過節流。
+# refresh() 不可在持有索引自身的鎖時呼叫 (重建時 apply 需要該鎖)。
+class DerivedIndex:
+    _source = None
+
+    def attach(self, store, name, lookup_field=None):
+        self._source = (store, name)
+        store.subscribe(name, self.apply)
+        if lookup_field is not None:
+            store.register_lookup(name, lookup_field, self.ids_for)
+
+    def refresh(self, force=False):
+        if self._source is not None:
+            store, name = self._source
+            store.refresh(name, force)
+
+# 缺值集中排在同一端；數字與字串分開比較，避免排序時型別錯誤
+def _sort_key(record, field):
+    value = record.get(field)
+    if value is None:
+        return (1, 0, "")
+    if isinstance(value, (int, float)):
+        return (0, 0, value)
+    return (0, 1, str(value))
+
+# 模組層級單例：Streamlit 只匯入一次模組，因此每個伺服器程序只有一個實例
+_store = RecordStore()
+
+def get_store():
+    return _store
@@ -0,0 +1,16 @@
+# tests/conftest.py — 測試共用設定：以專案根目錄匯入模組，每個測試在獨立的暫存目錄中讀寫資料檔
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 寫入同步完成，測試不必等待背景佇列
+os.environ.setdefault("HRM_WRITE_BEHIND", "0")
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
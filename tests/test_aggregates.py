@@ -0,0 +1,45 @@
+# 統計摘要：增量更新的結果與整份重建一致
+import pytest
+
+from aggregates import SPECS, Aggregates
+from store import RecordStore
+from storage import JsonBackend
+
+def _stable(summary):
+    return {k: v for k, v in summary.items() if k != 'updated_at'}
+
+@pytest.fixture
+def store(workdir):
+    return RecordStore(JsonBackend(), refresh_interval=0)
+
+def test_comp_summary(store):
+    agg = Aggregates("comp_data.json", SPECS["comp_data.json"])
+    agg.attach(store, "comp_data.json")
+    store.insert_many("comp_data.json", [
+        {'id': "1", 'department': "研發", 'salary': 4000, 'total': 4500},
+        {'id': "2", 'department': "研發", 'salary': "6000", 'total': 6000},
+        {'id': "3", 'department': "業務", 'salary': 3500, 'total': None},
+    ])
+    s = agg.summary()
+    assert s['count'] == 3 and s['numeric']['salary']['mean'] == pytest.approx(4500)
+    assert s['numeric']['salary']['std'] == pytest.approx(((500 ** 2 + 1500 ** 2 + 1000 ** 2) / 3) ** 0.5)
+    assert s['numeric']['total']['count'] == 2
+    assert s['tallies']['department'] == {"研發": 2, "業務": 1}
+    assert s['histograms']['salary'] == {"2000": 1, "4000": 1, "6000": 1}
+    assert s['groups']['department']["研發"] == {'count': 2, 'salary': 5000, 'total': 5250}
+
+def test_incremental_matches_rebuild(store):
+    name = "er_data.json"
+    agg = Aggregates(name, SPECS[name])
+    agg.attach(store, name)
+    store.insert_many(name, [{'id': str(i), 'category': "薪資" if i % 2 else "環境", 'urgency': i % 5 + 1,
+                              'emp': "匿名" if i % 3 == 0 else f"員工{i}"} for i in range(12)])
+    store.update(name, "4", {'category': "其他", 'emp': "匿名"})
+    store.update(name, "5", {'urgency': None})
+    store.delete(name, {"0", "7"})
+    rebuilt = Aggregates(name, SPECS[name])
+    rebuilt.apply(store.records(name), None)
+    assert _stable(agg.summary()) == _stable(rebuilt.summary())
+    assert agg.summary()['tallies']['anonymous'] == {"True": 4, "False": 6}
+    store.delete(name, {r['id'] for r in store.records(name) if r['category'] == "其他"})
+    assert "其他" not in agg.summary()['groups']['category']
@@ -0,0 +1,145 @@
+# HTTP API：以子程序啟動伺服器 (JSON 與 SQLite 後端各一)，驗證 CRUD、ETag、條件請求、請求大小限制與錯誤回應
+import asyncio
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+import api
+from conftest import ROOT
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+@pytest.fixture(scope="module", params=["json", "sqlite"])
+def server(request, tmp_path_factory):
+    port = _free_port()
+    env = {**os.environ, 'HRM_STORAGE': request.param, 'HRM_WRITE_BEHIND': "0"}
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "api.py"), "--port", str(port), "--pool", "2"],
+                            cwd=tmp_path_factory.mktemp(request.param), env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.monotonic() + 15
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            break
+        except OSError:
+            if proc.poll() is not None or time.monotonic() > deadline:
+                proc.kill()
+                pytest.fail("API 伺服器無法啟動：" + proc.stderr.read().decode())
+            time.sleep(0.1)
+    yield port
+    proc.terminate()
+    proc.wait(10)
+
+@pytest.fixture
+def call(server):
+    conn = http.client.HTTPConnection("127.0.0.1", server, timeout=10)
+    def request(method, path, body=None, headers=None):
+        conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers or {})
+        resp = conn.getresponse()
+        data = resp.read()
+        return resp.status, dict(resp.getheaders()), json.loads(data) if data else None
+    yield request
+    conn.close()
+
+def test_create_get_and_conditional_get(call):
+    status, headers, record = call("POST", "/api/compensation", {'emp': "王", 'department': "RD", 'salary': 100, 'bonus': 5})
+    assert status == 201 and record['total'] == 105 and headers['ETag'] == '"1"'
+    status, headers, _ = call("GET", f"/api/compensation/{record['id']}")
+    assert status == 200
+    assert call("GET", f"/api/compensation/{record['id']}", headers={'If-None-Match': headers['ETag']})[0] == 304
+
+def test_list_pagination_and_etag(call):
+    for i in range(3):
+        call("POST", "/api/kpis", {'emp': f"K{i}", 'department': "QA", 'score': 60 + i, 'goal_rate': 50})
+    status, headers, page = call("GET", "/api/kpis?page=2&page_size=2&sort=score&order=desc&department=QA")
+    assert status == 200 and page['total'] == 3 and page['pages'] == 2
+    assert [r['emp'] for r in page['items']] == ["K0"]
+    etag = headers['ETag']
+    assert call("GET", "/api/kpis?page=2&page_size=2&sort=score&order=desc&department=QA",
+                headers={'If-None-Match': etag})[0] == 304
+    call("POST", "/api/kpis", {'emp': "K9", 'department': "QA", 'score': 1, 'goal_rate': 1})
+    assert call("GET", "/api/kpis?page=2&page_size=2&sort=score&order=desc&department=QA",
+                headers={'If-None-Match': etag})[0] == 200
+
+def test_if_match_conflict(call):
+    _, headers, record = call("POST", "/api/er-cases", {'category': "其他", 'issue': "冷氣太冷"})
+    status, new_headers, _ = call("PATCH", f"/api/er-cases/{record['id']}", {'urgency': 5}, {'If-Match': headers['ETag']})
+    assert status == 200 and new_headers['ETag'] == '"2"'
+    assert call("PATCH", f"/api/er-cases/{record['id']}", {'urgency': 1}, {'If-Match': headers['ETag']})[0] == 412
+    assert call("DELETE", f"/api/er-cases/{record['id']}", headers={'If-Match': new_headers['ETag']})[0] == 200
+
+def test_put_is_not_allowed(call):
+    _, _, record = call("POST", "/api/er-cases", {'category': "其他", 'issue': "停車位"})
+    status, headers, _ = call("PUT", f"/api/er-cases/{record['id']}", {'urgency': 5})
+    assert status == 405 and "PUT" not in headers['Allow'] and "PATCH" in headers['Allow']
+
+def test_validation_error_is_422(call):
+    status, _, body = call("POST", "/api/compensation", {'emp': ""})
+    assert status == 422 and "不可為空" in body['error']
+
+@pytest.mark.parametrize("path", [
+    "/api/compensation?sort=salary)%20--",
+    "/api/compensation?x')%20IS%20NULL%20OR%201=1%20OR%20json_extract(data,'$.x=zzz",
+])
+def test_field_names_are_validated(call, path):
+    call("POST", "/api/compensation", {'emp': "注入", 'salary': 1})
+    assert call("GET", path)[0] == 400
+
+def test_interview_conflict_is_409(call):
+    _, _, cand = call("POST", "/api/candidates", {'name': "陳", 'position': "工程師"})
+    body = {'candidate_id': cand['id'], 'start': "2025-06-01T10:00", 'minutes': 60, 'location': "A室"}
+    assert call("POST", "/api/interviews", body)[0] == 201
+    assert call("POST", "/api/interviews", {**body, 'start': "2025-06-01T10:30"})[0] == 409
+
+def _raw(port, data):
+    with socket.create_connection(("127.0.0.1", port), timeout=10) as s:
+        s.sendall(data)
+        return s.recv(65536).split(b"\r\n", 1)[0]
+
+@pytest.mark.parametrize("length, status", [("abc", b"400"), ("-5", b"400"), (str(2 << 20), b"413")])
+def test_bad_content_length(server, length, status):
+    line = _raw(server, f"POST /api/kpis HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode())
+    assert line.split()[1] == status
+
+def test_oversized_header_line(server):
+    line = _raw(server, b"GET /api HTTP/1.1\r\nX-Big: " + b"a" * 100000 + b"\r\n\r\n")
+    assert line.split()[1] == b"431"
+
+class _Writer:
+    def __init__(self):
+        self.data = b""
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+def test_internal_error_is_logged_not_returned(workdir, monkeypatch, caplog):
+    server = api.ApiServer(pool_size=1)
+    async def boom(*args):
+        raise RuntimeError("/srv/hrm/comp_data.json 權限不足")
+    monkeypatch.setattr(server, "dispatch", boom)
+    writer = _Writer()
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"GET /api HTTP/1.1\r\nConnection: close\r\n\r\n")
+        reader.feed_eof()
+        await server.handle(reader, writer)
+    asyncio.run(run())
+    head, _, body = writer.data.partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 500")
+    assert json.loads(body) == {'error': "伺服器內部錯誤"}
+    assert "權限不足" in caplog.text and "RuntimeError" in caplog.text
@@ -0,0 +1,61 @@
+# 批次異動：以 id 集合刪除並逐層連帶刪除從屬記錄、批次更新，每個受影響的資料集只寫入一次，日誌只記一筆
+from collections import Counter
+
+import pytest
+
+import journal
+from services import PerformanceService
+from store import RecordStore
+from storage import JsonBackend, SqliteBackend
+
+@pytest.fixture(params=["json", "sqlite"])
+def store(request, workdir):
+    backend = JsonBackend() if request.param == "json" else SqliteBackend(str(workdir / "hrm.db"))
+    return RecordStore(backend, refresh_interval=0)
+
+@pytest.fixture
+def writes(store, monkeypatch):
+    counts = Counter()
+    write = store.backend.write
+    def counting(name, records, ops):
+        counts[name] += 1
+        return write(name, records, ops)
+    monkeypatch.setattr(store.backend, "write", counting)
+    return counts
+
+def test_cascading_delete(store, writes):
+    store.insert_many("rs_data.json", [{'id': "1"}, {'id': "2"}])
+    store.insert_many("rs_interviews.json", [{'id': "i1", 'candidate_id': "1"}, {'id': "i2", 'candidate_id': "2"}])
+    writes.clear()
+    assert store.delete_many("rs_data.json", {"1"}) == {'rs_data.json': 1, 'rs_interviews.json': 1}
+    assert [r['id'] for r in store.records("rs_interviews.json")] == ["i2"]
+    assert writes == {'rs_data.json': 1, 'rs_interviews.json': 1}
+
+def test_cascade_follows_every_level(store, writes):
+    store.insert_many("td_data.json", [{'id': "c1"}, {'id': "c2"}, {'id': "c3"}])
+    store.insert_many("td_attendance.json", [{'id': f"s{i}", 'course_id': f"c{i % 3 + 1}"} for i in range(6)])
+    store.insert_many("td_attendees.json", [{'id': f"a{i}", 'session_id': f"s{i % 6}"} for i in range(12)])
+    writes.clear()
+    deleted = store.delete_many("td_data.json", {"c1", "c2"})
+    assert deleted == {'td_data.json': 2, 'td_attendance.json': 4, 'td_attendees.json': 8}
+    assert writes == {'td_data.json': 1, 'td_attendance.json': 1, 'td_attendees.json': 1}
+    assert sorted(r['session_id'] for r in store.records("td_attendees.json")) == ["s2", "s2", "s5", "s5"]
+
+def test_bulk_updates_write_once(store, writes):
+    store.insert_many("kpi_data.json", [{'id': str(i), 'score': i} for i in range(5)])
+    writes.clear()
+    assert len(store.update_many("kpi_data.json", {"1", "2", "missing"}, {'department': "QA"})) == 2
+    updated = store.update_each("kpi_data.json", {"3": {'score': 30}, "4": {'score': 40}})
+    assert [(r['id'], r['_version']) for r in updated] == [("3", 2), ("4", 2)]
+    assert writes == {'kpi_data.json': 2}
+    assert [r.get('department') for r in store.records("kpi_data.json")] == [None, "QA", "QA", None, None]
+
+def test_service_batch_delete_logs_once(store, monkeypatch):
+    monkeypatch.setattr(journal, "_state", {})
+    monkeypatch.setattr(journal, "_counts", {})
+    service = PerformanceService(store)
+    store.insert_many(service.data_file, [{'id': str(i), 'emp': f"員工{i}", 'score': 60} for i in range(3)])
+    service.delete(store.records(service.data_file)[:2])
+    assert [r['id'] for r in store.records(service.data_file)] == ["2"]
+    logs = service.logs()
+    assert len(logs) == 1 and logs[0]['action'] == "批量刪除績效" and logs[0]['details'].startswith("2 筆")
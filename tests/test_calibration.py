@@ -0,0 +1,69 @@
+# 績效校準：強制分配的各等第人數 (整數名額)、部門內排名、評分寬嚴校正與曲線解析
+import pandas as pd
+import pytest
+
+import calibration
+
+CURVE = calibration.parse_curve("10/20/40/20/10")
+
+def _reviews(n, department="研發"):
+    return pd.DataFrame({
+        'id': [str(i) for i in range(n)],
+        'emp': [f"{department}{i}" for i in range(n)],
+        'department': department,
+        'manager': "",
+        'score': [90 - i for i in range(n)],
+        'goal_rate': [90 - i for i in range(n)],
+        'created_at': "2025-12-01 09:00:00",
+    })
+
+@pytest.mark.parametrize("size, expected", [
+    (5, {'A': 1, 'B': 1, 'C': 2, 'D': 1, 'E': 0}),
+    (10, {'A': 1, 'B': 2, 'C': 4, 'D': 2, 'E': 1}),
+    (7, {'A': 1, 'B': 1, 'C': 3, 'D': 1, 'E': 1}),
+])
+def test_forced_distribution_counts(size, expected):
+    result = calibration.calibrate(_reviews(size), year=2025, curve=CURVE)
+    counts = result['grade'].value_counts().reindex(list(expected), fill_value=0).to_dict()
+    assert counts == expected
+    # 名次越前等第越高
+    assert list(result.sort_values('rank')['grade']) == sorted(result['grade'])
+
+def test_band_limits_are_per_department():
+    df = pd.concat([_reviews(10, "研發"), _reviews(7, "業務")], ignore_index=True)
+    df['id'] = [str(i) for i in range(len(df))]
+    result = calibration.calibrate(df, year=2025, curve=CURVE)
+    assert result.groupby('department')['grade'].apply(lambda g: (g == 'E').sum()).to_dict() == {'研發': 1, '業務': 1}
+
+def test_manager_leniency_is_normalized():
+    # 兩位主管給分寬嚴不同但組內排序相同，校準後各自的第一名分數相同
+    df = pd.DataFrame({
+        'id': [str(i) for i in range(6)], 'emp': list("abcdef"), 'department': "研發",
+        'manager': ["寬"] * 3 + ["嚴"] * 3, 'score': [95, 90, 85, 75, 70, 65],
+        'goal_rate': [95, 90, 85, 75, 70, 65], 'created_at': "2025-06-01",
+    })
+    result = calibration.calibrate(df, year=2025, curve=CURVE).set_index('emp')
+    assert result.loc['a', 'calibrated'] == result.loc['d', 'calibrated']
+
+def test_latest_review_per_employee():
+    df = pd.DataFrame({'id': ["1", "2"], 'emp': ["王", "王"], 'department': "研發", 'manager': "",
+                       'score': [50, 80], 'goal_rate': [50, 80],
+                       'created_at': ["2025-01-01", "2025-09-01"]})
+    result = calibration.calibrate(df, year=2025, curve=CURVE)
+    assert list(result['id']) == ["2"]
+
+def test_parse_curve_rejects_bad_input():
+    with pytest.raises(ValueError):
+        calibration.parse_curve("10/-5")
+    assert calibration.parse_curve("1/1") == [("A", 0.5), ("B", 0.5)]
+
+# 頁面與服務層經由 frames 取得 DataFrame：department 為 category，舊記錄沒有部門
+def test_frame_with_categorical_department():
+    from frames import build_frame
+    records = [{'id': str(i), 'emp': f"舊{i}", 'score': 80 + i, 'created_at': "2025-03-01 09:00:00"} for i in range(4)]
+    records.append({'id': "n", 'emp': "新人", 'department': "研發", 'score': 70, 'created_at': "2025-03-02 09:00:00"})
+    df = build_frame(records)
+    assert df['department'].dtype == 'category'
+    result = calibration.calibrate(df, year=2025, curve=CURVE)
+    assert result.groupby('department')['dept_size'].first().to_dict() == {"": 4, "研發": 1}
+    assert set(result.loc[result['department'] == "", 'grade']) <= set("ABCDE")
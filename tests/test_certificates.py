@@ -0,0 +1,31 @@
+# 結業證書：檔名清理、依輸入順序打包 zip，以及未安裝 reportlab 時的錯誤
+import os
+import zipfile
+
+import pytest
+
+import certificates
+
+def _fake_pdf(cert, template=certificates.TEMPLATE):
+    return template[1][0].format(**cert).encode("utf-8")
+
+def test_file_names_are_safe():
+    assert certificates.cert_file_name({'name': 'a/b:c*', 'id': "1234567890"}) == "abc-12345678.pdf"
+    assert certificates.cert_file_name({'name': ' ?? ', 'id': "x"}) == "certificate-x.pdf"
+
+def test_zip_keeps_input_order(monkeypatch):
+    monkeypatch.setattr(certificates, "available", lambda: True)
+    monkeypatch.setattr(certificates, "render_pdf", _fake_pdf)
+    certs = [{'id': f"{i:08d}", 'name': f"員工{i}", 'course': "安全", 'date': "2025-01-01"} for i in range(3)]
+    path = certificates.build_zip(certs)
+    try:
+        with zipfile.ZipFile(path) as zf:
+            assert zf.namelist() == [certificates.cert_file_name(c) for c in certs]
+            assert zf.read(zf.namelist()[1]).decode("utf-8") == "茲證明 員工1"
+    finally:
+        os.remove(path)
+
+def test_missing_reportlab(monkeypatch):
+    monkeypatch.setattr(certificates, "available", lambda: False)
+    with pytest.raises(ValueError, match="reportlab"):
+        certificates.build_zip([{'id': "1", 'name': "王"}])
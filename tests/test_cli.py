@@ -0,0 +1,56 @@
+# 批次 CLI：在暫存目錄以子程序執行 cli.py，驗證匯入、匯出、摘要、薪資與員工回填共用同一組服務
+import csv
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+CSV = """emp,department,salary,bonus,benefits
+王小明,研發,5000,500,交通津貼: 200
+李四,業務,4000,,
+,業務,3000,,
+張三,業務,-1,,
+"""
+
+def _cli(workdir, *args):
+    env = {**os.environ, 'HRM_WRITE_BEHIND': "0", 'HRM_STORAGE': "json"}
+    return subprocess.run([sys.executable, os.path.join(ROOT, "cli.py"), *args], cwd=workdir, env=env,
+                          capture_output=True, text=True, encoding="utf-8", timeout=120)
+
+@pytest.fixture
+def imported(workdir):
+    (workdir / "comp.csv").write_text(CSV, encoding="utf-8")
+    dry = _cli(workdir, "import", "comp", "comp.csv", "--dry-run")
+    assert dry.returncode == 0 and "可匯入 2 筆，錯誤 2 筆" in dry.stdout
+    assert not (workdir / "comp_data.json").exists()
+    result = _cli(workdir, "import", "comp", "comp.csv")
+    assert result.returncode == 0 and "已匯入 2 筆" in result.stdout
+    return workdir
+
+def test_import_links_employees_and_derives_totals(imported):
+    records = json.loads((imported / "comp_data.json").read_text(encoding="utf-8"))
+    assert {r['emp']: r['total'] for r in records} == {"王小明": 5500, "李四": 4000}
+    assert all(r['emp_id'] for r in records)
+    summary = json.loads(_cli(imported, "analytics", "comp", "--json").stdout)
+    assert summary['count'] == 2 and summary['numeric']['total']['sum'] == 9500
+    assert summary['tallies']['department'] == {"研發": 1, "業務": 1}
+
+def test_export_and_payroll(imported):
+    result = _cli(imported, "export", "comp", "--format", "csv", "-o", str(imported))
+    with open(result.stdout.strip(), encoding="utf-8-sig") as f:
+        assert sorted(r['emp'] for r in csv.DictReader(f)) == ["李四", "王小明"]
+    assert _cli(imported, "export", "comp", "--dataset", "nope.json").returncode == 2
+    payroll = json.loads(_cli(imported, "payroll", "--month", "2025-06").stdout)
+    assert payroll['headcount'] == 2 and payroll['allowance'] == 200
+    assert _cli(imported, "payroll", "--month", "June").returncode == 2
+    # 日誌由新到舊，--limit 取最近的記錄
+    logs = _cli(imported, "logs", "comp", "--limit", "1").stdout.splitlines()
+    assert len(logs) == 1 and "薪資計算" in logs[0]
+
+def test_help_lists_optional_packages(workdir):
+    out = _cli(workdir, "--help").stdout
+    assert "pyarrow" in out and "openpyxl" in out and "reportlab" in out
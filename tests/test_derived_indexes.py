@@ -0,0 +1,64 @@
+# 兩個 RecordStore 共用同一份資料檔 / 資料庫，模擬兩個伺服器程序
+from datetime import datetime
+
+import pytest
+
+from relations import GroupIndex
+from reminders import ReminderIndex
+from scheduling import TIME_FORMAT, InterviewSchedule
+from search import InvertedIndex
+from store import RecordStore
+from storage import JsonBackend, SqliteBackend
+
+@pytest.fixture(params=["json", "sqlite"])
+def stores(request, workdir):
+    def make():
+        backend = JsonBackend() if request.param == "json" else SqliteBackend(str(workdir / "hrm.db"))
+        return RecordStore(backend, refresh_interval=0)
+    return make(), make()
+
+def test_search_sees_other_process_writes(stores):
+    a, b = stores
+    index = InvertedIndex({'name': 1})
+    index.attach(a, "rs_data.json")
+    assert index.search("小明") == []
+    b.insert("rs_data.json", {'id': "c1", 'name': "王小明"})
+    assert [doc for doc, _ in index.search("小明")] == ["c1"]
+
+def test_throttled_refresh_can_be_forced(workdir):
+    a = RecordStore(JsonBackend(), refresh_interval=3600)
+    b = RecordStore(JsonBackend(), refresh_interval=0)
+    index = InvertedIndex({'name': 1})
+    index.attach(a, "rs_data.json")
+    b.insert("rs_data.json", {'id': "c1", 'name': "王小明"})
+    assert index.search("小明") == []          # 節流期間沿用快照
+    index.refresh(force=True)
+    assert len(index.search("小明")) == 1
+
+def test_schedule_sees_other_process_bookings(stores):
+    a, b = stores
+    schedule = InterviewSchedule()
+    schedule.attach(a, "rs_interviews.json")
+    start, end = datetime(2025, 6, 1, 10), datetime(2025, 6, 1, 11)
+    assert schedule.conflicts("c1", "A室", start, end) == []
+    b.insert("rs_interviews.json", {'id': "i1", 'candidate_id': "c2", 'location': "A室",
+                                    'start': start.strftime(TIME_FORMAT), 'end': end.strftime(TIME_FORMAT)})
+    assert [kind for kind, _ in schedule.conflicts("c1", "A室", start, end)] == ['location']
+
+def test_reminders_follow_other_process(stores):
+    a, b = stores
+    reminders = ReminderIndex()
+    reminders.attach(a, "hrp_calendar.json", lookup_field='entry_id')
+    assert reminders.between() == []
+    b.insert("hrp_calendar.json", {'id': "r1", 'entry_id': "e1", 'date': "2025-07-01", 'note': "會議"})
+    assert [r['id'] for r in reminders.between()] == ["r1"]
+    assert reminders.ids_for(["e1"]) == {"r1"}
+
+def test_groups_follow_other_process(stores):
+    a, b = stores
+    attendees = GroupIndex('session_id')
+    attendees.attach(a, "td_attendees.json", lookup_field='session_id')
+    assert attendees.group("s1") == []
+    b.insert("td_attendees.json", {'id': "a1", 'session_id': "s1", 'emp': "王", 'status': "出席"})
+    assert [r['emp'] for r in attendees.group("s1")] == ["王"]
+    assert attendees.ids_for(["s1"]) == {"a1"}
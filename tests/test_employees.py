@@ -0,0 +1,88 @@
+# 員工主檔：姓名正規化、先查後建 (含其他程序新增的員工)、同名解析、既有記錄回填與跨程序配發員工編號
+import os
+import subprocess
+import sys
+
+import pytest
+
+import employees
+from conftest import ROOT
+from employees import EMPLOYEE_FILE, ensure_employees, link_records, normalize_name
+from services import EmployeeService
+from store import RecordStore
+from storage import JsonBackend, SqliteBackend
+
+@pytest.fixture
+def store(workdir, monkeypatch):
+    store = RecordStore(JsonBackend(), refresh_interval=0)
+    monkeypatch.setattr(employees, "get_store", lambda: store)
+    return store
+
+def test_normalize_name():
+    assert normalize_name("  ＡＢＣ　 Lee ") == "abc lee"
+    assert normalize_name(None) == ""
+
+def test_ensure_creates_missing_once(store):
+    ids = ensure_employees(["王小明", " 王小明", "ＪＯＨＮ", "john", "匿名", "", None])
+    assert set(ids) == {"王小明", "john"}
+    registry = employees.get_registry()
+    assert [(r['emp_no'], r['name']) for r in registry.all()] == [("E00001", "王小明"), ("E00002", "JOHN")]
+    assert ensure_employees(["李四", "王小明"])["王小明"] == ids["王小明"]
+    assert len(registry) == 3 and ensure_employees(["趙六"]) and registry.find("趙六")[0]['emp_no'] == "E00004"
+    assert registry.by_no("E00003")['name'] == "李四"
+
+def test_other_process_employees_are_reused(store):
+    registry = employees.get_registry()
+    assert len(registry) == 0
+    other = RecordStore(JsonBackend(), refresh_interval=3600)
+    other.insert(EMPLOYEE_FILE, employees.new_employee("陳大文", "E00007"))
+    emp_id = employees.link_employee("陳大文")
+    assert registry.get(emp_id)['emp_no'] == "E00007" and len(registry) == 1
+    assert ensure_employees(["新人"]) and registry.find("新人")[0]['emp_no'] == "E00008"
+
+def test_same_name_resolves_to_lowest_number(store):
+    store.insert_many(EMPLOYEE_FILE, [employees.new_employee("林一", "E00005"), employees.new_employee("林一", "E00002")])
+    registry = employees.get_registry()
+    assert [r['emp_no'] for r in registry.find("林一")] == ["E00002", "E00005"]
+    assert registry.get(registry.resolve("林一"))['emp_no'] == "E00002"
+
+def test_link_and_backfill(store):
+    records = link_records([{'emp': "王"}, {'emp': "匿名"}])
+    assert records[0]['emp_id'] and records[1]['emp_id'] is None
+    store.insert_many("comp_data.json", [{'id': "1", 'emp': "王"}, {'id': "2", 'emp': "李"},
+                                         {'id': "3", 'emp': "李", 'emp_id': "old"}])
+    store.insert_many("er_data.json", [{'id': "9", 'emp': "匿名"}])
+    result = employees.backfill({"comp_data.json": 'emp', "er_data.json": 'emp'})
+    assert result == {"comp_data.json": 2, "er_data.json": 0}
+    comp = {r['id']: r['emp_id'] for r in store.records("comp_data.json")}
+    assert comp["1"] == records[0]['emp_id'] and comp["3"] == "old" and comp["2"] not in (None, "old")
+
+def test_service_create_and_import(store):
+    service = EmployeeService(store)
+    record = service.create({'name': "  王小明 ", 'department': "RD"})
+    assert (record['emp_no'], record['name'], record['department']) == ("E00001", "王小明", "RD")
+    # 手動新增同名員工另建一筆；匯入時已存在的姓名略過，只回傳新增的員工並保留部門
+    assert service.create({'name': "王小明"})['emp_no'] == "E00002"
+    inserted = service.commit_import([{'name': "王小明", 'department': "QA"}, {'name': "李四", 'department': "QA"},
+                                      {'name': "李四", 'department': "HR"}])
+    assert [(r['emp_no'], r['name'], r['department']) for r in inserted] == [("E00003", "李四", "QA")]
+    assert len(store.records(EMPLOYEE_FILE)) == 3
+
+WORKER = r"""
+import sys
+from employees import ensure_employees
+tag = sys.argv[1]
+for i in range(10):
+    ensure_employees([f"共用{i}", f"{tag}-{i}"])
+"""
+
+@pytest.mark.parametrize("storage", ["json", "sqlite"])
+def test_processes_allocate_unique_numbers(workdir, storage):
+    env = {**os.environ, 'PYTHONPATH': ROOT, 'HRM_WRITE_BEHIND': "0", 'HRM_STORAGE': storage}
+    procs = [subprocess.Popen([sys.executable, "-c", WORKER, str(n)], cwd=workdir, env=env) for n in range(4)]
+    assert [p.wait(timeout=60) for p in procs] == [0] * 4
+    backend = SqliteBackend() if storage == "sqlite" else JsonBackend()
+    records = backend.load(EMPLOYEE_FILE)
+    assert len(records) == 50
+    assert len({r['emp_no'] for r in records}) == 50
+    assert len({r['name'] for r in records}) == 50
@@ -0,0 +1,53 @@
+# 匯出：分塊串流的 JSON/CSV、gzip、依資料版本快取，以及未安裝 pyarrow 時的 Parquet
+import csv
+import gzip
+import io
+import json
+import os
+
+import pytest
+
+import export
+from store import RecordStore
+from storage import JsonBackend
+
+NAME = "hrp_entries.json"
+
+@pytest.fixture
+def store(workdir, monkeypatch):
+    store = RecordStore(JsonBackend(), refresh_interval=0)
+    monkeypatch.setattr(export, "get_store", lambda: store)
+    monkeypatch.setattr(export, "CHUNK_SIZE", 2)
+    export.clear_cache()
+    yield store
+    export.clear_cache()
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+def test_json_and_csv_round_trip(store):
+    store.insert_many(NAME, [{'id': str(i), 'demand': f"需求{i}"} for i in range(5)])
+    store.insert(NAME, {'id': "9", 'demand': "x", 'note': "新欄位"})
+    path, file_name, mime = export.export_file(NAME, 'json')
+    assert file_name == "hrp_entries.json" and mime == "application/json"
+    assert [r['id'] for r in json.loads(_read(path))] == ["0", "1", "2", "3", "4", "9"]
+    path, _, _ = export.export_file(NAME, 'csv', compress=True)
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(_read(path)).decode("utf-8-sig"))))
+    assert len(rows) == 6 and rows[-1]['note'] == "新欄位" and rows[0]['note'] == ""
+
+def test_cache_follows_dataset_version(store):
+    store.insert(NAME, {'id': "1", 'demand': "a"})
+    first, _, _ = export.export_file(NAME, 'json')
+    assert export.export_file(NAME, 'json')[0] == first
+    store.insert(NAME, {'id': "2", 'demand': "b"})
+    second, _, _ = export.export_file(NAME, 'json')
+    assert second != first and len(json.loads(_read(second))) == 2
+    assert not os.path.exists(first)
+
+def test_parquet_requires_pyarrow(store, monkeypatch):
+    monkeypatch.setattr(export, "available_formats", lambda: ['json', 'csv'])
+    with pytest.raises(ValueError, match="pyarrow"):
+        export.export_file(NAME, 'parquet')
+    with pytest.raises(ValueError):
+        export.export_file(NAME, 'xml')
@@ -0,0 +1,32 @@
+# DataFrame 快取：欄位型別轉換，以及依資料集版本快取 (寫入前重用同一個 DataFrame，寫入後重建)
+import pandas as pd
+import pytest
+
+import frames
+from store import RecordStore
+from storage import JsonBackend
+
+@pytest.fixture
+def store(workdir, monkeypatch):
+    store = RecordStore(JsonBackend(), refresh_interval=0)
+    monkeypatch.setattr(frames, "get_store", lambda: store)
+    monkeypatch.setattr(frames, "_frames", {})
+    return store
+
+def test_build_frame_types():
+    df = frames.build_frame([{'department': "研發", 'created_at': "2025-06-01 10:00:00", 'salary': 100},
+                             {'department': "業務", 'created_at': "不是日期", 'salary': 200}])
+    assert isinstance(df['department'].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_datetime64_any_dtype(df['created_at']) and df['created_at'].isna().tolist() == [False, True]
+    assert pd.api.types.is_numeric_dtype(df['salary'])
+    assert frames.build_frame([]).empty
+
+def test_frame_is_cached_per_version(store):
+    store.insert("comp_data.json", {'id': "1", 'department': "研發", 'salary': 100})
+    df = frames.get_frame("comp_data.json")
+    assert frames.get_frame("comp_data.json") is df
+    store.update("comp_data.json", "1", {'salary': 150})
+    updated = frames.get_frame("comp_data.json")
+    assert updated is not df and updated['salary'].tolist() == [150]
+    # 每個資料集只保留最新版本
+    assert list(frames._frames) == [(store, "comp_data.json")] and frames._frames[(store, "comp_data.json")][1] is updated
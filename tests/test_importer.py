@@ -0,0 +1,58 @@
+# 批次匯入：分塊讀取、向量化驗證 (列號與試算表一致) 與未安裝 openpyxl 時的 Excel
+import io
+
+import pytest
+
+import importer
+
+SCHEMA = {
+    'name': {'required': True},
+    'salary': {'type': 'int', 'required': True, 'min': 0},
+    'bonus': {'type': 'float', 'default': 0},
+    'level': {'choices': ["A", "B"]},
+    'date': {'type': 'date'},
+}
+
+CSV = """name,salary,bonus,level,date
+王小明,50000,1000.5,A,2025-01-31
+,40000,,B,
+李四,abc,,A,
+張三,-1,,C,2025-13-01
+陳五,3.5,,,
+林六,42000,,,
+"""
+
+def _prepare(text, chunk_rows=2, derive=None):
+    return importer.prepare_import(io.BytesIO(text.encode("utf-8-sig")), "x.csv", SCHEMA, derive, chunk_rows)
+
+def test_errors_use_spreadsheet_rows():
+    records, errors = _prepare(CSV)
+    assert [r['name'] for r in records] == ["王小明", "林六"]
+    assert sorted(errors) == [
+        (3, 'name', "必填欄位為空"),
+        (4, 'salary', "無法轉換為 int"),
+        (5, 'date', "無法轉換為 date"),
+        (5, 'level', "必須為 A、B 之一"),
+        (5, 'salary', "不可小於 0"),
+        (6, 'salary', "必須為整數"),
+    ]
+
+def test_records_are_json_native():
+    records, _ = _prepare(CSV, chunk_rows=100)
+    first, last = records
+    assert first['salary'] == 50000 and type(first['salary']) is int
+    assert first['bonus'] == 1000.5 and first['date'] == "2025-01-31"
+    assert last['bonus'] == 0 and last['level'] is None and last['date'] is None
+    assert first['id'] != last['id'] and first['created_at']
+
+def test_derive_runs_on_accepted_chunks():
+    def derive(df):
+        df['total'] = df['salary'] + df['bonus']
+        return df
+    records, _ = _prepare(CSV, derive=derive)
+    assert [r['total'] for r in records] == [51000.5, 42000]
+
+def test_xlsx_without_openpyxl(monkeypatch):
+    monkeypatch.setattr(importer, "available_types", lambda: ['csv'])
+    with pytest.raises(ValueError, match="openpyxl"):
+        importer.prepare_import(io.BytesIO(b""), "x.xlsx", SCHEMA)
@@ -0,0 +1,74 @@
+# 操作日誌：依月份與大小分段、過去月份壓縮、由新到舊分頁與舊格式遷移 (略過損壞的行)
+import json
+import os
+
+import pytest
+
+import journal
+
+PATH = "hrp_logs.jsonl"
+
+@pytest.fixture(autouse=True)
+def fresh_state(workdir, monkeypatch):
+    monkeypatch.setattr(journal, "_state", {})
+    monkeypatch.setattr(journal, "_counts", {})
+    # 壓縮改為同步執行，測試不必等待背景執行緒
+    monkeypatch.setattr(journal, "_rotate_async", journal.compress_old_segments)
+
+def _entry(month, day, n):
+    return {'timestamp': f"{month}-{day:02d} 10:00:{n % 60:02d}", 'action': "新增", 'details': f"第{n}筆"}
+
+def _write(month, count, start=0):
+    for n in range(start, start + count):
+        journal.append_entry(PATH, _entry(month, n % 28 + 1, n))
+
+def test_segments_split_by_size(monkeypatch):
+    monkeypatch.setattr(journal, "SEGMENT_BYTES", 300)
+    _write("2025-06", 12)
+    parts = [p for m, p, _ in journal.list_segments(PATH)]
+    assert len(parts) > 1 and parts == sorted(parts)
+    assert [e['details'] for e in journal.read_entries(PATH)] == [f"第{n}筆" for n in range(12)]
+
+def test_new_month_compresses_previous_segments():
+    _write("2025-05", 3)
+    _write("2025-06", 2, start=3)
+    names = sorted(os.path.basename(p) for _, _, p in journal.list_segments(PATH))
+    assert names == ["2025-05.jsonl.gz", "2025-06.jsonl"]
+    assert len(journal.read_entries(PATH)) == 5
+
+def test_pages_run_newest_first_with_range(monkeypatch):
+    monkeypatch.setattr(journal, "SEGMENT_BYTES", 300)
+    _write("2025-04", 5)
+    _write("2025-05", 5, start=5)
+    _write("2025-06", 5, start=10)
+    rows, total = journal.read_page(PATH, page=1, page_size=4)
+    assert total == 15 and [r['details'] for r in rows] == ["第14筆", "第13筆", "第12筆", "第11筆"]
+    rows, _ = journal.read_page(PATH, page=4, page_size=4)
+    assert [r['details'] for r in rows] == ["第2筆", "第1筆", "第0筆"]
+    rows, total = journal.read_page(PATH, page=1, page_size=10,
+                                    start="2025-05-07 00:00:00", end="2025-06-11 23:59:59")
+    assert total == 5 and [r['details'] for r in rows] == ["第10筆", "第9筆", "第8筆", "第7筆", "第6筆"]
+
+def test_partial_line_is_skipped():
+    _write("2025-06", 2)
+    seg_path = journal.list_segments(PATH)[-1][2]
+    with open(seg_path, "a", encoding="utf-8") as f:
+        f.write('{"timestamp": "2025-06')
+    assert len(journal.read_entries(PATH)) == 2
+
+def test_legacy_array_is_migrated():
+    legacy = [_entry("2025-03", 1, 0), _entry("2025-04", 2, 1)]
+    with open("hrp_logs.json", "w", encoding="utf-8") as f:
+        json.dump(legacy, f, ensure_ascii=False)
+    _write("2025-06", 1, start=2)
+    assert [e['details'] for e in journal.read_entries(PATH)] == ["第0筆", "第1筆", "第2筆"]
+    assert os.path.exists("hrp_logs.json.migrated") and not os.path.exists("hrp_logs.json")
+
+def test_bad_legacy_lines_are_skipped(caplog):
+    with open(PATH, "w", encoding="utf-8") as f:
+        f.write(json.dumps(_entry("2025-04", 1, 0), ensure_ascii=False) + "\n")
+        f.write("{不是 JSON\n\n[1, 2]\n")
+        f.write(json.dumps(_entry("2025-04", 2, 1), ensure_ascii=False) + "\n")
+    assert [e['details'] for e in journal.read_entries(PATH)] == ["第0筆", "第1筆"]
+    assert os.path.exists(PATH + ".migrated")
+    assert "第 2 行" in caplog.text and "第 4 行" in caplog.text
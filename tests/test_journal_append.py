@@ -0,0 +1,39 @@
+# 操作日誌的 append-only 寫入：每筆只在分段檔尾追加一行 JSON，既有內容不重寫，讀取端逐筆串流
+import json
+import types
+
+import pytest
+
+import journal
+
+PATH = "comp_logs.jsonl"
+
+@pytest.fixture(autouse=True)
+def fresh_state(workdir, monkeypatch):
+    monkeypatch.setattr(journal, "_state", {})
+    monkeypatch.setattr(journal, "_counts", {})
+
+def _append(n):
+    journal.append_entry(PATH, {'timestamp': f"2025-06-01 10:00:{n:02d}", 'action': "新增", 'details': f"王{n}"})
+
+def test_append_adds_one_line_without_rewriting():
+    _append(0)
+    _append(1)
+    seg_path = journal.list_segments(PATH)[-1][2]
+    with open(seg_path, "rb") as f:
+        before = f.read()
+    _append(2)
+    with open(seg_path, "rb") as f:
+        after = f.read()
+    assert after.startswith(before)
+    added = after[len(before):].decode("utf-8")
+    assert added.count("\n") == 1 and json.loads(added)['details'] == "王2"
+    assert [json.loads(line)['details'] for line in after.decode("utf-8").splitlines()] == ["王0", "王1", "王2"]
+
+def test_entries_are_streamed_in_order():
+    for n in range(3):
+        _append(n)
+    entries = journal.iter_entries(PATH)
+    assert isinstance(entries, types.GeneratorType)
+    assert next(entries)['details'] == "王0"
+    assert [e['details'] for e in journal.read_entries(PATH, limit=2)] == ["王0", "王1"]
@@ -0,0 +1,109 @@
+# JSON 後端：背景佇列中的異動與同步合併、版本衝突，以及多執行緒/多程序寫入同一份檔案
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import persistence
+from conftest import ROOT
+from store import RecordStore
+from storage import ConflictError, JsonBackend, merge_ops
+
+@pytest.fixture
+def writer(workdir, monkeypatch):
+    # 啟用背景寫入，時間窗拉長，確保測試期間異動仍在佇列中
+    queue = persistence.WriteBehindQueue(delay=5, enabled=True)
+    monkeypatch.setattr(persistence, "_writer", queue)
+    yield queue
+    queue.flush(timeout=10)
+
+def _disk(name):
+    with open(name, encoding="utf-8") as f:
+        return {r['id']: r for r in json.load(f)}
+
+def test_merge_ops_reports_stale_updates():
+    merged, conflicts = merge_ops([{'id': "1", '_version': 2}], [('update', {'id': "1", '_version': 2}),
+                                                                 ('update', {'id': "9", '_version': 2})])
+    assert merged == [{'id': "1", '_version': 2}]
+    assert [rid for rid, _ in conflicts] == ["1", "9"]
+
+def test_inserts_are_queued_until_flush(writer):
+    store = RecordStore(JsonBackend(), refresh_interval=3600)
+    store.insert("kpi_data.json", {'id': "1", 'score': 1})
+    assert writer.pending() == ["kpi_data.json"]
+    writer.flush(timeout=10)
+    assert _disk("kpi_data.json")["1"]['score'] == 1
+
+def test_update_writes_queued_ops_first(writer):
+    store = RecordStore(JsonBackend(), refresh_interval=3600)
+    store.insert("kpi_data.json", {'id': "1", 'score': 1})
+    store.update("kpi_data.json", "1", {'score': 2}, expected_version=1)
+    # 更新在呼叫端同步落盤，佇列中較早的新增一併寫入
+    assert writer.pending() == []
+    assert _disk("kpi_data.json")["1"]['score'] == 2
+
+def test_stale_update_raises_instead_of_being_dropped(writer):
+    a = RecordStore(JsonBackend(), refresh_interval=3600)
+    b = RecordStore(JsonBackend(), refresh_interval=0)
+    a.insert("kpi_data.json", {'id': "1", 'score': 1})
+    a.insert("kpi_data.json", {'id': "2", 'score': 1})
+    writer.flush(timeout=10)
+    b.update("kpi_data.json", "1", {'score': 50})
+    # a 的快照仍是版本 1 (節流中)，樂觀鎖在記憶體中通過，但磁碟上已是版本 2
+    with pytest.raises(ConflictError):
+        a.update("kpi_data.json", "1", {'score': 99}, expected_version=1)
+    disk = _disk("kpi_data.json")
+    assert disk["1"]['score'] == 50 and disk["1"]['_version'] == 2
+    # 衝突後 a 重新載入，之後的更新以最新版本為準
+    assert a.get("kpi_data.json", "1")['score'] == 50
+    a.update("kpi_data.json", "1", {'score': 60}, expected_version=2)
+    assert _disk("kpi_data.json")["1"]['score'] == 60
+
+def test_rejected_batch_is_not_partially_written(writer):
+    a = RecordStore(JsonBackend(), refresh_interval=3600)
+    b = RecordStore(JsonBackend(), refresh_interval=0)
+    a.insert_many("kpi_data.json", [{'id': "1", 'score': 1}, {'id': "2", 'score': 1}])
+    writer.flush(timeout=10)
+    b.update("kpi_data.json", "2", {'score': 7})
+    with pytest.raises(ConflictError):
+        a.update_many("kpi_data.json", {"1", "2"}, {'score': 0})
+    disk = _disk("kpi_data.json")
+    assert disk["1"]['score'] == 1 and disk["2"]['score'] == 7
+
+def test_concurrent_updates_from_threads(writer):
+    store = RecordStore(JsonBackend(), refresh_interval=3600)
+    store.insert_many("er_data.json", [{'id': str(i), 'n': 0} for i in range(20)])
+    def bump(i):
+        store.update("er_data.json", str(i), {'n': i})
+    threads = [threading.Thread(target=bump, args=(i,)) for i in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    writer.flush(timeout=10)
+    assert {rid: r['n'] for rid, r in _disk("er_data.json").items()} == {str(i): i for i in range(20)}
+
+# 多個程序同時以檔案鎖合併寫入同一份 JSON 檔，彼此的新增與更新都不會遺失
+WORKER = """
+import sys
+from persistence import file_lock, write_json_atomic
+from store import RecordStore
+from storage import JsonBackend, load_json
+tag = sys.argv[1]
+store = RecordStore(JsonBackend(), refresh_interval=0)
+for i in range(20):
+    store.insert("kpi_data.json", {'id': f"{tag}-{i}", 'score': i})
+    with file_lock("counter.json"):
+        write_json_atomic("counter.json", {'n': (load_json("counter.json") or {'n': 0})['n'] + 1})
+"""
+
+def test_processes_do_not_lose_writes(workdir):
+    env = {**os.environ, 'PYTHONPATH': ROOT, 'HRM_WRITE_BEHIND': "0"}
+    procs = [subprocess.Popen([sys.executable, "-c", WORKER, str(n)], cwd=workdir, env=env) for n in range(4)]
+    assert [p.wait(timeout=60) for p in procs] == [0] * 4
+    assert len(_disk("kpi_data.json")) == 80
+    with open("counter.json", encoding="utf-8") as f:
+        assert json.load(f)['n'] == 80
@@ -0,0 +1,39 @@
+# 關鍵詞統計：未安裝 jieba 時以詞典最大匹配斷詞，並隨 store 的寫入增量更新
+import pytest
+
+import keywords
+from keywords import KeywordStats, max_match, segment
+from store import RecordStore
+from storage import JsonBackend
+
+@pytest.fixture(autouse=True)
+def no_jieba(monkeypatch):
+    monkeypatch.setattr(keywords, "_jieba", False)
+
+def test_known_terms_stay_intact():
+    terms = segment("需要資深軟體工程師一名，具備資料庫經驗")
+    assert terms == ["資深", "軟體工程師", "資料庫", "經驗"]
+    assert "程師" not in segment("徵求工程師兩名")
+    assert "工程師" in segment("徵求工程師兩名")
+
+def test_unknown_text_falls_back_to_bigrams():
+    assert max_match("甲乙丙工程師丁戊") == ["甲乙", "乙丙", "工程師", "丁戊"]
+    assert max_match("甲") == []
+
+def test_mixed_text_keeps_words_and_drops_stopwords():
+    assert segment("Python 後端工程師 3 年 and 英文") == ["python", "後端工程師", "英文"]
+
+def test_stats_follow_store_writes(workdir):
+    store = RecordStore(JsonBackend(), refresh_interval=0)
+    stats = KeywordStats()
+    stats.attach(store, "hrp_entries.json")
+    store.insert("hrp_entries.json", {'id': "1", 'year': 2025, 'department': "研發部", 'demand': "後端工程師"})
+    store.insert("hrp_entries.json", {'id': "2", 'year': 2025, 'department': "業務部", 'demand': "業務專員"})
+    store.insert("hrp_entries.json", {'id': "3", 'year': 2024, 'department': "研發部", 'demand': "後端工程師"})
+    assert stats.top(year=2025) == [("後端工程師", 1), ("業務", 1), ("專員", 1)]
+    assert stats.top(department="研發部") == [("後端工程師", 2)]
+    store.update("hrp_entries.json", "1", {'demand': "測試工程師"})
+    store.delete("hrp_entries.json", "3")
+    assert stats.top(department="研發部") == [("測試工程師", 1)]
+    with pytest.raises(ValueError):
+        stats.top(level=1)
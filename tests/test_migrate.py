@@ -0,0 +1,27 @@
+# JSON → SQLite 遷移：補上缺少的 id、已有資料時略過，覆蓋時在同一個交易內取代並遞增版本
+import json
+
+from migrate import migrate
+from storage import SqliteBackend
+
+def _write(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(records, f, ensure_ascii=False)
+
+def test_migrate_skips_then_replaces(workdir):
+    _write("comp_data.json", [{'id': "1", 'emp': "王", 'salary': 100}, {'emp': "李", 'salary': 200}])
+    _write("hrp_calendar.json", [{'date': "2025-06-01", 'note': "舊提醒"}])
+    summary = migrate("hrm.db", str(workdir))
+    assert set(summary) == {"comp_data.json", "hrp_calendar.json"}
+    reader = SqliteBackend("hrm.db")
+    rows = reader.load("comp_data.json")
+    assert [r['emp'] for r in rows] == ["王", "李"] and all(r.get('id') for r in rows)
+    assert reader.load("hrp_calendar.json")[0]['id']
+
+    _write("comp_data.json", [{'id': "9", 'emp': "陳", 'salary': 300}])
+    assert migrate("hrm.db", str(workdir))["comp_data.json"].startswith("略過")
+    assert not reader.stale("comp_data.json")
+    migrate("hrm.db", str(workdir), replace=True)
+    # 已載入的程序會因版本遞增而重新載入
+    assert reader.stale("comp_data.json")
+    assert [r['id'] for r in reader.load("comp_data.json")] == ["9"]
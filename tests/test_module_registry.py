@@ -0,0 +1,42 @@
+# 延遲載入：main.py 只匯入選到的模組，註冊表的進入點都存在，各頁面不在模組層級匯入 matplotlib
+# (頁面模組相依 streamlit，這裡以語法樹檢查，不實際匯入)
+import ast
+import os
+
+import pytest
+
+from conftest import ROOT
+
+def _tree(module):
+    with open(os.path.join(ROOT, f"{module}.py"), encoding="utf-8") as f:
+        return ast.parse(f.read())
+
+def _top_level_imports(tree):
+    names = set()
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            names.add(node.module)
+    return names
+
+def _registry():
+    for node in _tree("main").body:
+        if isinstance(node, ast.Assign) and any(getattr(t, 'id', None) == "MODULES" for t in node.targets):
+            return ast.literal_eval(node.value)
+    pytest.fail("main.py 缺少 MODULES")
+
+def test_main_imports_no_page_modules():
+    modules = {module for module, _ in _registry().values()}
+    assert _top_level_imports(_tree("main")) == {"importlib", "streamlit"}
+    assert len(modules) == len(_registry())
+
+@pytest.mark.parametrize("module, entry", list(_registry().values()))
+def test_entry_points_exist_and_defer_plotting(module, entry):
+    tree = _tree(module)
+    assert entry in {node.name for node in tree.body if isinstance(node, ast.FunctionDef)}
+    assert not any(name.startswith("matplotlib") for name in _top_level_imports(tree))
+
+def test_shared_modules_defer_plotting():
+    for module in ("components", "services", "frames", "store"):
+        assert not any(name.startswith("matplotlib") for name in _top_level_imports(_tree(module)))
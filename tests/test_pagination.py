@@ -0,0 +1,48 @@
+# 伺服器端分頁：只取回目前這一頁、總筆數、OR/contains/prefix 篩選，記憶體路徑的排序快取與 SQLite 下推
+import pytest
+
+from store import RecordStore
+from storage import JsonBackend, SqliteBackend
+
+NAME = "rs_data.json"
+
+@pytest.fixture(params=["json", "sqlite"])
+def store(request, workdir):
+    backend = JsonBackend() if request.param == "json" else SqliteBackend(str(workdir / "hrm.db"))
+    store = RecordStore(backend, refresh_interval=0)
+    store.insert_many(NAME, [{'id': str(i), 'name': f"Cand{i:02d}", 'position': "工程師" if i % 3 else "設計師",
+                              'rating': i % 5} for i in range(23)])
+    return store
+
+def test_last_page_and_out_of_range(store):
+    rows, total = store.page(NAME, page=3, page_size=10)
+    assert total == 23 and [r['id'] for r in rows] == ["20", "21", "22"]
+    assert store.page(NAME, page=4, page_size=10) == ([], 23)
+
+def test_or_contains_and_prefix_filters(store):
+    where = [(('name', 'position'), 'contains', "cand1"), ('position', 'prefix', "工程")]
+    rows, total = store.page(NAME, where, 'name', False, page=1, page_size=50)
+    assert total == 7 and [r['name'] for r in rows][-3:] == ["Cand16", "Cand17", "Cand19"]
+
+def test_sorted_pages_follow_writes(store):
+    first, _ = store.page(NAME, [], 'rating', True, page=1, page_size=5)
+    assert [r['rating'] for r in first] == [4] * 4 + [3]
+    store.update(NAME, "0", {'rating': 9})
+    assert store.page(NAME, [], 'rating', True, page=1, page_size=1)[0][0]['id'] == "0"
+    store.delete(NAME, {"0"})
+    assert store.page(NAME, [], 'rating', True, page=1, page_size=5)[1] == 22
+
+def test_memory_path_reuses_sorted_result(workdir):
+    store = RecordStore(JsonBackend(), refresh_interval=0)
+    store.insert_many(NAME, [{'id': str(i), 'rating': i % 5} for i in range(10)])
+    store.page(NAME, [], 'rating', False, page=1, page_size=3)
+    cached = store._sorted[(NAME, 'rating', False)]
+    store.page(NAME, [], 'rating', False, page=2, page_size=3)
+    assert store._sorted[(NAME, 'rating', False)] is cached
+
+def test_sqlite_page_does_not_load_snapshot(workdir, monkeypatch):
+    store = RecordStore(SqliteBackend(str(workdir / "hrm.db")), refresh_interval=0)
+    store.insert_many(NAME, [{'id': str(i), 'rating': i} for i in range(30)])
+    monkeypatch.setattr(store, "snapshot", lambda name: pytest.fail("不應載入整份資料"))
+    rows, total = store.page(NAME, [('rating', 'in', [3, 4, 5])], 'rating', True, page=1, page_size=2)
+    assert total == 3 and [r['rating'] for r in rows] == [5, 4]
@@ -0,0 +1,73 @@
+# 薪資引擎：津貼解析、按日比例、CPF 上限與年齡費率、累進稅額與月度彙總 (金額以手算驗證)
+import gzip
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import payroll
+
+def test_allowance_items():
+    text = "交通津貼: 2000; 餐費=1,500；備註：無，住房津貼：800.5"
+    assert payroll.allowance_items(text) == [("交通津貼", 2000.0), ("餐費", 1500.0), ("住房津貼", 800.5)]
+    assert list(payroll.parse_allowances(pd.Series([text, None, text]))) == [4300.5, 0.0, 4300.5]
+
+def test_annual_tax_brackets():
+    tax = payroll.annual_tax(np.array([0, 20000, 25000, 35000, 84240]))
+    assert tax == pytest.approx([0, 0, 100, 375, 3837.6])
+
+def test_cpf_rates_by_age():
+    employee, employer = payroll.cpf_rates(np.array([35, 55, 56, 60, 99]))
+    assert list(employee) == [0.20, 0.20, 0.17, 0.17, 0.05]
+    assert list(employer) == [0.17, 0.17, 0.155, 0.155, 0.075]
+
+@pytest.fixture
+def staff():
+    df = pd.DataFrame([
+        {'id': "1", 'emp': "王", 'salary': 5000, 'bonus': 0, 'benefits': "交通津貼: 2000; 餐費=1,500"},
+        {'id': "2", 'emp': "李", 'salary': "4000", 'bonus': 1000, 'age': 60, 'start_date': "2025-06-16",
+         'bonus_month': "2025-06"},
+        {'id': "3", 'emp': "張", 'salary': 3000, 'bonus': 500, 'end_date': "2025-05-31"},
+    ])
+    df['created_at'] = "2025-05-20 10:00:00"
+    return df
+
+def test_run_payroll(staff):
+    run = payroll.run_payroll(staff, 2025, 6).set_index('emp')
+    wang, li, zhang = run.loc["王"], run.loc["李"], run.loc["張"]
+    # 經常性薪資 8500 超過上限 7400，CPF 以 7400 計
+    assert (wang.gross, wang.cpf_employee, wang.cpf_employer) == (8500, 1480, 1258)
+    assert (wang.tax, wang.net) == (pytest.approx(319.8), pytest.approx(6700.2))
+    # 6/16 到職：30 天中在職 15 天；獎金全額計提 CPF
+    assert (li.prorate, li.base, li.gross) == (0.5, 2000, 3000)
+    assert (li.cpf_employee, li.cpf_employer, li.tax, li.net) == (510, 465, 0, 2490)
+    # 上月離職：不計薪也不發獎金
+    assert (zhang.prorate, zhang.gross, zhang.bonus, zhang.net) == (0, 0, 0, 0)
+
+def test_summary_and_saved_run(staff, workdir, monkeypatch):
+    run = payroll.run_payroll(staff, 2025, 6)
+    summary = payroll.summarize(run)
+    assert summary['headcount'] == 2 and summary['gross'] == 11500
+    assert summary['employer_cost'] == 11500 + 1258 + 465
+    monkeypatch.setattr(payroll, "RUN_DIR", str(workdir / "runs"))
+    path, record = payroll.save_run(run, 2025, 6)
+    assert record['month'] == "2025-06" and record['net'] == summary['net']
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        assert len(pd.read_csv(f)) == 3
+    months = payroll.monthly_totals(staff, [(2025, 5), (2025, 6)])
+    assert list(months['headcount']) == [2, 2] and list(months['month']) == ["2025-05", "2025-06"]
+    # 張的獎金在記錄建立的 5 月發放，李的獎金依 bonus_month 在 6 月發放
+    assert list(months['bonus']) == [500, 1000]
+
+def test_only_latest_record_per_employee_is_paid(staff):
+    raise_record = {'id': "4", 'emp': "王", 'salary': 6000, 'bonus': 0, 'created_at': "2025-06-01 09:00:00"}
+    old_record = {'id': "5", 'emp': "王", 'salary': 4000, 'bonus': 300, 'created_at': "2024-01-01 09:00:00"}
+    df = pd.concat([staff, pd.DataFrame([raise_record, old_record])], ignore_index=True)
+    run = payroll.run_payroll(df, 2025, 6)
+    assert sorted(run['emp']) == ["張", "李", "王"]
+    assert run.set_index('emp').loc["王", 'base'] == 6000
+    assert payroll.summarize(run)['headcount'] == 2
+
+def test_one_off_bonus_is_counted_once_a_year(staff):
+    months = payroll.monthly_totals(staff.iloc[[1]], [(2025, m) for m in range(1, 13)])
+    assert months['bonus'].sum() == 1000
@@ -0,0 +1,64 @@
+# 原子化寫檔、檔尾追加、檔案鎖與背景寫入佇列
+import json
+import os
+import stat
+import threading
+
+import pytest
+
+import persistence
+from persistence import WriteBehindQueue, append_lines, file_lock, write_json_atomic
+
+def _mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+@pytest.mark.parametrize("mode", [0o644, 0o640, 0o664])
+def test_atomic_write_keeps_file_mode(workdir, mode):
+    path = str(workdir / "data.json")
+    write_json_atomic(path, [1])
+    os.chmod(path, mode)
+    write_json_atomic(path, [1, 2])
+    assert _mode(path) == mode
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == [1, 2]
+
+def test_new_file_follows_umask(workdir):
+    path = str(workdir / "new.json")
+    write_json_atomic(path, {})
+    assert _mode(path) == 0o666 & ~persistence._UMASK
+    assert not [f for f in os.listdir(workdir) if f.startswith(".tmp-")]
+
+def test_append_lines_repairs_partial_line(workdir):
+    path = str(workdir / "log.jsonl")
+    with open(path, "w") as f:
+        f.write('{"a": 1}\n{"b"')
+    append_lines(path, ['{"c": 3}\n'])
+    with open(path) as f:
+        assert f.read().splitlines()[-1] == '{"c": 3}'
+
+def test_file_lock_serializes_writers(workdir):
+    path = str(workdir / "counter.json")
+    write_json_atomic(path, {'n': 0})
+    def bump():
+        for _ in range(20):
+            with file_lock(path):
+                with open(path) as f:
+                    n = json.load(f)['n']
+                write_json_atomic(path, {'n': n + 1})
+    threads = [threading.Thread(target=bump) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    with open(path) as f:
+        assert json.load(f)['n'] == 80
+
+def test_queue_coalesces_snapshots_and_flushes(workdir):
+    queue = WriteBehindQueue(delay=5, enabled=True)
+    path = str(workdir / "snap.json")
+    for i in range(5):
+        queue.put_snapshot(path, [i])
+    assert queue.pending() == [path]
+    queue.flush(timeout=10)
+    with open(path) as f:
+        assert json.load(f) == [4]
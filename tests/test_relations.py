@@ -0,0 +1,34 @@
+# 關聯索引：依外鍵分組、更新時換組，以及課程 → 場次 → 出席者的兩層連帶刪除
+import pytest
+
+from relations import GroupIndex
+from store import RecordStore
+from storage import JsonBackend
+
+@pytest.fixture
+def training(workdir):
+    store = RecordStore(JsonBackend(), refresh_interval=0)
+    sessions, attendees = GroupIndex('course_id'), GroupIndex('session_id')
+    sessions.attach(store, "td_attendance.json", lookup_field='course_id')
+    attendees.attach(store, "td_attendees.json", lookup_field='session_id')
+    store.insert_many("td_data.json", [{'id': "c1"}, {'id': "c2"}])
+    store.insert_many("td_attendance.json", [{'id': "s1", 'course_id': "c1"}, {'id': "s2", 'course_id': "c1"},
+                                             {'id': "s3", 'course_id': "c2"}])
+    store.insert_many("td_attendees.json", [{'id': f"a{i}", 'session_id': s, 'emp': f"員工{i}"}
+                                            for i, s in enumerate(["s1", "s1", "s2", "s3"])])
+    return store, sessions, attendees
+
+def test_groups_and_moves(training):
+    store, sessions, attendees = training
+    assert sorted(r['id'] for r in sessions.group("c1")) == ["s1", "s2"]
+    assert attendees.count("s1") == 2 and attendees.record("a3")['emp'] == "員工3"
+    store.update("td_attendees.json", "a0", {'session_id': "s3"})
+    assert attendees.ids_for(["s1"]) == {"a1"} and attendees.ids_for(["s3"]) == {"a0", "a3"}
+    assert attendees.group("missing") == [] and attendees.count("missing") == 0
+
+def test_cascade_through_two_levels(training):
+    store, sessions, attendees = training
+    deleted = store.delete_many("td_data.json", {"c1"})
+    assert deleted == {"td_data.json": 1, "td_attendance.json": 2, "td_attendees.json": 3}
+    assert len(sessions) == 1 and sorted(attendees.ids_for(["s1", "s2", "s3"])) == ["a3"]
+    assert [r['id'] for r in store.records("td_attendees.json")] == ["a3"]
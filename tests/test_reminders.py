@@ -0,0 +1,57 @@
+# 提醒索引：日期區間與 entry_id 查詢、連帶刪除，以及 iCal 的跳脫與折行
+from datetime import date
+
+import pytest
+
+from reminders import ReminderIndex, _fold, iter_ics
+from store import RecordStore
+from storage import JsonBackend
+
+NAME = "hrp_calendar.json"
+
+@pytest.fixture
+def reminders(workdir):
+    store = RecordStore(JsonBackend(), refresh_interval=0)
+    index = ReminderIndex()
+    index.attach(store, NAME, lookup_field='entry_id')
+    store.insert_many("hrp_data.json", [{'id': "e1"}, {'id': "e2"}])
+    store.insert_many(NAME, [
+        {'id': "r3", 'entry_id': "e2", 'date': "2025-07-10", 'note': "到職"},
+        {'id': "r1", 'entry_id': "e1", 'date': "2025-07-01", 'note': "面試"},
+        {'id': "r2", 'entry_id': "e1", 'date': "2025-07-01", 'note': "面談"},
+        {'id': "r4", 'entry_id': "e2", 'date': "2025-08-01", 'note': "試用期滿"},
+    ])
+    return store, index
+
+def _ids(records):
+    return [r['id'] for r in records]
+
+def test_date_ranges(reminders):
+    _, index = reminders
+    assert _ids(index.between()) == ["r1", "r2", "r3", "r4"]
+    assert _ids(index.between("2025-07-01", "2025-07-10")) == ["r1", "r2", "r3"]
+    assert _ids(index.between("2025-07-02", limit=1)) == ["r3"]
+    assert _ids(index.upcoming(days=8, today=date(2025, 7, 1))) == ["r1", "r2"]
+
+def test_lookup_and_cascade(reminders):
+    store, index = reminders
+    assert index.ids_for(["e1"]) == {"r1", "r2"}
+    store.update(NAME, "r2", {'entry_id': "e2", 'date': "2025-09-01"})
+    assert index.ids_for(["e2"]) == {"r2", "r3", "r4"} and _ids(index.between())[-1] == "r2"
+    assert store.delete_many("hrp_data.json", {"e2"}) == {"hrp_data.json": 1, NAME: 3}
+    assert _ids(index.between()) == ["r1"] and len(index) == 1
+
+def test_fold_keeps_multibyte_characters():
+    line = "SUMMARY:" + "招募面試" * 10
+    folded = _fold(line)
+    parts = folded.split(b"\r\n")[:-1]
+    assert all(len(p) <= 75 for p in parts) and parts[1].startswith(b" ")
+    assert b"".join(p[1:] if i else p for i, p in enumerate(parts)).decode("utf-8") == line
+
+def test_ics_events():
+    items = [{'id': "r1", 'date': "2025-07-01", 'note': "a,b;c\nd"}, {'id': "x", 'date': "07/01"}]
+    text = b"".join(iter_ics(items, summary=lambda r: "提醒")).decode("utf-8")
+    assert text.count("BEGIN:VEVENT") == 1
+    assert "DTSTART;VALUE=DATE:20250701\r\nDTEND;VALUE=DATE:20250702" in text
+    assert "SUMMARY:提醒" in text and r"DESCRIPTION:a\,b\;c\nd" in text
+    assert text.startswith("BEGIN:VCALENDAR\r\n") and text.endswith("END:VCALENDAR\r\n")
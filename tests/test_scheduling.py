@@ -0,0 +1,78 @@
+# 面試排程：時間解析、區間重疊 (含長時段面試)、排除自身、空檔查詢、未填地點與刪除後的最長時長
+from datetime import date, datetime
+
+import pytest
+
+from scheduling import TIME_FORMAT, InterviewSchedule, interval_of, parse_time
+from store import RecordStore
+from storage import JsonBackend
+
+NAME = "rs_interviews.json"
+DAY = date(2025, 6, 2)
+
+def _at(hour, minute=0):
+    return datetime(2025, 6, 2, hour, minute)
+
+def _interview(item_id, candidate, location, start, end):
+    return {'id': item_id, 'candidate_id': candidate, 'location': location,
+            'start': start.strftime(TIME_FORMAT), 'end': end.strftime(TIME_FORMAT)}
+
+@pytest.fixture
+def booked(workdir):
+    store = RecordStore(JsonBackend(), refresh_interval=0)
+    schedule = InterviewSchedule()
+    schedule.attach(store, NAME)
+    store.insert_many(NAME, [
+        _interview("long", "c1", "A室", _at(9), _at(12)),
+        _interview("short", "c2", "A室", _at(13), _at(14)),
+        _interview("other", "c3", "B室", _at(10), _at(11)),
+    ])
+    return store, schedule
+
+@pytest.mark.parametrize("text, expected", [("9:00", (9, 0)), ("0930", (9, 30)), ("14點30", (14, 30)),
+                                            ("14時", (14, 0)), (" 8：05 ", (8, 5))])
+def test_parse_time(text, expected):
+    assert parse_time(text) == expected
+
+@pytest.mark.parametrize("text", ["25:00", "9:75", "下午"])
+def test_parse_time_rejects(text):
+    with pytest.raises(ValueError):
+        parse_time(text)
+
+def test_legacy_datetime_gets_default_length():
+    assert interval_of({'datetime': "2025-06-02 14點30"}) == (_at(14, 30), _at(15, 30))
+    assert interval_of({'datetime': "無"}) is None
+    assert interval_of({'start': "2025-06-02 10:00", 'end': "2025-06-02 09:00"}) is None
+
+def test_conflicts(booked):
+    _, schedule = booked
+    # 開始時間早於查詢區間的長時段面試也要找到
+    assert schedule.conflicts("c9", "A室", _at(11, 30), _at(12, 30)) == [('location', "long")]
+    assert schedule.conflicts("c9", "A室", _at(12), _at(13)) == []
+    assert schedule.conflicts("c3", "C室", _at(10, 30), _at(11, 30)) == [('candidate', "other")]
+    assert schedule.conflicts("c2", "A室", _at(13), _at(14), exclude_id="short") == []
+
+def test_free_slots_and_moves(booked):
+    store, schedule = booked
+    assert schedule.free_slots("A室", DAY) == [(_at(12), _at(13)), (_at(14), _at(18))]
+    assert schedule.free_slots("A室", DAY, minutes=90) == [(_at(14), _at(18))]
+    store.update(NAME, "long", {'end': _at(10).strftime(TIME_FORMAT)})
+    store.delete(NAME, "short")
+    assert schedule.free_slots("A室", DAY) == [(_at(10), _at(18))]
+
+def test_blank_location_only_checks_candidate(booked):
+    store, schedule = booked
+    store.insert_many(NAME, [_interview("online1", "c4", "", _at(15), _at(16)),
+                             _interview("online2", "c5", " ", _at(15), _at(16))])
+    assert schedule.conflicts("c6", "", _at(15), _at(16)) == []
+    assert schedule.conflicts("c4", None, _at(15, 30), _at(16)) == [('candidate', "online1")]
+    assert schedule.free_slots("", DAY) == [(_at(9), _at(18))]
+
+def test_longest_length_shrinks_after_delete(booked):
+    store, schedule = booked
+    store.insert(NAME, _interview("long2", "c6", "A室", _at(15), _at(18)))
+    store.delete(NAME, "long")
+    assert schedule._by_location._longest["A室"] == _at(18) - _at(15)
+    store.delete(NAME, "long2")
+    assert schedule._by_location._longest["A室"] == _at(14) - _at(13)
+    assert schedule.conflicts("c9", "A室", _at(13, 30), _at(14, 30)) == [('location', "short")]
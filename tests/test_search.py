@@ -0,0 +1,39 @@
+# 倒排索引：CJK bigram 查詢、欄位權重、AND 交集，以及隨 store 寫入增量更新
+from search import InvertedIndex, query_terms, tokenize
+from store import RecordStore
+from storage import JsonBackend
+
+NAME = "rs_candidates.json"
+
+def _index():
+    store = RecordStore(JsonBackend(), refresh_interval=0)
+    index = InvertedIndex({'name': 3, 'resume': 1})
+    index.attach(store, NAME)
+    return store, index
+
+def test_tokens_and_query_terms():
+    assert tokenize("王小明 Python") == ["王", "小", "明", "王小", "小明", "python"]
+    assert query_terms("小明小明") == ["小明", "明小"]
+    assert query_terms("王") == ["王"]
+
+def test_weighted_and_query(workdir):
+    store, index = _index()
+    store.insert_many(NAME, [
+        {'id': "1", 'name': "王小明", 'resume': "Python 後端"},
+        {'id': "2", 'name': "李四", 'resume': "與王小明共事，熟悉 Python"},
+        {'id': "3", 'name': "張三", 'resume': "Java"},
+    ])
+    assert [doc for doc, _ in index.search("小明")] == ["1", "2"]
+    assert [doc for doc, _ in index.search("小明 python")] == ["1", "2"]
+    assert index.search("小明 java") == []
+    assert index.search("") == []
+    assert len(index.search("python", limit=1)) == 1
+
+def test_index_follows_updates_and_deletes(workdir):
+    store, index = _index()
+    store.insert_many(NAME, [{'id': "1", 'name': "王小明", 'resume': ""}, {'id': "2", 'name': "李四", 'resume': ""}])
+    store.update(NAME, "1", {'name': "陳大文"})
+    assert index.search("小明") == []
+    assert [doc for doc, _ in index.search("大文")] == ["1"]
+    store.delete(NAME, "2")
+    assert index.search("李四") == [] and len(index) == 1
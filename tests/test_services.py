@@ -0,0 +1,45 @@
+# 服務層：建構時傳入的 store 一路傳到員工主檔、索引、匯入匯出與 DataFrame 快取，不使用全程序共用的 store
+import io
+import json
+
+import pytest
+
+import aggregates
+import employees
+import export
+import frames
+import importer
+import journal
+import keywords
+import relations
+import reminders
+import scheduling
+import search
+import sketches
+from services import CompensationService, EmployeeService
+from store import RecordStore
+from storage import JsonBackend
+
+@pytest.fixture
+def store(workdir, monkeypatch):
+    for module in (aggregates, employees, export, frames, importer, keywords, relations, reminders,
+                   scheduling, search, sketches):
+        monkeypatch.setattr(module, "get_store", lambda: pytest.fail("不應使用全程序共用的 store"))
+    monkeypatch.setattr(journal, "_state", {})
+    monkeypatch.setattr(journal, "_counts", {})
+    return RecordStore(JsonBackend(), refresh_interval=0)
+
+def test_injected_store_is_used_throughout(store):
+    comp = CompensationService(store)
+    comp.create({'emp': "王小明", 'department': "研發", 'salary': 5000, 'bonus': 500})
+    records, errors = comp.prepare_import(io.BytesIO("emp,salary\n李四,4000\n".encode("utf-8")), "comp.csv")
+    assert not errors and len(comp.commit_import(records)) == 1
+    assert comp.analytics()['count'] == 2 and len(comp.frame()) == 2
+    path, _, _ = comp.export('json')
+    with open(path, encoding="utf-8") as f:
+        assert sorted(r['emp'] for r in json.load(f)) == ["李四", "王小明"]
+
+    em = EmployeeService(store)
+    emp_id = em.search("王小明")[0]
+    assert em.get(emp_id)['department'] == "研發"
+    assert [r['salary'] for r in em.profile(emp_id)["comp_data.json"]] == [5000]
@@ -0,0 +1,35 @@
+# 共用 RecordStore：全程序單一實例、寫入時複製的唯讀快照與版本，以及其他程序寫入後的重新載入
+import store as store_module
+from store import RecordStore, get_store
+from storage import JsonBackend
+
+def test_get_store_is_process_wide():
+    assert get_store() is get_store() is store_module._store
+
+def test_snapshots_are_shared_and_copy_on_write(workdir):
+    store = RecordStore(JsonBackend(), refresh_interval=0)
+    store.insert_many("kpi_data.json", [{'id': "1", 'score': 60}, {'id': "2", 'score': 70}])
+    version, before = store.snapshot("kpi_data.json")
+    # 各 session 讀到的是同一份唯讀快照，不各自複製
+    assert isinstance(before, tuple) and store.records("kpi_data.json") is before
+    store.update("kpi_data.json", "1", {'score': 90})
+    # 未異動的記錄在新舊快照間共用同一個物件
+    assert store.records("kpi_data.json")[1] is before[1]
+    store.insert("kpi_data.json", {'id': "3", 'score': 80})
+    store.delete("kpi_data.json", {"2"})
+    # 寫入產生新快照；先前取得的快照與其中的記錄保持不變
+    assert [(r['id'], r['score']) for r in before] == [("1", 60), ("2", 70)]
+    after_version, after = store.snapshot("kpi_data.json")
+    assert [(r['id'], r['score']) for r in after] == [("1", 90), ("3", 80)]
+    assert after_version == version + 3
+
+def test_writes_from_other_process_are_reloaded(workdir):
+    store = RecordStore(JsonBackend(), refresh_interval=3600)
+    assert store.records("kpi_data.json") == ()
+    other = RecordStore(JsonBackend(), refresh_interval=0)
+    other.insert("kpi_data.json", {'id': "1", 'score': 60})
+    # 節流時間內沿用記憶體快照；強制檢查時偵測到檔案變動並重新載入
+    assert store.records("kpi_data.json") == ()
+    version = store.version("kpi_data.json")
+    assert store.refresh("kpi_data.json", force=True) == version + 1
+    assert [r['id'] for r in store.records("kpi_data.json")] == ["1"]
@@ -0,0 +1,69 @@
+# KLL 草圖：小量資料精確、大量資料的秩誤差、合併與序列化，以及依分區維護的分位數索引
+import random
+
+import pytest
+
+from sketches import KLLSketch, QuantileIndex, partition_of
+from store import RecordStore
+from storage import JsonBackend
+
+def _filled(values, k=200, seed=1):
+    sketch = KLLSketch(k, seed=seed)
+    for v in values:
+        sketch.update(v)
+    return sketch
+
+def _rank_error(sketch, n, qs=(0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99)):
+    return max(abs(sketch.quantile(q) / n - q) for q in qs)
+
+def test_small_sketch_is_exact():
+    sketch = _filled(range(1, 101))
+    assert sketch.quantile(0.5) == 51 and sketch.quantile(0) == 1 and sketch.quantile(1) == 100
+    assert sketch.cdf(25) == 0.25 and sketch.cdf(0) == 0.0
+    assert [c for _, _, c in sketch.histogram(4)] == [25, 25, 25, 25]
+    assert KLLSketch().quantile(0.5) is None and KLLSketch().histogram() == []
+
+def test_large_sketch_stays_small_and_accurate():
+    n = 20000
+    values = list(range(n))
+    random.Random(7).shuffle(values)
+    sketch = _filled(values)
+    assert sketch.n == n and sum(len(l) for l in sketch.levels) < 2000
+    assert _rank_error(sketch, n) < 0.02
+    assert sum(c for _, _, c in sketch.histogram(10)) == pytest.approx(n, rel=0.01)
+
+def test_merge_and_round_trip():
+    n = 20000
+    values = list(range(n))
+    random.Random(3).shuffle(values)
+    left, right = _filled(values[:n // 2], seed=1), _filled(values[n // 2:], seed=2)
+    merged = left.copy().merge(right)
+    assert merged.n == n and (merged.min, merged.max) == (0, n - 1)
+    assert _rank_error(merged, n) < 0.02 and left.n == n // 2
+    restored = KLLSketch.from_dict(merged.to_dict())
+    assert restored.quantiles() == merged.quantiles()
+    restored.update(n)
+    assert restored.max == n
+
+def test_partition_of():
+    assert partition_of({'department': "研發", 'year': 2024}) == ("研發", "2024")
+    assert partition_of({'created_at': "2025-03-01 10:00:00"}) == ("", "2025")
+
+def test_index_rebuilds_after_tombstones(workdir):
+    store = RecordStore(JsonBackend(), refresh_interval=0)
+    index = QuantileIndex(['salary'], rebuild_ratio=0.1)
+    index.attach(store, "comp_data.json")
+    store.insert_many("comp_data.json", [{'id': f"{d}{i}", 'department': d, 'year': "2025", 'salary': base + i}
+                                         for d, base in (("研發", 1000), ("業務", 500)) for i in range(1, 11)])
+    assert index.partitions() == [("業務", "2025"), ("研發", "2025")]
+    assert index.sketch('salary', department="研發").quantile(0.5) == 1006
+    # 墓碑未超過 10% 前，修改前的舊值仍留在草圖中
+    store.update("comp_data.json", "研發10", {'salary': 0})
+    sketch = index.sketch('salary', department="研發")
+    assert (sketch.n, sketch.min, sketch.max) == (11, 0, 1010)
+    # 第二筆墓碑超過門檻，以目前快照重建
+    store.delete("comp_data.json", {"研發9"})
+    assert index.sketch('salary', department="研發").max == 1008
+    bands = index.bands('salary', qs=(0.5,))
+    assert bands == {"業務": {'count': 10, 0.5: 506}, "研發": {'count': 9, 0.5: 1004}}
+    assert index.sketch('salary', year="2024").n == 0
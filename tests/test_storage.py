@@ -0,0 +1,65 @@
+# SQLite 後端：交易式寫入與樂觀鎖、跨連線的過期偵測、查詢下推與欄位名稱檢查
+import pytest
+
+from storage import TABLES, ConflictError, SqliteBackend, check_field
+
+@pytest.fixture
+def sqlite(workdir):
+    backend = SqliteBackend(str(workdir / "hrm.db"))
+    backend.replace_all("comp_data.json", [{'id': str(i), 'emp': f"E{i}", 'salary': i} for i in range(5)])
+    return backend
+
+def test_page_filters_and_sorts_in_sql(sqlite):
+    rows, total = sqlite.page("comp_data.json", [('salary', 'in', [1, 3])], 'salary', True, 10, 0)
+    assert total == 2 and [r['id'] for r in rows] == ["3", "1"]
+
+@pytest.mark.parametrize("field", ["x') IS NULL OR 1=1 OR json_extract(data,'$.x", "salary DESC", "a.b", ""])
+def test_unsafe_field_names_are_rejected(sqlite, field):
+    with pytest.raises(ValueError):
+        sqlite.page("comp_data.json", [(field, '=', 'zzz')], None, False, 10, 0)
+    if field:   # 空字串的 sort 視為不排序
+        with pytest.raises(ValueError):
+            sqlite.page("comp_data.json", [], field, False, 10, 0)
+
+def test_check_field_accepts_cjk():
+    assert check_field("部門") == "部門"
+
+def test_write_is_transactional_and_versioned(sqlite):
+    name = "comp_data.json"
+    sqlite.load(name)
+    sqlite.write(name, None, [('update', {'id': "1", 'emp': "E1", 'salary': 10, '_version': 1}),
+                              ('delete', "2"), ('insert', {'id': "9", 'emp': "E9", 'salary': 9})])
+    assert not sqlite.stale(name)
+    with pytest.raises(ConflictError):
+        sqlite.write(name, None, [('insert', {'id': "10", 'emp': "E10"}),
+                                  ('update', {'id': "1", 'emp': "E1", 'salary': 11, '_version': 1})])
+    rows = {r['id']: r for r in sqlite.load(name)}
+    assert sorted(rows) == ["0", "1", "3", "4", "9"] and rows["1"]['salary'] == 10
+    assert sqlite.query(name, {'emp': "E1"}) == [rows["1"]]
+
+def test_other_connection_marks_snapshot_stale(sqlite, workdir):
+    name = "comp_data.json"
+    sqlite.load(name)
+    other = SqliteBackend(str(workdir / "hrm.db"))
+    other.write(name, None, [('delete', "0")])
+    assert sqlite.stale(name)
+    assert len(sqlite.load(name)) == 4 and not sqlite.stale(name)
+
+def test_like_patterns_are_escaped(sqlite):
+    name = "comp_data.json"
+    sqlite.write(name, None, [('insert', {'id': "a", 'emp': "50%_off"}),
+                              ('insert', {'id': "b", 'emp': "500 off", 'note': "Hello"})])
+    assert [r['id'] for r in sqlite.page(name, [('emp', 'contains', "0%_")], None, False, 10, 0)[0]] == ["a"]
+    assert [r['id'] for r in sqlite.page(name, [('emp', 'prefix', "50%")], None, False, 10, 0)[0]] == ["a"]
+    rows, total = sqlite.page(name, [(('emp', 'note'), 'contains', "hello")], None, False, 10, 0)
+    assert total == 1 and rows[0]['id'] == "b"
+    assert sqlite.distinct(name, 'note') == ["Hello"]
+
+def test_new_indexed_column_is_backfilled(sqlite, workdir, monkeypatch):
+    table, columns = TABLES["comp_data.json"]
+    monkeypatch.setitem(TABLES, "comp_data.json", (table, columns + ["salary"]))
+    fresh = SqliteBackend(str(workdir / "hrm.db"))
+    rows, total = fresh.page("comp_data.json", [('salary', 'in', [2, 4])], 'salary', False, 10, 0)
+    assert total == 2 and [r['id'] for r in rows] == ["2", "4"]
+    conn = fresh.connection()
+    assert conn.execute('SELECT COUNT(*) FROM comp_data WHERE "salary" IS NOT NULL').fetchone()[0] == 5
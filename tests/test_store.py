@@ -0,0 +1,46 @@
+# RecordStore：分頁篩選與排序、依相關度排序的分頁、id 查表與樂觀鎖 (JSON 與 SQLite 後端)
+import pytest
+
+from store import RecordStore
+from storage import ConflictError, JsonBackend, SqliteBackend
+
+@pytest.fixture(params=["json", "sqlite"])
+def store(request, workdir):
+    backend = JsonBackend() if request.param == "json" else SqliteBackend(str(workdir / "hrm.db"))
+    store = RecordStore(backend, refresh_interval=0)
+    store.insert_many("rs_data.json", [{'id': str(i), 'name': f"N{i}", 'position': "RD" if i % 2 else "QA",
+                                        'rating': i % 5} for i in range(50)])
+    return store
+
+def test_page_filters_sorts_and_counts(store):
+    rows, total = store.page("rs_data.json", [('position', '=', "RD")], 'rating', True, page=2, page_size=10)
+    assert total == 25 and len(rows) == 10
+    assert all(r['position'] == "RD" for r in rows)
+    ratings = [r['rating'] for r in store.page("rs_data.json", [('position', '=', "RD")], 'rating', True, 1, 25)[0]]
+    assert ratings == sorted(ratings, reverse=True)
+
+def test_ranked_page_keeps_relevance_order(store, monkeypatch):
+    # 搜尋結果分頁只走 id 對照表，不交給後端的 SQL 分頁
+    monkeypatch.setattr(store.backend, "page", lambda *a: pytest.fail("不應下推到後端"))
+    ranking = ["7", "3", "missing", "11", "4", "9"]
+    rows, total = store.page("rs_data.json", [('position', '=', "RD")], page=1, page_size=2, ids=ranking)
+    assert total == 4 and [r['id'] for r in rows] == ["7", "3"]
+    rows, _ = store.page("rs_data.json", [('position', '=', "RD")], page=2, page_size=2, ids=ranking)
+    assert [r['id'] for r in rows] == ["11", "9"]
+    rows, _ = store.page("rs_data.json", [], 'rating', False, 1, 10, ids=ranking)
+    assert [r['rating'] for r in rows] == sorted(r['rating'] for r in rows)
+
+def test_get_many_and_id_map_follow_writes(store):
+    assert [r['id'] for r in store.get_many("rs_data.json", ["5", "x", "1"])] == ["5", "1"]
+    store.update("rs_data.json", "5", {'name': "改名"})
+    assert store.get("rs_data.json", "5")['name'] == "改名"
+    store.delete_many("rs_data.json", {"5"})
+    assert store.get("rs_data.json", "5") is None
+
+def test_optimistic_lock(store):
+    store.update("rs_data.json", "1", {'rating': 4}, expected_version=1)
+    with pytest.raises(ConflictError):
+        store.update("rs_data.json", "1", {'rating': 0}, expected_version=1)
+    with pytest.raises(ConflictError):
+        store.delete_many("rs_data.json", {"1"}, expected_versions={"1": 1})
+    assert store.get("rs_data.json", "1")['_version'] == 2
@@ -1,63 +1,43 @@
 # training.py — 完整增強版 T&D 模組，包含持久化、日誌與美化及6項創意功能
+# 業務邏輯見 services.TrainingService，本檔只負責介面
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import datetime, date
-import json
 import os
-import uuid
+from store import ConflictError
+from frames import get_frame
+from components import seen_version, forget_version, log_viewer, paginated_table, export_button, import_panel
+import certificates
+from services import get_service
 
-DATA_FILE = "td_data.json"
-LOG_FILE = "td_logs.json"
-ATTEND_FILE = "td_attendance.json"
-CERT_FILE = "td_certificates.json"
-
-# -------------------- 檔案 I/O --------------------
-def load_json(filename):
-    if os.path.exists(filename):
-        with open(filename, "r", encoding="utf-8") as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return []
-    return []
-
-def save_json(filename, data):
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
-# -------------------- Session 初始化 --------------------
-def initialize_session_state():
-    st.session_state.setdefault('trainings', load_json(DATA_FILE))
-    st.session_state.setdefault('td_logs', load_json(LOG_FILE))
-    st.session_state.setdefault('attendance', load_json(ATTEND_FILE))
-    st.session_state.setdefault('certificates', load_json(CERT_FILE))
-    st.session_state.setdefault('last_updated', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-
-# -------------------- 日誌記錄 --------------------
-def log_action(action, details):
-    entry = {
-        'id': str(uuid.uuid4()),
-        'action': action,
-        'details': details,
-        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }
-    st.session_state.td_logs.append(entry)
-    save_json(LOG_FILE, st.session_state.td_logs)
+# -------------------- 共享儲存 --------------------
+service = get_service("td")
+store = service.store
+DATA_FILE = service.data_file
+LOG_FILE = service.log_file
+ATTEND_FILE = service.session_file       # 培訓場次
+ATTENDEE_FILE = service.attendee_file    # 每位員工的出席記錄
+CERT_FILE = service.cert_file
+ATTENDANCE_STATUSES = service.statuses
+# 關聯索引：課程 → 場次、場次 → 出席者、課程 → 證書，以及以 id 查課程
+courses = service.courses
+sessions_by_course = service.sessions_by_course
+attendees_by_session = service.attendees_by_session
+certificates_by_course = service.certificates_by_course
+session_label = service.session_label
 
 # -------------------- 基本 CRUD --------------------
 def view_trainings():
     st.header("📋 訓練課程列表")
-    st.write(f"最後更新：{st.session_state.last_updated}")
-    df = pd.DataFrame(st.session_state.trainings)
-    if df.empty:
+    st.write(f"最後更新：{store.updated_at(DATA_FILE)}")
+    if not store.records(DATA_FILE):
         st.info("目前沒有訓練課程。")
     else:
         # 搜尋課程
         kw = st.text_input("🔍 搜尋課程")
-        if kw:
-            df = df[df['course'].str.contains(kw, case=False)]
-        st.dataframe(df)
+        where = [('course', 'contains', kw)] if kw else []
+        paginated_table(DATA_FILE, "td_view", where,
+                        ['course', 'duration', 'start_date', 'expected_rating', 'created_at'])
 
 def add_training():
     st.header("🆕 新增訓練課程")
@@ -69,31 +49,24 @@ def add_training():
         rating = st.slider("預期滿意度(1-5)", 1, 5, 3)
         submit = st.form_submit_button("提交")
     if submit:
-        if not course.strip():
-            st.error("課程名稱不可為空")
+        try:
+            service.create({'course': course, 'description': desc, 'duration': duration,
+                            'start_date': start_date.strftime("%Y-%m-%d"), 'expected_rating': rating})
+        except ValueError as e:
+            st.error(str(e))
         else:
-            entry = {
-                'id': str(uuid.uuid4()),
-                'course': course,
-                'description': desc,
-                'duration': duration,
-                'start_date': start_date.strftime("%Y-%m-%d"),
-                'expected_rating': rating,
-                'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
-            st.session_state.trainings.append(entry)
-            save_json(DATA_FILE, st.session_state.trainings)
-            log_action("新增課程", course)
             st.success("訓練課程新增成功！")
 
 def edit_training():
     st.header("✏️ 修改訓練課程")
-    if not st.session_state.trainings:
+    trainings = store.records(DATA_FILE)
+    if not trainings:
         st.info("無可修改課程")
         return
-    opts = {t['course']: t for t in st.session_state.trainings}
+    opts = {t['course']: t for t in trainings}
     sel = st.selectbox("選擇課程", list(opts.keys()))
     tr = opts[sel]
+    version = seen_version(tr)
     with st.form("form_edit"):
         course = st.text_input("課程名稱", tr['course'])
         desc = st.text_area("課程描述", tr['description'])
@@ -102,145 +75,181 @@ def edit_training():
         rating = st.slider("預期滿意度(1-5)", 1, 5, tr['expected_rating'])
         submit = st.form_submit_button("更新")
     if submit:
-        tr.update({
-            'course': course, 'description': desc, 'duration': duration,
-            'start_date': start_date.strftime("%Y-%m-%d"), 'expected_rating': rating,
-            'updated_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        })
-        save_json(DATA_FILE, st.session_state.trainings)
-        log_action("更新課程", course)
+        try:
+            service.update(tr['id'], {
+                'course': course, 'description': desc, 'duration': duration,
+                'start_date': start_date.strftime("%Y-%m-%d"), 'expected_rating': rating,
+            }, expected_version=version)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        except ConflictError as e:
+            forget_version(tr)
+            st.error(f"{e}，請重新確認後再送出。")
+            return
+        forget_version(tr)
         st.success("課程更新成功！")
 
 def delete_training():
     st.header("🗑️ 刪除訓練課程")
-    if not st.session_state.trainings:
+    trainings = store.records(DATA_FILE)
+    if not trainings:
         st.info("無可刪除課程")
         return
-    opts = {t['course']: t for t in st.session_state.trainings}
+    opts = {t['course']: t for t in trainings}
     sel = st.selectbox("選擇課程", list(opts.keys()))
+    version = seen_version(opts[sel])
     if st.button("確認刪除"):
-        st.session_state.trainings = [t for t in st.session_state.trainings if t['id'] != opts[sel]['id']]
-        save_json(DATA_FILE, st.session_state.trainings)
-        log_action("刪除課程", sel)
+        try:
+            service.delete([opts[sel]], expected_versions={opts[sel]['id']: version})
+        except ConflictError as e:
+            forget_version(opts[sel])
+            st.error(f"{e}，請重新確認後再送出。")
+            return
+        forget_version(opts[sel])
         st.success("課程刪除成功！")
 
 # -------------------- 創意功能 --------------------
 def batch_delete():
     st.subheader("🔁 批量刪除課程")
-    df = pd.DataFrame(st.session_state.trainings)
-    if df.empty:
+    trainings = store.records(DATA_FILE)
+    if not trainings:
         st.info("無課程可批次刪除")
         return
-    sels = st.multiselect("選擇要刪除的課程", df['course'])
-    if st.button("執行批次刪除"):
-        for c in sels:
-            st.session_state.trainings = [t for t in st.session_state.trainings if t['course'] != c]
-            log_action("批次刪除", c)
-        save_json(DATA_FILE, st.session_state.trainings)
-        st.success("批次刪除完成！")
+    sels = st.multiselect("選擇要刪除的課程", trainings, format_func=lambda t: t['course'])
+    if st.button("執行批次刪除") and sels:
+        deleted = service.delete(sels)
+        st.success(f"批次刪除完成，共刪除 {deleted[DATA_FILE]} 門課程、{deleted.get(ATTEND_FILE, 0)} 筆場次！")
 
+def import_trainings():
+    st.subheader("📥 批次匯入課程")
+    import_panel(service, "td_import")
 
 def view_logs():
     st.subheader("📜 操作日誌")
-    df = pd.DataFrame(st.session_state.td_logs)
-    if df.empty:
-        st.info("無日誌")
-    else:
-        st.dataframe(df)
-        # 新增下載按鈕
-        json_str = json.dumps(st.session_state.td_logs, ensure_ascii=False, indent=2)
-        st.download_button(
-            label="Download Logs (JSON)",
-            data=json_str,
-            file_name="td_logs.json",
-            mime="application/json"
-        )
+    log_viewer(LOG_FILE, "td_logs", "無日誌")
 
 def schedule_session():
     st.subheader("📅 安排培訓場次")
-    if not st.session_state.trainings:
+    trainings = store.records(DATA_FILE)
+    if not trainings:
         st.info("請先新增課程")
         return
-    opts = {t['course']: t['id'] for t in st.session_state.trainings}
-    sel = st.selectbox("選擇課程", list(opts.keys()))
+    course = st.selectbox("選擇課程", trainings, format_func=lambda t: t['course'])
     with st.form("form_sched"):
         date_input = st.date_input("場次日期", date.today())
         venue = st.text_input("地點", "公司教室")
         submit = st.form_submit_button("安排")
     if submit:
-        entry = {'id': str(uuid.uuid4()), 'course_id': opts[sel], 'date': date_input.strftime("%Y-%m-%d"), 'venue': venue}
-        st.session_state.attendance.append(entry)
-        save_json(ATTEND_FILE, st.session_state.attendance)
-        log_action("安排場次", sel)
+        service.schedule_session(course, date_input.strftime("%Y-%m-%d"), venue)
         st.success("場次安排成功！")
+    sessions = sorted(sessions_by_course.group(course['id']), key=lambda s: s['date'])
+    if sessions:
+        st.write(f"此課程已安排 {len(sessions)} 個場次")
+        st.dataframe(pd.DataFrame([
+            {'date': s['date'], 'venue': s.get('venue', ''), 'attendees': attendees_by_session.count(s['id'])}
+            for s in sessions
+        ]))
 
+# 出席記錄為每位員工一筆 (session_id, emp, status)；同一場次可一次標記多位員工
 def mark_attendance():
     st.subheader("✅ 標記出席")
-    if not st.session_state.attendance:
+    sessions = store.records(ATTEND_FILE)
+    if not sessions:
         st.info("無場次可標記")
         return
-    df = pd.DataFrame(st.session_state.attendance)
-    df = df.merge(pd.DataFrame(st.session_state.trainings), left_on='course_id', right_on='id', suffixes=('','_t'))
-    df['label'] = df['course'] + ' @ ' + df['date']
-    opts = {r['label']: r['id'] for _, r in df.iterrows()}
-    sel = st.selectbox("選擇場次", list(opts.keys()))
-    if st.button("標記所有候選人出席"):
-        # 就範例，標記簡單日誌
-        log_action("出席標記", sel)
-        st.success("已標記所有候選人出席！")
+    session = st.selectbox("選擇場次", sessions, format_func=session_label)
+    existing = {a['emp']: a for a in attendees_by_session.group(session['id'])}
+    with st.form("form_attendance"):
+        names = st.text_area("員工姓名 (每行一位，或以逗號分隔)")
+        status = st.radio("狀態", ATTENDANCE_STATUSES, horizontal=True)
+        submit = st.form_submit_button("批次標記")
+    if submit:
+        emps = list(dict.fromkeys(n.strip() for n in names.replace("，", ",").replace(",", "\n").splitlines() if n.strip()))
+        try:
+            new, changed = service.mark_attendance(session, emps, status)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        st.success(f"已標記 {len(emps)} 位員工{status}（新增 {len(new)}、更新 {len(changed)}）。")
+        existing = {a['emp']: a for a in attendees_by_session.group(session['id'])}
+    if existing:
+        st.dataframe(pd.DataFrame(sorted(existing.values(), key=lambda a: a['emp']))[['emp', 'status', 'marked_at']])
 
 def generate_certificate():
     st.subheader("🎓 生成結業證書")
-    if not st.session_state.trainings:
+    trainings = store.records(DATA_FILE)
+    if not trainings:
         st.info("請先新增課程")
         return
-    opts = {t['course']: t['id'] for t in st.session_state.trainings}
-    sel = st.selectbox("選擇課程", list(opts.keys()))
+    course = st.selectbox("選擇課程", trainings, format_func=lambda t: t['course'])
+    st.caption(f"此課程已發出 {certificates_by_course.count(course['id'])} 張證書")
     name = st.text_input("員工姓名")
     if st.button("生成證書"):
-        cert = {'id': str(uuid.uuid4()), 'course_id': opts[sel], 'name': name, 'date': datetime.now().strftime("%Y-%m-%d")}
-        st.session_state.certificates.append(cert)
-        save_json(CERT_FILE, st.session_state.certificates)
-        log_action("生成證書", f"{name} - {sel}")
-        st.success("結業證書已生成！")
+        try:
+            service.issue_certificate(course, name)
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            st.success("結業證書已生成！")
     # 新增下載按鈕
-    if st.session_state.certificates:
-        json_str = json.dumps(st.session_state.certificates, ensure_ascii=False, indent=2)
-        st.download_button(
-            label="Download Certificates (JSON)",
-            data=json_str,
-            file_name="td_certificates.json",
-            mime="application/json"
-        )
+    if len(certificates_by_course):
+        export_button(CERT_FILE, "td_certificates", "Download Certificates")
+
+# 為場次中所有出席者產生 PDF 證書並打包成 zip；新證書以一次寫入記錄，已發過證書者沿用原證書編號
+def batch_certificates():
+    st.subheader("🎓 批次產生結業證書 (PDF)")
+    if not certificates.available():
+        st.warning(certificates.REPORTLAB_HINT + "；「生成證書」仍可登錄證書記錄。")
+        return
+    sessions = store.records(ATTEND_FILE)
+    if not sessions:
+        st.info("無場次可產生證書")
+        return
+    session = st.selectbox("選擇場次", sessions, format_func=session_label)
+    course = courses.record(session.get('course_id'))
+    if course is None:
+        st.error("此場次的課程已被刪除。")
+        return
+    attendees = {a['emp'] for a in service.attendees(session, "出席")}
+    if not attendees:
+        st.info("此場次尚無出席記錄，請先標記出席。")
+        return
+    st.write(f"出席人數：{len(attendees)}")
+    zip_key = "td_cert_zip"
+    if st.button(f"產生 {len(attendees)} 張證書"):
+        with st.spinner("證書產生中…"):
+            path, issued, fresh = service.certificate_zip(session)
+        old = st.session_state.get(zip_key)
+        if old and os.path.exists(old[0]):
+            os.remove(old[0])
+        st.session_state[zip_key] = (path, f"certificates-{course['course']}-{session['date']}.zip")
+        st.success(f"已產生 {issued} 張證書，其中新發 {fresh} 張。")
+    if st.session_state.get(zip_key) and os.path.exists(st.session_state[zip_key][0]):
+        path, file_name = st.session_state[zip_key]
+        with open(path, "rb") as f:
+            st.download_button("Download Certificates (.zip)", f, file_name=file_name, mime="application/zip")
 
 def analytics():
     st.subheader("📊 課程分析儀表板")
-    df = pd.DataFrame(st.session_state.trainings)
+    df = get_frame(DATA_FILE)
     if df.empty:
         st.info("無資料分析")
         return
     # 課程數量走勢
-    df['created_at'] = pd.to_datetime(df['created_at'])
     count_by_month = df.groupby(df['created_at'].dt.to_period('M')).size()
     st.line_chart(count_by_month)
-    # 新增下載按鈕
-    json_str = df.to_json(orient="records", force_ascii=False, indent=2)
-    st.download_button(
-        label="Download Training Data (JSON)",
-        data=json_str,
-        file_name="td_trainings.json",
-        mime="application/json"
-    )
+    # 下載按鈕
+    export_button(DATA_FILE, "td_trainings", "Download Training Data")
 
 # -------------------- 主入口 --------------------
 def td_module():
-    initialize_session_state()
     st.title("📌 訓練與發展 (T&D) - ST Engineering")
     st.sidebar.title("功能選單")
     choice = st.sidebar.radio("請選擇操作", [
         "查看課程", "新增課程", "修改課程", "刪除課程",
-        "批量刪除", "日誌紀錄",
-        "安排場次", "標記出席", "生成證書", "課程分析"
+        "批量刪除", "批次匯入", "日誌紀錄",
+        "安排場次", "標記出席", "生成證書", "批次證書", "課程分析"
     ])
 
     if choice == "查看課程": view_trainings()
@@ -248,11 +257,13 @@ def td_module():
     elif choice == "修改課程": edit_training()
     elif choice == "刪除課程": delete_training()
     elif choice == "批量刪除": batch_delete()
+    elif choice == "批次匯入": import_trainings()
 
     elif choice == "日誌紀錄": view_logs()
     elif choice == "安排場次": schedule_session()
     elif choice == "標記出席": mark_attendance()
     elif choice == "生成證書": generate_certificate()
+    elif choice == "批次證書": batch_certificates()
     elif choice == "課程分析": analytics()
 
 # 供 main.py 匯入